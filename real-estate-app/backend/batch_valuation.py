@@ -0,0 +1,90 @@
+"""
+Пакетний пошук схожих об'єктів для KNN валюаторів
+Групує цілі за містом і районом: на групу одне визначення локації,
+один знімок і один набір кандидатів, а score для всіх цілей групи
+рахується однією матричною операцією. Результати видаються генератором
+у порядку вхідних цілей, тому в пам'яті тримається лише поточний блок
+"""
+
+import logging
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from listing_snapshot import ListingRow
+from similarity_engine import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+# Скільки цілей читати з вхідного потоку за раз
+BATCH_CHUNK_SIZE = 1000
+
+# Максимальний розмір матриці score (цілі x кандидати) за один прохід
+MAX_SCORE_CELLS = 2_000_000
+
+
+def iter_similar_properties(valuator, targets: Iterable[Dict[str, Any]], limit: int,
+                            chunk_size: int = BATCH_CHUNK_SIZE
+                            ) -> Iterator[Tuple[Dict[str, Any], List[Tuple[ListingRow, float]]]]:
+    """
+    Для кожної цілі повертає (ціль, список (рядок знімка, score)) - те саме,
+    що find_similar_properties валюатора, але з поділом роботи в межах групи.
+    valuator - KNNValuator або SimpleKNNValuator
+    """
+    targets = iter(targets)
+    while True:
+        chunk = list(islice(targets, chunk_size))
+        if not chunk:
+            return
+
+        results: List[List[Tuple[ListingRow, float]]] = [[] for _ in chunk]
+
+        groups: Dict[Tuple[Any, Any], List[int]] = OrderedDict()
+        for i, target in enumerate(chunk):
+            groups.setdefault((target.get('city'), target.get('district')), []).append(i)
+
+        for (city, district), members in groups.items():
+            try:
+                _score_group(valuator, city, district, [chunk[i] for i in members],
+                             [results[i] for i in members], limit)
+            except Exception as e:
+                logger.error(f"Помилка пакетного пошуку для {city}/{district}: {e}")
+
+        yield from zip(chunk, results)
+
+
+def _score_group(valuator, city, district, targets: List[Dict[str, Any]],
+                 results: List[List[Tuple[ListingRow, float]]], limit: int):
+    """Заповнює results для цілей одного міста і району"""
+    city_id, district_id = valuator.snapshot_cache.resolve_location(city, district)
+    snapshot = valuator.snapshot_cache.get(city_id)
+
+    base = snapshot.candidates(district_id)
+    if len(base) == 0:
+        return
+
+    rows_per_pass = max(1, MAX_SCORE_CELLS // len(base))
+    base_matrix = snapshot.matrix.take(base)
+
+    for start in range(0, len(targets), rows_per_pass):
+        block = targets[start:start + rows_per_pass]
+        scores = valuator.kernel.score_batch(block, base_matrix)
+
+        for target, row_scores, result in zip(block, scores, results[start:start + rows_per_pass]):
+            # Ті самі виключення й просторовий префільтр, що й для однієї цілі
+            candidates = base
+            position = snapshot.positions.get(target.get('id'))
+            if position is not None:
+                candidates = base[base != position]
+            candidates = snapshot.nearby_candidates(
+                candidates, target.get('latitude'), target.get('longitude'),
+                limit * valuator.spatial_candidates_factor, valuator.search_radii_km
+            )
+
+            allowed = np.searchsorted(base, candidates)
+            result.extend(
+                (snapshot.listings[base[i]], float(row_scores[i]))
+                for i in top_k_indices(row_scores, limit, allowed)
+            )
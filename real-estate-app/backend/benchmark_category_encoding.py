@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк кодування категорій: попередній підхід (astype(str), apply з
+lambda для невідомих значень, LabelEncoder.transform) проти CategoryEncoder
+на 10k, 100k та 1M рядків
+
+    python benchmark_category_encoding.py [--sizes 10000 100000 1000000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sklearn.preprocessing import LabelEncoder
+
+from category_encoding import CategoryEncoder
+
+DISTRICTS = ['Центр', 'Салтівка', 'Олексіївка', 'Холодна Гора', 'ХТЗ', 'Нові Будинки',
+             'Павлове Поле', 'Іванівка', 'Журавлівка', 'Шевченківський']
+
+
+def make_column(rows: int, seed: int = 0) -> pd.Series:
+    """Колонка районів: 2% невідомих значень, 1% пропусків"""
+    rng = np.random.default_rng(seed)
+    values = rng.choice(np.array(DISTRICTS + ['Новий район'], dtype=object), size=rows,
+                        p=[0.098] * len(DISTRICTS) + [0.02])
+    values[rng.random(rows) < 0.01] = None
+    return pd.Series(values)
+
+
+def legacy_transform(encoder: LabelEncoder, column: pd.Series) -> np.ndarray:
+    """Кодування, яким раніше користувався prepare_features"""
+    column = column.astype(str)
+    known_categories = set(encoder.classes_)
+    column = column.apply(lambda x: x if x in known_categories else 'unknown')
+    return encoder.transform(column)
+
+
+def measure(func, repeat: int) -> float:
+    """Найкращий час із repeat запусків, секунди"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк кодування категорій')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    train = make_column(50_000, seed=1)
+    # LabelEncoder знає 'unknown', інакше попередній підхід падає на нових значеннях
+    legacy = LabelEncoder().fit(pd.concat([train.astype(str), pd.Series(['unknown'])]))
+    encoder = CategoryEncoder().fit(train[train != 'Новий район'])
+
+    print(f"{'рядків':>10} {'LabelEncoder+apply':>20} {'CategoryEncoder':>16} {'рядків/с':>14} {'прискорення':>12}")
+    for rows in args.sizes:
+        column = make_column(rows)
+        categorical = column.astype('category')
+
+        legacy_seconds = measure(lambda: legacy_transform(legacy, column), args.repeat)
+        seconds = measure(lambda: encoder.transform(column), args.repeat)
+        categorical_seconds = measure(lambda: encoder.transform(categorical), args.repeat)
+
+        print(f"{rows:>10,} {legacy_seconds * 1000:>17.1f} мс {seconds * 1000:>13.1f} мс "
+              f"{rows / seconds:>14,.0f} {legacy_seconds / seconds:>11.1f}x")
+        print(f"{'':>10} {'(category dtype)':>20} {categorical_seconds * 1000:>13.1f} мс "
+              f"{rows / categorical_seconds:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Пул потоків для блокуючої роботи async обробників FastAPI
+Запити до БД через синхронні сесії SQLAlchemy та оцінка моделями
+виконуються поза event loop. Кожна група ендпоінтів (lane) має власну
+межу одночасних задач, а пул має рівно стільки потоків, скільки сумарно
+дозволяють межі, тому насичена група (наприклад, оцінка) не забирає
+потоки в інших, зокрема в перевірки здоров'я. Очікування на вхід у групу
+рахується як глибина черги; якщо черга переповнена, задача відхиляється
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """Черга групи переповнена - запит варто повторити пізніше"""
+
+    def __init__(self, lane: str, waiting: int):
+        super().__init__(f"Група '{lane}' перевантажена: {waiting} задач у черзі")
+        self.lane = lane
+        self.waiting = waiting
+
+
+class _Lane:
+    """Стан однієї групи: семафор та лічильники"""
+
+    def __init__(self, limit: int, max_waiting: int):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.semaphore = asyncio.Semaphore(limit)
+
+        self.running = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        finished = max(1, self.completed + self.failed)
+        return {
+            'limit': self.limit,
+            'running': self.running,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_wait_ms': round(self.wait_seconds / finished * 1000, 2),
+            'avg_run_ms': round(self.run_seconds / finished * 1000, 2),
+        }
+
+
+class BlockingPool:
+    """
+    Обмежений пул для блокуючих викликів.
+    limits - межа одночасних задач для кожної групи, max_waiting - скільки
+    задач групи можуть чекати на вхід, перш ніж нові почнуть відхилятись
+    """
+
+    def __init__(self, limits: Dict[str, int], max_waiting: int = 64):
+        self._lanes = {lane: _Lane(limit, max_waiting) for lane, limit in limits.items()}
+        self._executor = ThreadPoolExecutor(max_workers=sum(limits.values()), thread_name_prefix='blocking')
+
+    async def run(self, lane: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Виконує func(*args, **kwargs) у потоці пулу в межах групи lane"""
+        state = self._lanes[lane]
+        if state.waiting >= state.max_waiting:
+            state.rejected += 1
+            raise PoolSaturated(lane, state.waiting)
+
+        queued_at = time.monotonic()
+        state.waiting += 1
+        state.peak_waiting = max(state.peak_waiting, state.waiting)
+        try:
+            await state.semaphore.acquire()
+        finally:
+            state.waiting -= 1
+
+        started = time.monotonic()
+        state.wait_seconds += started - queued_at
+        state.running += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+        # Місце в групі звільняється, коли потік справді завершився, навіть
+        # якщо клієнт відключився і обробник скасовано
+        future.add_done_callback(functools.partial(self._finish, state, started))
+        return await asyncio.shield(future)
+
+    @staticmethod
+    def _finish(state: _Lane, started: float, future: asyncio.Future):
+        state.running -= 1
+        state.run_seconds += time.monotonic() - started
+        if future.cancelled() or future.exception() is not None:
+            state.failed += 1
+        else:
+            state.completed += 1
+        state.semaphore.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Лічильники та глибина черги по групах"""
+        return {lane: state.stats() for lane, state in self._lanes.items()}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,79 @@
+"""
+Векторне кодування категоріальних ознак
+Один енкодер на колонку для навчання та прогнозу: категорії навчання
+отримують коди 0..n-1 у відсортованому порядку (як LabelEncoder), усі
+невідомі значення - окремий код UNKNOWN_CODE замість помилки. Пропуски
+(None/NaN) - звичайна категорія MISSING_CATEGORY
+"""
+
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+# Код для значень, яких не було при навчанні
+UNKNOWN_CODE = -1
+
+# Категорія для пропусків (так само рядок str(None), як і раніше)
+MISSING_CATEGORY = 'None'
+
+# До якої кількості значень словник швидший за pandas (одиночні прогнози)
+SMALL_BATCH_SIZE = 256
+
+
+class CategoryEncoder:
+    """
+    Кодування однієї колонки у int32.
+    Великі масиви: pd.factorize (хеш-таблиця в C) дає унікальні значення,
+    лише вони шукаються серед категорій, далі - одна операція take.
+    Малі масиви та окремі значення - пошук у словнику
+    """
+
+    def __init__(self, categories: Iterable[Any] = ()):
+        self._set_categories(categories)
+
+    def _set_categories(self, categories: Iterable[Any]):
+        self.classes_ = np.array(sorted({str(category) for category in categories}), dtype=object)
+        self._index = pd.Index(self.classes_)
+        self._codes = {category: code for code, category in enumerate(self.classes_)}
+        self._missing_code = self._codes.get(MISSING_CATEGORY, UNKNOWN_CODE)
+
+    def fit(self, values: Any) -> 'CategoryEncoder':
+        """Запам'ятовує категорії з масиву, Series або списку"""
+        codes, uniques = pd.factorize(_as_1d(values))
+        categories = [str(value) for value in uniques]
+        if (codes == -1).any():
+            categories.append(MISSING_CATEGORY)
+        self._set_categories(categories)
+        return self
+
+    def transform(self, values: Any) -> np.ndarray:
+        """Коди значень (int32), невідомі - UNKNOWN_CODE"""
+        values = _as_1d(values)
+        if len(values) <= SMALL_BATCH_SIZE:
+            return np.fromiter((self.encode(value) for value in values), dtype=np.int32, count=len(values))
+
+        codes, uniques = pd.factorize(values)
+        lookup = self._index.get_indexer([str(value) for value in uniques])
+        # Останній елемент - для пропусків (factorize дає їм код -1)
+        lookup = np.append(lookup, self._missing_code).astype(np.int32)
+        return lookup[codes]
+
+    def fit_transform(self, values: Any) -> np.ndarray:
+        return self.fit(values).transform(values)
+
+    def encode(self, value: Any) -> int:
+        """Код одного значення"""
+        if value is None or (isinstance(value, float) and value != value):
+            return self._missing_code
+        return self._codes.get(str(value), UNKNOWN_CODE)
+
+    def __len__(self) -> int:
+        return len(self.classes_)
+
+
+def _as_1d(values: Any) -> Any:
+    """Series та масиви передаються як є, решта (списки, генератори) - у масив об'єктів"""
+    if isinstance(values, (pd.Series, pd.Index, pd.Categorical, np.ndarray)):
+        return values
+    return np.array(list(values), dtype=object)
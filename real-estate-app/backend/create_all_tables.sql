@@ -4,6 +4,7 @@
 CREATE TABLE IF NOT EXISTS cities (
     id VARCHAR(255) PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
+    name_normalized VARCHAR(100), -- заповнюється застосунком (models.normalize_name)
     region VARCHAR(100) NOT NULL,
     latitude DECIMAL(10, 8) NOT NULL,
     longitude DECIMAL(11, 8) NOT NULL,
@@ -14,6 +15,7 @@ CREATE TABLE IF NOT EXISTS cities (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
 
     INDEX idx_cities_name (name),
+    INDEX idx_cities_name_normalized (name_normalized),
     INDEX idx_cities_coordinates (latitude, longitude)
 );
 
@@ -22,6 +24,7 @@ CREATE TABLE IF NOT EXISTS districts (
     id VARCHAR(255) PRIMARY KEY,
     city_id VARCHAR(255) NOT NULL REFERENCES cities(id) ON DELETE CASCADE,
     name VARCHAR(100) NOT NULL,
+    name_normalized VARCHAR(100), -- заповнюється застосунком (models.normalize_name)
     type VARCHAR(20) NOT NULL DEFAULT 'district', -- 'district', 'microdistrict', 'neighborhood'
     latitude DECIMAL(10, 8),
     longitude DECIMAL(11, 8),
@@ -30,6 +33,8 @@ CREATE TABLE IF NOT EXISTS districts (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
     INDEX idx_districts_city_name (city_id, name),
+    INDEX idx_districts_city_name_normalized (city_id, name_normalized),
+    INDEX idx_districts_name_normalized (name_normalized),
     INDEX idx_districts_coordinates (latitude, longitude),
     INDEX idx_districts_city_type (city_id, type)
 );
@@ -113,6 +118,8 @@ CREATE INDEX IF NOT EXISTS idx_listings_condition ON property_listings(condition
 CREATE INDEX IF NOT EXISTS idx_listings_price_per_sqm ON property_listings(price_per_sqm);
 CREATE INDEX IF NOT EXISTS idx_listings_active_created ON property_listings(is_active, created_at);
 CREATE INDEX IF NOT EXISTS idx_listings_source ON property_listings(source);
+CREATE INDEX IF NOT EXISTS idx_listings_updated_at ON property_listings(updated_at);
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen_at ON property_listings(last_seen_at);
 
 -- Складений індекс для KNN алгоритму
 CREATE INDEX IF NOT EXISTS idx_knn_similarity ON property_listings(
@@ -147,6 +154,21 @@ CREATE TABLE IF NOT EXISTS market_stats (
     UNIQUE KEY unique_stats_date (city_id, district_id, date)
 );
 
+-- Кеш результатів геокодування (migration_geocoding.py)
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    address_key VARCHAR(500) NOT NULL, -- нормалізована адреса
+    city_key VARCHAR(100) NOT NULL,
+    query VARCHAR(500),
+    latitude DECIMAL(10, 8), -- NULL - адресу не знайдено
+    longitude DECIMAL(11, 8),
+    provider VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    UNIQUE KEY idx_geocode_cache_key (address_key, city_key)
+);
+
 -- 6. Вставка базових даних для Харкова
 
 -- Додаємо місто Харків
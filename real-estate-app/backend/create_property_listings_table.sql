@@ -102,6 +102,10 @@ CREATE INDEX IF NOT EXISTS idx_knn_similarity ON property_listings(
 -- Індекс для пошуку по джерелу
 CREATE INDEX IF NOT EXISTS idx_listings_source ON property_listings(source);
 
+-- Індекси для інкрементального оновлення знімка оголошень (watermark)
+CREATE INDEX IF NOT EXISTS idx_listings_updated_at ON property_listings(updated_at);
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen_at ON property_listings(last_seen_at);
+
 -- Індекс для пошуку дублікатів по external_id
 CREATE UNIQUE INDEX IF NOT EXISTS idx_listings_external_id ON property_listings(external_id);
 
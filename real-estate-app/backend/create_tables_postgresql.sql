@@ -5,6 +5,7 @@
 CREATE TABLE IF NOT EXISTS cities (
     id VARCHAR(255) PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
+    name_normalized VARCHAR(100), -- заповнюється застосунком (models.normalize_name)
     region VARCHAR(100) NOT NULL,
     latitude NUMERIC(10, 8) NOT NULL,
     longitude NUMERIC(11, 8) NOT NULL,
@@ -20,6 +21,7 @@ CREATE TABLE IF NOT EXISTS districts (
     id VARCHAR(255) PRIMARY KEY,
     city_id VARCHAR(255) NOT NULL REFERENCES cities(id) ON DELETE CASCADE,
     name VARCHAR(100) NOT NULL,
+    name_normalized VARCHAR(100), -- заповнюється застосунком (models.normalize_name)
     type VARCHAR(20) NOT NULL DEFAULT 'district',
     latitude NUMERIC(10, 8),
     longitude NUMERIC(11, 8),
@@ -118,14 +120,30 @@ CREATE TABLE IF NOT EXISTS market_stats (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Кеш результатів геокодування (migration_geocoding.py)
+CREATE TABLE IF NOT EXISTS geocode_cache (
+    id SERIAL PRIMARY KEY,
+    address_key VARCHAR(500) NOT NULL, -- нормалізована адреса
+    city_key VARCHAR(100) NOT NULL,
+    query VARCHAR(500),
+    latitude NUMERIC(10, 8), -- NULL - адресу не знайдено
+    longitude NUMERIC(11, 8),
+    provider VARCHAR(50),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- 5. Створюємо індекси для PostgreSQL
 
 -- Індекси для таблиці міст
 CREATE INDEX IF NOT EXISTS idx_cities_name ON cities(name);
+CREATE INDEX IF NOT EXISTS idx_cities_name_normalized ON cities(name_normalized);
 CREATE INDEX IF NOT EXISTS idx_cities_coordinates ON cities(latitude, longitude);
 
 -- Індекси для таблиці районів
 CREATE INDEX IF NOT EXISTS idx_districts_city_name ON districts(city_id, name);
+CREATE INDEX IF NOT EXISTS idx_districts_city_name_normalized ON districts(city_id, name_normalized);
+CREATE INDEX IF NOT EXISTS idx_districts_name_normalized ON districts(name_normalized);
 CREATE INDEX IF NOT EXISTS idx_districts_coordinates ON districts(latitude, longitude);
 CREATE INDEX IF NOT EXISTS idx_districts_city_type ON districts(city_id, type);
 
@@ -140,6 +158,8 @@ CREATE INDEX IF NOT EXISTS idx_listings_condition ON property_listings(condition
 CREATE INDEX IF NOT EXISTS idx_listings_price_per_sqm ON property_listings(price_per_sqm);
 CREATE INDEX IF NOT EXISTS idx_listings_active_created ON property_listings(is_active, created_at);
 CREATE INDEX IF NOT EXISTS idx_listings_source ON property_listings(source);
+CREATE INDEX IF NOT EXISTS idx_listings_updated_at ON property_listings(updated_at);
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen_at ON property_listings(last_seen_at);
 
 -- Складений індекс для KNN алгоритму (основні фактори схожості)
 CREATE INDEX IF NOT EXISTS idx_knn_similarity ON property_listings(
@@ -150,6 +170,7 @@ CREATE INDEX IF NOT EXISTS idx_knn_similarity ON property_listings(
 CREATE INDEX IF NOT EXISTS idx_stats_city_date ON market_stats(city_id, date);
 CREATE INDEX IF NOT EXISTS idx_stats_district_date ON market_stats(district_id, date);
 CREATE UNIQUE INDEX IF NOT EXISTS unique_stats_date ON market_stats(city_id, district_id, date);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_geocode_cache_key ON geocode_cache(address_key, city_key);
 
 -- 6. Функція для автоматичного оновлення updated_at (PostgreSQL специфічна)
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -5,6 +5,7 @@
 CREATE TABLE IF NOT EXISTS cities (
     id TEXT PRIMARY KEY,
     name TEXT NOT NULL,
+    name_normalized TEXT, -- заповнюється застосунком (models.normalize_name)
     region TEXT NOT NULL,
     latitude REAL NOT NULL,
     longitude REAL NOT NULL,
@@ -20,6 +21,7 @@ CREATE TABLE IF NOT EXISTS districts (
     id TEXT PRIMARY KEY,
     city_id TEXT NOT NULL REFERENCES cities(id) ON DELETE CASCADE,
     name TEXT NOT NULL,
+    name_normalized TEXT, -- заповнюється застосунком (models.normalize_name)
     type TEXT NOT NULL DEFAULT 'district',
     latitude REAL,
     longitude REAL,
@@ -126,6 +128,10 @@ CREATE INDEX IF NOT EXISTS idx_listings_active_created ON property_listings(is_a
 -- Індекс для пошуку по джерелу
 CREATE INDEX IF NOT EXISTS idx_listings_source ON property_listings(source);
 
+-- Індекси для інкрементального оновлення знімка оголошень (watermark)
+CREATE INDEX IF NOT EXISTS idx_listings_updated_at ON property_listings(updated_at);
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen_at ON property_listings(last_seen_at);
+
 -- Складений індекс для KNN алгоритму (основні фактори схожості)
 CREATE INDEX IF NOT EXISTS idx_knn_similarity ON property_listings(
     city_id, district_id, building_type, rooms, area_total, year_built, condition
@@ -133,8 +139,11 @@ CREATE INDEX IF NOT EXISTS idx_knn_similarity ON property_listings(
 
 -- Індекси для таблиць cities та districts
 CREATE INDEX IF NOT EXISTS idx_cities_name ON cities(name);
+CREATE INDEX IF NOT EXISTS idx_cities_name_normalized ON cities(name_normalized);
 CREATE INDEX IF NOT EXISTS idx_cities_coordinates ON cities(latitude, longitude);
 CREATE INDEX IF NOT EXISTS idx_districts_city_name ON districts(city_id, name);
+CREATE INDEX IF NOT EXISTS idx_districts_city_name_normalized ON districts(city_id, name_normalized);
+CREATE INDEX IF NOT EXISTS idx_districts_name_normalized ON districts(name_normalized);
 CREATE INDEX IF NOT EXISTS idx_districts_coordinates ON districts(latitude, longitude);
 
 -- 5. Вставка базових даних для тестування
@@ -5,13 +5,15 @@ KNN-based valuation system for real estate pricing
 
 import logging
 import math
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import numpy as np
 
 from database import DatabaseManager
-from models import PropertyListing, City, District
+from listing_snapshot import ListingSnapshotCache, ListingRow
+from batch_valuation import iter_similar_properties
+from similarity_engine import SimilarityKernel, flat_distance_km, top_k_indices
 
 logger = logging.getLogger(__name__)
 
@@ -52,10 +54,18 @@ class SimilarityWeights:
 class KNNValuator:
     """Алгоритм оцінки на основі K найближчих сусідів"""
 
-    def __init__(self, db_manager: DatabaseManager, k: int = 10):
+    def __init__(self, db_manager: DatabaseManager, k: int = 10,
+                 snapshot_cache: Optional[ListingSnapshotCache] = None):
         self.db_manager = db_manager
         self.k = k
         self.weights = SimilarityWeights()
+        self.kernel = SimilarityKernel(self.weights, distance_fn=flat_distance_km)
+        self.snapshot_cache = snapshot_cache or ListingSnapshotCache(db_manager)
+
+        # Просторовий префільтр: спочатку кандидати в радіусі location_distance,
+        # радіус розширюється, якщо їх менше ніж limit * spatial_candidates_factor
+        self.search_radii_km = (10.0, 20.0, 40.0)
+        self.spatial_candidates_factor = 5
         self.city_centers = {
             'харків': (49.9935, 36.2304),
             'київ': (50.4501, 30.5234),
@@ -208,78 +218,37 @@ class KNNValuator:
 
         return distance_km
 
-    def find_similar_properties(self, target_property: Dict[str, Any], limit: int = None) -> List[Tuple[PropertyListing, float]]:
+    def find_similar_properties(self, target_property: Dict[str, Any], limit: int = None) -> List[Tuple[ListingRow, float]]:
         """
         Знаходить схожі об'єкти нерухомості в базі даних
-        Повертає список (об'єкт, score_схожості) відсортований за score
+        Повертає список (рядок знімка, score_схожості) відсортований за score
         """
         if limit is None:
             limit = self.k
 
         try:
-            with self.db_manager.get_session() as session:
-                # Отримуємо активні оголошення
-                query = session.query(PropertyListing).filter(
-                    PropertyListing.is_active == True,
-                    PropertyListing.price_uah > 0,
-                    PropertyListing.area_total > 0
-                )
-
-                # Фільтр по місту (якщо вказано)
-                if target_property.get('city'):
-                    city_obj = session.query(City).filter(
-                        City.name.ilike(f"%{target_property['city']}%")
-                    ).first()
-                    if city_obj:
-                        query = query.filter(PropertyListing.city_id == city_obj.id)
-
-                # Фільтр по району (якщо вказано)
-                if target_property.get('district'):
-                    district_obj = session.query(District).filter(
-                        District.name.ilike(f"%{target_property['district']}%")
-                    ).first()
-                    if district_obj:
-                        query = query.filter(PropertyListing.district_id == district_obj.id)
-
-                properties = query.all()
-
-                # Обчислюємо схожість для кожного об'єкта
-                similarities = []
-
-                for prop in properties:
-                    # Конвертуємо PropertyListing в словник для порівняння
-                    prop_dict = {
-                        'city': prop.city.name if prop.city else '',
-                        'district': prop.district.name if prop.district else '',
-                        'area_total': prop.area_total,
-                        'rooms': prop.rooms,
-                        'floor': prop.floor,
-                        'total_floors': prop.total_floors,
-                        'building_type': prop.building_type,
-                        'year_built': prop.year_built,
-                        'condition': prop.condition,
-                        'has_balcony': prop.has_balcony,
-                        'has_elevator': prop.has_elevator,
-                        'heating': prop.heating,
-                        'latitude': prop.latitude,
-                        'longitude': prop.longitude,
-                        'distance_to_center': prop.distance_to_center,
-                        'floor_category': prop.floor_category,
-                        'developer': prop.developer,
-                        'building_series': prop.building_series
-                    }
-
-                    # Обчислюємо score схожості
-                    similarity = self.calculate_similarity_score(target_property, prop_dict)
-
-                    # Виключаємо сам об'єкт, якщо він вже є в базі
-                    if target_property.get('id') != prop.id:
-                        similarities.append((prop, similarity))
-
-                # Сортуємо за схожістю (спадання)
-                similarities.sort(key=lambda x: x[1], reverse=True)
-
-                return similarities[:limit]
+            # Фільтр по місту та району (якщо вказано)
+            city_id, district_id = self.snapshot_cache.resolve_location(
+                target_property.get('city'), target_property.get('district')
+            )
+            snapshot = self.snapshot_cache.get(city_id)
+
+            # Виключаємо сам об'єкт, якщо він вже є в базі
+            candidates = snapshot.candidates(district_id, exclude_id=target_property.get('id'))
+
+            # Далекі оголошення відсікаємо сітковим індексом до підрахунку score
+            candidates = snapshot.nearby_candidates(
+                candidates, target_property.get('latitude'), target_property.get('longitude'),
+                limit * self.spatial_candidates_factor, self.search_radii_km
+            )
+
+            # Обчислюємо схожість для всіх кандидатів одразу
+            scores = self.kernel.score(target_property, snapshot.matrix.take(candidates))
+
+            return [
+                (snapshot.listings[candidates[i]], float(scores[i]))
+                for i in top_k_indices(scores, limit)
+            ]
 
         except Exception as e:
             logger.error(f"Помилка пошуку схожих об'єктів: {e}")
@@ -295,6 +264,23 @@ class KNNValuator:
         # Знаходимо схожі об'єкти
         similar_properties = self.find_similar_properties(target_property, k)
 
+        return self._estimate_from_similar(similar_properties, k)
+
+    def estimate_price_batch(self, target_properties: Iterable[Dict[str, Any]],
+                             k: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Оцінює вартість багатьох об'єктів за один виклик.
+        Генератор повертає результати estimate_price у порядку вхідних
+        об'єктів з доданим 'id' цілі
+        """
+        if k is None:
+            k = self.k
+
+        for target_property, similar_properties in iter_similar_properties(self, target_properties, k):
+            yield {'id': target_property.get('id'), **self._estimate_from_similar(similar_properties, k)}
+
+    def _estimate_from_similar(self, similar_properties: List[Tuple[ListingRow, float]], k: int) -> Dict[str, Any]:
+        """Зважена оцінка ціни за знайденими схожими об'єктами"""
         if not similar_properties:
             return {
                 'error': 'Не знайдено схожих об\'єктів для оцінки',
@@ -319,8 +305,8 @@ class KNNValuator:
                     'rooms': prop.rooms,
                     'address': prop.address,
                     'similarity': similarity,
-                    'city': prop.city.name if prop.city else None,
-                    'district': prop.district.name if prop.district else None,
+                    'city': prop.city,
+                    'district': prop.district,
                     'building_type': prop.building_type,
                     'year_built': prop.year_built
                 })
@@ -375,44 +361,10 @@ class KNNValuator:
     def get_market_stats(self, city: str = None, district: str = None) -> Dict[str, Any]:
         """Отримує статистику ринку для оцінки"""
         try:
-            with self.db_manager.get_session() as session:
-                query = session.query(PropertyListing).filter(
-                    PropertyListing.is_active == True,
-                    PropertyListing.price_uah > 0,
-                    PropertyListing.area_total > 0
-                )
-
-                if city:
-                    city_obj = session.query(City).filter(
-                        City.name.ilike(f"%{city}%")
-                    ).first()
-                    if city_obj:
-                        query = query.filter(PropertyListing.city_id == city_obj.id)
-
-                if district:
-                    district_obj = session.query(District).filter(
-                        District.name.ilike(f"%{district}%")
-                    ).first()
-                    if district_obj:
-                        query = query.filter(PropertyListing.district_id == district_obj.id)
-
-                properties = query.all()
-
-                if not properties:
-                    return {}
-
-                prices = [p.price_uah for p in properties]
-                areas = [p.area_total for p in properties]
-
-                return {
-                    'total_listings': len(properties),
-                    'avg_price': int(sum(prices) / len(prices)),
-                    'median_price': int(sorted(prices)[len(prices) // 2]),
-                    'avg_price_per_sqm': int((sum(prices) / sum(areas))),
-                    'min_price': min(prices),
-                    'max_price': max(prices),
-                    'price_std': int(np.std(prices)) if len(prices) > 1 else 0
-                }
+            city_id, district_id = self.snapshot_cache.resolve_location(city, district)
+            snapshot = self.snapshot_cache.get(city_id)
+
+            return snapshot.market_stats(snapshot.candidates(district_id))
 
         except Exception as e:
             logger.error(f"Помилка отримання статистики: {e}")
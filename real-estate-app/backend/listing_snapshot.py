@@ -0,0 +1,493 @@
+"""
+Резидентний знімок активних оголошень для KNN оцінки
+Тримає в пам'яті колонкові масиви оголошень кожного міста та оновлює їх
+інкрементально за watermark updated_at/last_seen_at замість повного
+перезавантаження таблиці property_listings на кожен запит
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_
+
+from database import DatabaseManager
+from models import PropertyListing, City, District, normalize_name
+from similarity_engine import FeatureMatrix, NUMERIC_COLUMNS, CATEGORY_COLUMNS
+from spatial_index import GridIndex, radius_prefilter
+
+logger = logging.getLogger(__name__)
+
+# Поля оголошення, що напряму читаються з колонок property_listings
+LISTING_COLUMNS = ['district_id', 'price_uah', 'address'] + NUMERIC_COLUMNS + [
+    field for field in CATEGORY_COLUMNS if field not in ('city', 'district')
+]
+
+# Легкий рядок знімка замість ORM об'єкта PropertyListing
+# (city та district - назви, а не зв'язки)
+ListingRow = namedtuple('ListingRow', ['id', 'city', 'district'] + LISTING_COLUMNS)
+
+
+class ListingSnapshot:
+    """
+    Незмінний знімок активних оголошень одного міста.
+    Оновлення створює новий знімок, тому читачі, які вже отримали
+    посилання на старий, працюють з узгодженими масивами. Виняток -
+    службові поля refreshed_at та watermark: оновлення без змін даних лише
+    зсуває їх у тому самому знімку (під блокуванням міста в кеші), щоб не
+    збільшувати покоління кешу; читачі їх не використовують
+    """
+
+    # Частка видалених рядків, після якої знімок ущільнюється
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, city_id: Optional[str], listings: List[ListingRow], matrix: FeatureMatrix,
+                 alive: np.ndarray, watermark: Optional[datetime], loaded_at: float, version: int = 1):
+        self.city_id = city_id
+        self.listings = listings
+        self.matrix = matrix
+        self.alive = alive
+        self.watermark = watermark
+        self.loaded_at = loaded_at
+        self.refreshed_at = loaded_at
+        self.version = version
+
+        self.prices = np.fromiter((row.price_uah for row in listings), dtype=np.int64, count=len(listings))
+        self.district_ids = np.asarray([row.district_id for row in listings], dtype=object)
+        self.positions = {row.id: i for i, row in enumerate(listings) if alive[i]}
+        self._spatial_index: Optional[GridIndex] = None
+
+    @classmethod
+    def build(cls, city_id: Optional[str], listings: List[ListingRow], watermark: Optional[datetime],
+              loaded_at: float, version: int = 1) -> 'ListingSnapshot':
+        """Будує знімок зі списку рядків"""
+        matrix = FeatureMatrix.from_columns(_rows_to_columns(listings))
+        alive = np.ones(len(listings), dtype=bool)
+        return cls(city_id, listings, matrix, alive, watermark, loaded_at, version)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def candidates(self, district_id: Optional[str] = None, exclude_id: Optional[str] = None) -> np.ndarray:
+        """Повертає індекси активних рядків (опційно в межах району)"""
+        mask = self.alive.copy()
+        if district_id is not None:
+            mask &= self.district_ids == district_id
+        if exclude_id is not None and exclude_id in self.positions:
+            mask[self.positions[exclude_id]] = False
+        return np.flatnonzero(mask)
+
+    @property
+    def spatial_index(self) -> GridIndex:
+        """
+        Сітковий індекс координат, будується при першому зверненні.
+        Знімок незмінний, тож індекс завжди відповідає його рядкам: нові
+        оголошення потрапляють у індекс нового знімка, а деактивовані
+        відсікаються маскою alive в candidates
+        """
+        if self._spatial_index is None:
+            self._spatial_index = GridIndex(self.matrix.numeric['latitude'], self.matrix.numeric['longitude'])
+        return self._spatial_index
+
+    def nearby_candidates(self, candidates: np.ndarray, latitude: Optional[float], longitude: Optional[float],
+                          min_count: int, radii_km: Tuple[float, ...]) -> np.ndarray:
+        """Звужує кандидатів до найближчого радіусу з radii_km, де їх щонайменше min_count"""
+        return radius_prefilter(self.spatial_index, candidates, latitude, longitude, min_count, radii_km)
+
+    def apply_changes(self, changed: List[Tuple[ListingRow, bool]], watermark: Optional[datetime],
+                      now: float) -> 'ListingSnapshot':
+        """
+        Повертає новий знімок зі змінами: changed - пари (рядок, чи валідний).
+        Старі версії змінених рядків позначаються видаленими, валідні
+        додаються в кінець масивів
+        """
+        alive = self.alive.copy()
+        fresh = []
+        for row, is_valid in changed:
+            position = self.positions.get(row.id)
+            if position is not None:
+                alive[position] = False
+            if is_valid:
+                fresh.append(row)
+
+        listings = self.listings + fresh
+        matrix = self.matrix.concat(
+            FeatureMatrix.from_columns(_rows_to_columns(fresh), self.matrix.vocabularies)
+        )
+        alive = np.concatenate([alive, np.ones(len(fresh), dtype=bool)])
+
+        # Ущільнюємо, якщо накопичилось багато видалених рядків
+        if len(alive) and (~alive).sum() > self.COMPACT_RATIO * len(alive):
+            keep = np.flatnonzero(alive)
+            listings = [listings[i] for i in keep]
+            matrix = matrix.take(keep)
+            alive = np.ones(len(keep), dtype=bool)
+
+        snapshot = ListingSnapshot(self.city_id, listings, matrix, alive,
+                                   watermark or self.watermark, self.loaded_at, self.version + 1)
+        snapshot.refreshed_at = now
+        return snapshot
+
+    def market_stats(self, indices: np.ndarray) -> Dict[str, Any]:
+        """Статистика цін для вибраних рядків"""
+        if len(indices) == 0:
+            return {}
+
+        prices = self.prices[indices]
+        areas = self.matrix.numeric['area_total'][indices]
+
+        return {
+            'total_listings': len(prices),
+            'avg_price': int(prices.sum() / len(prices)),
+            'median_price': int(np.partition(prices, len(prices) // 2)[len(prices) // 2]),
+            'avg_price_per_sqm': int(prices.sum() / areas.sum()),
+            'min_price': int(prices.min()),
+            'max_price': int(prices.max()),
+            'price_std': int(np.std(prices)) if len(prices) > 1 else 0
+        }
+
+
+def _rows_to_columns(rows: List[ListingRow]) -> Dict[str, List[Any]]:
+    """Перетворює рядки знімка в колонки для FeatureMatrix"""
+    return {field: [getattr(row, field) for row in rows] for field in ListingRow._fields}
+
+
+def _is_valid(row: ListingRow, is_active: bool) -> bool:
+    """Чи підходить оголошення для оцінки (ті ж умови, що й у запитах KNN)"""
+    return bool(is_active) and (row.price_uah or 0) > 0 and (row.area_total or 0) > 0
+
+
+class ListingSnapshotCache:
+    """
+    Кеш знімків оголошень по містах з інкрементальним оновленням.
+    refresh_interval - як часто (секунд) дозавантажувати зміни за watermark,
+    full_reload_interval - як часто повністю перечитувати місто (підхоплює
+    фізично видалені рядки), max_location_misses - скільки невідомих назв
+    міст і районів пам'ятати
+    """
+
+    def __init__(self, db_manager: DatabaseManager, refresh_interval: float = 30.0,
+                 full_reload_interval: float = 3600.0, max_location_misses: int = 1000):
+        self.db_manager = db_manager
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        self.max_location_misses = max_location_misses
+
+        self._snapshots: Dict[Optional[str], ListingSnapshot] = {}
+        self._locks: Dict[Optional[str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        # Зростає з кожною новою версією будь-якого знімка та з invalidate -
+        # дешева перевірка актуальності для кешів поверх знімків
+        self.generation = 0
+
+        # Нормалізована назва -> id; ключ району - (city_id, назва), (None,
+        # назва) - район за назвою серед усіх міст (None - назва неоднозначна).
+        # Невідомі назви - окремо, LRU з межею max_location_misses
+        self._city_ids: Dict[str, Optional[str]] = {}
+        self._district_ids: Dict[Tuple[Optional[str], str], Optional[str]] = {}
+        self._location_misses: 'OrderedDict[Tuple, None]' = OrderedDict()
+        self._locations_loaded_at = float('-inf')
+        self._locations_ready = False
+        # Словники - під _locations_lock, запити до БД - поза ним
+        self._locations_lock = threading.Lock()
+        self._locations_reload_lock = threading.Lock()
+
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'incremental_refreshes': 0,
+            'full_reloads': 0,
+            'rows_refreshed': 0,
+            'location_reloads': 0,
+            'location_misses': 0,
+        }
+
+    def resolve_location(self, city: Optional[str] = None,
+                         district: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Повертає (city_id, district_id) за точним збігом нормалізованих назв.
+        Довідник міст і районів тримається в пам'яті (повне перечитування
+        разом зі знімками); назви, яких у ньому немає, шукаються за
+        індексованими колонками name_normalized і теж запам'ятовуються.
+        Район без міста визначається, лише якщо назва однозначна
+        """
+        city_key, district_key = normalize_name(city), normalize_name(district)
+        self._ensure_locations()
+
+        city_id = self._lookup_city(city_key) if city_key else None
+        district_id = self._lookup_district(city_id, district_key) if district_key else None
+        return city_id, district_id
+
+    def _ensure_locations(self):
+        """
+        Перечитує довідник, якщо він застарів. Поки один потік перечитує,
+        решта користуються попередньою версією (чекають лише до першого
+        завантаження)
+        """
+        if time.monotonic() - self._locations_loaded_at < self.full_reload_interval:
+            return
+        if not self._locations_reload_lock.acquire(blocking=not self._locations_ready):
+            return
+        try:
+            now = time.monotonic()
+            if now - self._locations_loaded_at >= self.full_reload_interval:
+                self._load_locations(now)
+        finally:
+            self._locations_reload_lock.release()
+
+    def _load_locations(self, now: float):
+        """Довідник міст і районів одним запитом"""
+        with self.db_manager.get_session() as session:
+            rows = session.query(
+                City.id.label('city_id'), City.name.label('city_name'),
+                City.name_normalized.label('city_key'),
+                District.id.label('district_id'), District.name.label('district_name'),
+                District.name_normalized.label('district_key'),
+            ).outerjoin(District, District.city_id == City.id).all()
+
+        city_ids: Dict[str, Optional[str]] = {}
+        district_ids: Dict[Tuple[Optional[str], str], Optional[str]] = {}
+        by_name: Dict[str, set] = {}
+        for row in rows:
+            # Рядки, додані в обхід ORM, можуть не мати name_normalized
+            city_ids.setdefault(row.city_key or normalize_name(row.city_name), row.city_id)
+            if row.district_id is not None:
+                district_key = row.district_key or normalize_name(row.district_name)
+                district_ids.setdefault((row.city_id, district_key), row.district_id)
+                by_name.setdefault(district_key, set()).add(row.district_id)
+
+        for district_key, ids in by_name.items():
+            district_ids[(None, district_key)] = next(iter(ids)) if len(ids) == 1 else None
+
+        with self._locations_lock:
+            self._city_ids = city_ids
+            self._district_ids = district_ids
+            self._location_misses.clear()
+            self._locations_loaded_at = now
+            self._locations_ready = True
+            self.counters['location_reloads'] += 1
+
+    def _lookup_city(self, city_key: str) -> Optional[str]:
+        with self._locations_lock:
+            if city_key in self._city_ids:
+                return self._city_ids[city_key]
+            if self._is_known_miss(('city', city_key)):
+                return None
+
+        with self.db_manager.get_session() as session:
+            row = session.query(City.id).filter(City.name_normalized == city_key).first()
+
+        with self._locations_lock:
+            self.counters['location_misses'] += 1
+            if row is None:
+                self._remember_miss(('city', city_key))
+                return None
+            self._city_ids[city_key] = row.id
+            return row.id
+
+    def _lookup_district(self, city_id: Optional[str], district_key: str) -> Optional[str]:
+        key = (city_id, district_key)
+        with self._locations_lock:
+            if key in self._district_ids:
+                return self._district_ids[key]
+            if self._is_known_miss(('district',) + key):
+                return None
+
+        with self.db_manager.get_session() as session:
+            query = session.query(District.id).filter(District.name_normalized == district_key)
+            if city_id is not None:
+                query = query.filter(District.city_id == city_id)
+            ids = [row.id for row in query.limit(2)]
+
+        with self._locations_lock:
+            self.counters['location_misses'] += 1
+            if not ids:
+                self._remember_miss(('district',) + key)
+                return None
+            # Неоднозначна назва - реальні рядки, їх кількість обмежена таблицею
+            self._district_ids[key] = ids[0] if len(ids) == 1 else None
+            return self._district_ids[key]
+
+    def _is_known_miss(self, key: Tuple) -> bool:
+        """Чи відомо, що назви немає (під _locations_lock)"""
+        if key not in self._location_misses:
+            return False
+        self._location_misses.move_to_end(key)
+        return True
+
+    def _remember_miss(self, key: Tuple):
+        """Запам'ятовує невідому назву, витісняючи найдавнішу (під _locations_lock)"""
+        self._location_misses[key] = None
+        self._location_misses.move_to_end(key)
+        while len(self._location_misses) > self.max_location_misses:
+            self._location_misses.popitem(last=False)
+
+    def get(self, city_id: Optional[str] = None) -> ListingSnapshot:
+        """Повертає актуальний знімок міста (None - всі міста)"""
+        with self._locks_guard:
+            lock = self._locks.setdefault(city_id, threading.Lock())
+
+        with lock:
+            now = time.monotonic()
+            snapshot = self._snapshots.get(city_id)
+
+            if snapshot is None or now - snapshot.loaded_at >= self.full_reload_interval:
+                self.counters['misses'] += 1
+                snapshot = self._load(city_id, now, snapshot)
+            else:
+                self.counters['hits'] += 1
+                if now - snapshot.refreshed_at >= self.refresh_interval:
+                    snapshot = self._refresh(snapshot, now)
+
+            if self._snapshots.get(city_id) is not snapshot:
+                self._snapshots[city_id] = snapshot
+                self.generation += 1
+            return snapshot
+
+    def invalidate(self, city_id: Optional[str] = None):
+        """Примусово оновлює знімки (без city_id - і довідник назв) при наступному зверненні"""
+        with self._locks_guard:
+            for key, snapshot in self._snapshots.items():
+                if city_id is None or key in (city_id, None):
+                    snapshot.refreshed_at = float('-inf')
+            if city_id is None:
+                self._locations_loaded_at = float('-inf')
+            self.generation += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Лічильники кешу та стан знімків"""
+        now = time.monotonic()
+        return {
+            **self.counters,
+            'generation': self.generation,
+            'locations': {
+                'cities': len(self._city_ids),
+                'districts': len(self._district_ids),
+                'misses': len(self._location_misses),
+            },
+            'snapshots': {
+                str(city_id): {
+                    'rows': len(snapshot),
+                    'version': snapshot.version,
+                    'staleness_seconds': round(now - snapshot.refreshed_at, 3),
+                    'watermark': snapshot.watermark.isoformat() if snapshot.watermark else None,
+                }
+                for city_id, snapshot in list(self._snapshots.items())
+            }
+        }
+
+    def _query(self, session, city_id: Optional[str]):
+        """Запит з проекцією колонок та назвами міста і району"""
+        query = session.query(
+            PropertyListing.id,
+            City.name,
+            District.name,
+            *[getattr(PropertyListing, field) for field in LISTING_COLUMNS],
+            PropertyListing.is_active,
+            PropertyListing.updated_at,
+            PropertyListing.last_seen_at,
+            PropertyListing.city_id
+        ).outerjoin(
+            City, City.id == PropertyListing.city_id
+        ).outerjoin(
+            District, District.id == PropertyListing.district_id
+        )
+
+        if city_id is not None:
+            query = query.filter(PropertyListing.city_id == city_id)
+
+        return query
+
+    def _fetch(self, query) -> Tuple[List[Tuple[ListingRow, bool, Optional[str]]], Optional[datetime]]:
+        """Виконує запит і повертає трійки (рядок, чи валідний, city_id) та новий watermark"""
+        rows = []
+        watermark = None
+        size = len(ListingRow._fields)
+
+        for record in query:
+            row = ListingRow(*record[:size])
+            is_active, updated_at, last_seen_at, city_id = record[size:]
+            rows.append((row, _is_valid(row, is_active), city_id))
+
+            for timestamp in (updated_at, last_seen_at):
+                if timestamp and (watermark is None or timestamp > watermark):
+                    watermark = timestamp
+
+        return rows, watermark
+
+    def _load(self, city_id: Optional[str], now: float,
+              previous: Optional[ListingSnapshot]) -> ListingSnapshot:
+        """Повне завантаження активних оголошень міста"""
+        with self.db_manager.get_session() as session:
+            query = self._query(session, city_id).filter(
+                PropertyListing.is_active == True,
+                PropertyListing.price_uah > 0,
+                PropertyListing.area_total > 0
+            )
+            rows, watermark = self._fetch(query)
+
+        self.counters['full_reloads'] += 1
+        logger.info(f"Завантажено знімок {len(rows)} оголошень для міста {city_id}")
+
+        version = previous.version + 1 if previous else 1
+        return ListingSnapshot.build(city_id, [row for row, _, _ in rows], watermark, now, version)
+
+    def _refresh(self, snapshot: ListingSnapshot, now: float) -> ListingSnapshot:
+        """Дозавантажує оголошення, змінені після watermark знімка"""
+        if snapshot.watermark is None:
+            return self._load(snapshot.city_id, now, snapshot)
+
+        with self.db_manager.get_session() as session:
+            # >= щоб не пропустити рядки з тим самим часом, що й watermark;
+            # повторне застосування рядка ідемпотентне
+            changed_since = or_(
+                PropertyListing.updated_at >= snapshot.watermark,
+                PropertyListing.last_seen_at >= snapshot.watermark
+            )
+            query = self._query(session, None)
+            if snapshot.city_id is None:
+                query = query.filter(changed_since)
+            else:
+                # Оголошення, перенесені в інше місто, теж приходять (зі
+                # зсунутим updated_at), щоб прибрати їх зі знімка цього міста
+                query = query.filter(or_(
+                    and_(PropertyListing.city_id == snapshot.city_id, changed_since),
+                    and_(or_(PropertyListing.city_id.is_(None), PropertyListing.city_id != snapshot.city_id),
+                         PropertyListing.updated_at >= snapshot.watermark)
+                ))
+            fetched, watermark = self._fetch(query)
+
+        self.counters['incremental_refreshes'] += 1
+
+        changed = []
+        for row, is_valid, city_id in fetched:
+            if snapshot.city_id is not None and city_id != snapshot.city_id:
+                if row.id not in snapshot.positions:
+                    continue
+                is_valid = False
+            # Рядки на межі watermark приходять повторно - пропускаємо ті,
+            # що не змінюють знімок
+            if not self._is_unchanged(snapshot, row, is_valid):
+                changed.append((row, is_valid))
+        if not changed:
+            # Службові поля знімка, дані не змінюються (див. ListingSnapshot)
+            snapshot.refreshed_at = now
+            if watermark and watermark > snapshot.watermark:
+                snapshot.watermark = watermark
+            return snapshot
+
+        self.counters['rows_refreshed'] += len(changed)
+        return snapshot.apply_changes(changed, watermark, now)
+
+    @staticmethod
+    def _is_unchanged(snapshot: ListingSnapshot, row: ListingRow, is_valid: bool) -> bool:
+        """Чи збігається рядок з тим, що вже є у знімку"""
+        position = snapshot.positions.get(row.id)
+        if position is None:
+            return not is_valid
+        return is_valid and snapshot.listings[position] == row
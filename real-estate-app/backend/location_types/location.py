@@ -1,11 +1,20 @@
 """
 Location types and data for Kharkiv city real estate
 Python equivalents of the TypeScript location definitions
+LOCATIONS - registry with dict indexes by id, normalized name and city
 """
 
-from typing import Dict, List, Optional, Any
+import os
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Any, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
+# Та сама нормалізація, що й у колонках name_normalized таблиць cities/districts
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'data-collection'))
+from location_names import normalize_name
+
 
 @dataclass
 class District:
@@ -198,6 +207,101 @@ KHARKIV_CITY = City(
 )
 
 
+class DistrictArrays(NamedTuple):
+    """Центри районів міста масивами (лише райони з координатами), лише для читання"""
+    ids: np.ndarray  # object
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+
+
+class LocationRegistry:
+    """
+    Реєстр міст і районів: індекси будуються один раз, пошук за id або
+    нормалізованою назвою - звернення до словника
+    """
+
+    def __init__(self, cities: Iterable[City] = ()):
+        self._cities: Dict[str, City] = {}
+        self._cities_by_name: Dict[str, City] = {}
+        self._districts: Dict[str, District] = {}
+        self._district_cities: Dict[str, City] = {}
+        self._districts_by_name: Dict[Tuple[str, str], District] = {}
+        self._district_names: Dict[str, List[str]] = {}
+        self._arrays: Dict[str, DistrictArrays] = {}
+
+        for city in cities:
+            self.add_city(city)
+
+    def add_city(self, city: City):
+        """Додає (або замінює) місто з його районами"""
+        previous = self._cities.get(city.id)
+        if previous is not None:
+            self._cities_by_name.pop(normalize_name(previous.name), None)
+            for district in previous.districts:
+                self._districts.pop(district.id, None)
+                self._district_cities.pop(district.id, None)
+                self._districts_by_name.pop((city.id, normalize_name(district.name)), None)
+
+        self._cities[city.id] = city
+        self._cities_by_name[normalize_name(city.name)] = city
+        for district in city.districts:
+            self._districts[district.id] = district
+            self._district_cities[district.id] = city
+            # При однакових назвах перемагає перший район (порядок у даних міста)
+            self._districts_by_name.setdefault((city.id, normalize_name(district.name)), district)
+        self._district_names[city.id] = [district.name for district in city.districts]
+
+        located = [district for district in city.districts if district.coordinates]
+        arrays = DistrictArrays(
+            np.array([district.id for district in located], dtype=object),
+            np.array([district.coordinates['latitude'] for district in located], dtype=np.float64),
+            np.array([district.coordinates['longitude'] for district in located], dtype=np.float64),
+        )
+        for array in arrays:
+            array.flags.writeable = False
+        self._arrays[city.id] = arrays
+
+    @property
+    def cities(self) -> List[City]:
+        return list(self._cities.values())
+
+    def city_names(self) -> List[str]:
+        return [city.name for city in self._cities.values()]
+
+    def get_city(self, city_id: str) -> Optional[City]:
+        return self._cities.get(city_id)
+
+    def city_by_name(self, name: Optional[str]) -> Optional[City]:
+        return self._cities_by_name.get(normalize_name(name))
+
+    def get_district(self, district_id: str) -> Optional[District]:
+        return self._districts.get(district_id)
+
+    def district_city(self, district_id: str) -> Optional[City]:
+        """Місто, до якого належить район"""
+        return self._district_cities.get(district_id)
+
+    def district_by_name(self, city_name: Optional[str], district_name: Optional[str]) -> Optional[District]:
+        city = self.city_by_name(city_name)
+        if city is None:
+            return None
+        return self._districts_by_name.get((city.id, normalize_name(district_name)))
+
+    def district_names(self, city_name: Optional[str]) -> List[str]:
+        """Назви районів міста (порожній список для невідомого міста)"""
+        city = self.city_by_name(city_name)
+        return list(self._district_names[city.id]) if city else []
+
+    def district_arrays(self, city_name: Optional[str]) -> Optional[DistrictArrays]:
+        """Центри районів міста масивами для векторних обчислень відстаней"""
+        city = self.city_by_name(city_name)
+        return self._arrays[city.id] if city else None
+
+
+# Реєстр усіх міст; нове місто - LOCATIONS.add_city(City(...))
+LOCATIONS = LocationRegistry([KHARKIV_CITY])
+
+
 # Допоміжні функції для роботи з геоданими Харкова
 def get_kharkiv_city() -> City:
     """Отримати дані про місто Харків"""
@@ -206,12 +310,12 @@ def get_kharkiv_city() -> City:
 
 def get_district_by_id(district_id: str) -> Optional[District]:
     """Отримати район за ID"""
-    return next((district for district in KHARKIV_CITY.districts if district.id == district_id), None)
+    return LOCATIONS.get_district(district_id)
 
 
 def get_all_districts() -> List[str]:
     """Отримати список всіх районів"""
-    return [d.name for d in KHARKIV_CITY.districts]
+    return LOCATIONS.district_names(KHARKIV_CITY.name)
 
 
 def getAllDistricts() -> List[str]:
@@ -234,27 +338,24 @@ def get_kharkiv_coordinates() -> Dict[str, float]:
     return KHARKIV_CITY.coordinates
 
 
-def get_district_coordinates(district_name: str) -> Optional[Dict[str, float]]:
+def get_district_coordinates(district_name: str, city_name: str = KHARKIV_CITY.name) -> Optional[Dict[str, float]]:
     """Отримати координати району"""
-    district = next((d for d in KHARKIV_CITY.districts if d.name == district_name), None)
+    district = LOCATIONS.district_by_name(city_name, district_name)
     return district.coordinates if district else None
 
 
 # Сумісність з старим API
 def get_all_cities() -> List[str]:
     """Отримати список всіх міст"""
-    return [KHARKIV_CITY.name]
+    return LOCATIONS.city_names()
 
 
 def get_districts_for_city(city_name: str) -> List[str]:
     """Отримати райони для міста"""
-    if city_name.lower() == 'харків':
-        return get_all_districts()
-    return []
+    return LOCATIONS.district_names(city_name)
 
 
 def get_city_coordinates(city_name: str) -> Optional[Dict[str, float]]:
     """Отримати координати міста"""
-    if city_name.lower() == 'харків':
-        return KHARKIV_CITY.coordinates
-    return None
+    city = LOCATIONS.city_by_name(city_name)
+    return city.coordinates if city else None
@@ -2,14 +2,16 @@
 FastAPI сервер для системи оцінки нерухомості
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uvicorn
 import logging
+import json
 from datetime import datetime
+from itertools import islice
 
 # Імпортуємо наші модулі
 import sys
@@ -17,10 +19,16 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
 
 from database import DatabaseManager
-from location_types.location import KHARKIV_CITY, getAllDistricts, getDistrictsForKharkiv
+from models import normalize_name
+from location_types.location import KHARKIV_CITY, LOCATIONS
 from ml_model import RealEstateMLModel
 from knn_valuation import KNNValuator
 from notifications import router as notifications_router
+from analyzers.market_analyzer import MarketAnalyzer
+from market_cache import MarketDataCache
+from valuation_cache import ValuationCache
+from blocking_pool import BlockingPool, PoolSaturated
+from batch_valuation import BATCH_CHUNK_SIZE
 
 # Налаштування логування
 logging.basicConfig(level=logging.INFO)
@@ -56,6 +64,30 @@ ml_model = RealEstateMLModel()
 from knn_valuation_simple import SimpleKNNValuator
 knn_valuator = SimpleKNNValuator(db_manager, k=15)
 
+# Ринкова статистика з rollup market_stats, з TTL кешем перед нею
+market_analyzer = MarketAnalyzer(db_manager)
+market_cache = MarketDataCache(ttl=float(os.getenv('MARKET_CACHE_TTL', 300)))
+
+# LRU кеш оцінок за канонічними ознаками об'єкта; значення перераховується,
+# якщо змінився знімок оголошень або пакет моделей
+valuation_cache = ValuationCache(
+    max_entries=int(os.getenv('VALUATION_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('VALUATION_CACHE_TTL', 600)),
+    area_step=float(os.getenv('VALUATION_CACHE_AREA_STEP', 1.0)),
+    coordinate_precision=int(os.getenv('VALUATION_CACHE_COORDINATE_PRECISION', 4)),
+)
+
+# Блокуюча робота (синхронні сесії БД, оцінка моделями) виконується в
+# обмеженому пулі потоків, щоб не зупиняти event loop; межі по групах
+# ендпоінтів, окрема група для перевірки здоров'я
+blocking_pool = BlockingPool({
+    'valuation': int(os.getenv('VALUATION_CONCURRENCY', 4)),
+    'market': int(os.getenv('MARKET_CONCURRENCY', 4)),
+    'database': int(os.getenv('DATABASE_CONCURRENCY', 8)),
+    'admin': 1,
+    'health': 2,
+}, max_waiting=int(os.getenv('BLOCKING_MAX_WAITING', 64)))
+
 # Спробуємо завантажити навчену модель
 if not ml_model.load_models():
     logger.warning("Не вдалося завантажити ML модель, використовую просту оцінку")
@@ -86,6 +118,29 @@ class PropertyValuation(BaseModel):
     comparable_properties: List[Dict[str, Any]]
     market_trends: Dict[str, Any]
 
+class BatchPropertyData(BaseModel):
+    """Об'єкт для пакетної оцінки (відсутні характеристики не враховуються)"""
+    property_id: Optional[str] = Field(default=None, description="Ідентифікатор об'єкта")
+    city: str = Field(..., description="Назва міста")
+    district: Optional[str] = Field(default=None, description="Назва району")
+    area: float = Field(..., gt=0, description="Площа в м²")
+    rooms: Optional[int] = Field(default=None, gt=0, description="Кількість кімнат")
+    floor: Optional[int] = Field(default=None, ge=1, description="Поверх")
+    total_floors: Optional[int] = Field(default=None, ge=1, description="Загальна кількість поверхів")
+    building_type: Optional[str] = Field(default=None, description="Тип будинку")
+    condition: Optional[str] = Field(default=None, description="Стан квартири")
+    year_built: Optional[int] = Field(default=None, description="Рік побудови")
+    has_balcony: Optional[bool] = Field(default=None, description="Наявність балкону")
+    has_elevator: Optional[bool] = Field(default=None, description="Наявність ліфту")
+    heating: Optional[str] = Field(default=None, description="Тип опалення")
+    latitude: Optional[float] = Field(default=None, description="Широта")
+    longitude: Optional[float] = Field(default=None, description="Довгота")
+
+class BatchValuationRequest(BaseModel):
+    """Запит пакетної оцінки"""
+    properties: List[BatchPropertyData]
+    k: Optional[int] = Field(default=None, gt=0, le=100, description="Кількість схожих об'єктів")
+
 class MarketInsights(BaseModel):
     """Модель інсайтів про ринок"""
     city: str
@@ -101,6 +156,13 @@ def get_db():
     """Залежність для отримання сесії бази даних"""
     return db_manager.get_session_direct()
 
+async def run_blocking(lane: str, func, *args, **kwargs):
+    """Виконує блокуючий виклик у пулі; переповнена черга групи - 503"""
+    try:
+        return await blocking_pool.run(lane, func, *args, **kwargs)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
 # API ендпоінти
 @app.get("/")
 async def root():
@@ -115,21 +177,22 @@ async def root():
 async def health_check():
     """Перевірка здоров'я сервісу"""
     try:
-        stats = db_manager.get_stats_summary()
+        stats = await run_blocking('health', db_manager.get_stats_summary)
         return {
             "status": "healthy",
             "timestamp": datetime.utcnow().isoformat(),
             "database_stats": stats
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Health check failed: {str(e)}")
 
 @app.get("/cities")
 async def get_cities():
-    """Отримує список міст (тільки Харків для MVP)"""
+    """Отримує список міст"""
     try:
-        cities = [KHARKIV_CITY.name]
-        return {"cities": cities}
+        return {"cities": LOCATIONS.city_names()}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting cities: {str(e)}")
 
@@ -137,11 +200,11 @@ async def get_cities():
 async def get_districts(city_name: str):
     """Отримує райони для міста"""
     try:
-        if city_name.lower() == 'харків':
-            districts = getAllDistricts()
-            return {"districts": districts}
-        else:
+        if LOCATIONS.city_by_name(city_name) is None:
             raise HTTPException(status_code=404, detail="Місто не підтримується")
+        return {"districts": LOCATIONS.district_names(city_name)}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting districts: {str(e)}")
 
@@ -161,158 +224,234 @@ async def save_property(property_data: PropertyData):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error saving property: {str(e)}")
 
-@app.get("/properties/{property_id}/valuation")
-async def get_valuation(property_id: str):
-    """Отримує оцінку вартості нерухомості"""
-    try:
-        # Отримуємо дані про нерухомість з бази (спрощено)
-        # В реальності тут буде запит до бази даних
-
-        # Для демонстрації створюємо тестові дані
-        # В реальному проекті тут буде запит до бази даних
-
-        # Створюємо словник з характеристиками для оцінки
-        property_data = {
-            'city': 'Харків',
-            'district': 'Центр',
-            'area_total': 60.0,
-            'rooms': 2,
-            'floor': 3,
-            'total_floors': 9,
-            'building_type': 'brick',
-            'condition': 'good',
-            'heating': 'central',
-            'has_balcony': True,
-            'has_elevator': True
-        }
-
-        # Спочатку пробуємо KNN оцінку на основі реальних даних
-        knn_result = knn_valuator.estimate_price_simple(property_data, k=15)
+def _compute_valuation(property_id: str) -> Dict[str, Any]:
+    """Оцінка вартості (блокуюча: БД та моделі), виконується в пулі потоків"""
+    # Отримуємо дані про нерухомість з бази (спрощено)
+    # В реальності тут буде запит до бази даних
+
+    # Для демонстрації створюємо тестові дані
+    # В реальному проекті тут буде запит до бази даних
+
+    # Створюємо словник з характеристиками для оцінки
+    property_data = {
+        'city': 'Харків',
+        'district': 'Центр',
+        'area_total': 60.0,
+        'rooms': 2,
+        'floor': 3,
+        'total_floors': 9,
+        'building_type': 'brick',
+        'condition': 'good',
+        'heating': 'central',
+        'has_balcony': True,
+        'has_elevator': True
+    }
 
-        if knn_result.get('estimated_price') and knn_result.get('similar_properties_count', 0) >= 3:
-            # KNN оцінка успішна
-            estimated_value = knn_result['estimated_price']
-            confidence = knn_result['confidence']
-            model_used = knn_result['method']
-            price_range = knn_result['price_range']
+    valuation = valuation_cache.get(property_data, _valuation_versions, _estimate_value)
+    return {"property_id": property_id, **valuation}
+
+def _valuation_versions():
+    """Версії даних, від яких залежить оцінка: знімки оголошень та пакет моделей"""
+    ml_model.reload_if_changed()
+    return knn_valuator.snapshot_cache.generation, ml_model.bundle_version
+
+def _city_price_per_sqm(city_name: Optional[str]) -> float:
+    """Середня ціна м² міста з реєстру (Харків, якщо місто невідоме)"""
+    city = LOCATIONS.city_by_name(city_name) or KHARKIV_CITY
+    return city.average_price_per_sqm
+
+def _estimate_value(property_data: Dict[str, Any]) -> Dict[str, Any]:
+    """KNN оцінка з fallback на ML модель (результат кешується за ознаками об'єкта)"""
+    # Спочатку пробуємо KNN оцінку на основі реальних даних
+    knn_result = knn_valuator.estimate_price_simple(property_data, k=15)
+
+    if knn_result.get('estimated_price') and knn_result.get('similar_properties_count', 0) >= 3:
+        # KNN оцінка успішна
+        estimated_value = knn_result['estimated_price']
+        confidence = knn_result['confidence']
+        model_used = knn_result['method']
+        price_range = knn_result['price_range']
+
+        # Отримуємо деталі схожих об'єктів
+        comparable_properties = knn_result.get('similar_properties', [])
+
+        # Отримуємо статистику ринку
+        market_stats = knn_valuator.get_market_stats_simple(
+            city=property_data.get('city'),
+            district=property_data.get('district')
+        )
 
-            # Отримуємо деталі схожих об'єктів
-            comparable_properties = knn_result.get('similar_properties', [])
+        return {
+            "estimated_value": estimated_value,
+            "price_range": price_range,
+            "confidence": confidence,
+            "model_used": model_used,
+            "similar_properties_count": knn_result['similar_properties_count'],
+            "avg_similarity": knn_result.get('avg_similarity', 0),
+            "comparable_properties": comparable_properties[:5],  # Показуємо топ-5
+            "market_trends": market_stats or {
+                "average_price_per_sqm": _city_price_per_sqm(property_data.get('city')),
+                "price_change_last_month": 2.5,
+                "demand_level": "medium"
+            }
+        }
+    else:
+        # Fallback на ML модель або просту оцінку
+        logger.info("KNN оцінка недоступна, використовую ML модель")
 
-            # Отримуємо статистику ринку
-            market_stats = knn_valuator.get_market_stats(
-                city=property_data.get('city'),
-                district=property_data.get('district')
-            )
+        ml_prediction = ml_model.predict_price(property_data)
 
-            return {
-                "property_id": property_id,
-                "estimated_value": estimated_value,
-                "price_range": price_range,
-                "confidence": confidence,
-                "model_used": model_used,
-                "similar_properties_count": knn_result['similar_properties_count'],
-                "avg_similarity": knn_result.get('avg_similarity', 0),
-                "comparable_properties": comparable_properties[:5],  # Показуємо топ-5
-                "market_trends": market_stats or {
-                    "average_price_per_sqm": KHARKIV_CITY.averagePricePerSqm,
-                    "price_change_last_month": 2.5,
-                    "demand_level": "medium"
-                }
-            }
+        if 'predicted_price' in ml_prediction:
+            estimated_value = int(ml_prediction['predicted_price'])
+            confidence = ml_prediction.get('confidence', 0.7)
+            model_used = ml_prediction.get('model_used', 'ml')
         else:
-            # Fallback на ML модель або просту оцінку
-            logger.info("KNN оцінка недоступна, використовую ML модель")
-
-            ml_prediction = ml_model.predict_price(property_data)
-
-            if 'predicted_price' in ml_prediction:
-                estimated_value = int(ml_prediction['predicted_price'])
-                confidence = ml_prediction.get('confidence', 0.7)
-                model_used = ml_prediction.get('model_used', 'ml')
-            else:
-                # Останній fallback на просту оцінку
-                estimated_value = int(72000)  # 60м² * 1200 грн/м²
-                confidence = 0.6
-                model_used = 'simple'
-
-            price_range = {
-                'min': int(estimated_value * 0.85),
-                'max': int(estimated_value * 1.15)
-            }
+            # Останній fallback на просту оцінку
+            estimated_value = int(72000)  # 60м² * 1200 грн/м²
+            confidence = 0.6
+            model_used = 'simple'
+
+        price_range = {
+            'min': int(estimated_value * 0.85),
+            'max': int(estimated_value * 1.15)
+        }
 
-            return {
-                "property_id": property_id,
-                "estimated_value": estimated_value,
-                "price_range": price_range,
-                "confidence": confidence,
-                "model_used": model_used,
-                "comparable_properties": [],
-                "market_trends": {
-                    "average_price_per_sqm": KHARKIV_CITY.averagePricePerSqm,
-                    "price_change_last_month": 2.5,
-                    "demand_level": "medium"
-                }
+        return {
+            "estimated_value": estimated_value,
+            "price_range": price_range,
+            "confidence": confidence,
+            "model_used": model_used,
+            "comparable_properties": [],
+            "market_trends": {
+                "average_price_per_sqm": _city_price_per_sqm(property_data.get('city')),
+                "price_change_last_month": 2.5,
+                "demand_level": "medium"
             }
+        }
+
+@app.get("/properties/{property_id}/valuation")
+async def get_valuation(property_id: str):
+    """Отримує оцінку вартості нерухомості"""
+    try:
+        return await run_blocking('valuation', _compute_valuation, property_id)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting valuation: {e}")
         raise HTTPException(status_code=500, detail=f"Error getting valuation: {str(e)}")
 
+@app.post("/valuations/batch")
+async def batch_valuation(request: BatchValuationRequest):
+    """
+    Пакетна оцінка вартості. Відповідь - NDJSON, по рядку на об'єкт
+    у порядку запиту; рядки формуються порціями по мірі оцінки, кожна
+    порція рахується в групі 'valuation' пулу блокуючої роботи.
+    Обмеження: тіло запиту (JSON) розбирається цілком до першого рядка
+    відповіді, тож пам'ять на вході зростає з розміром пакета; дуже великі
+    пакети варто ділити на кілька запитів
+    """
+    def targets():
+        for item in request.properties:
+            target = item.model_dump(exclude={'property_id', 'area'})
+            target['id'] = item.property_id
+            target['area_total'] = item.area
+            yield target
+
+    results = knn_valuator.estimate_price_batch(targets(), k=request.k)
+
+    def next_lines(start: int) -> List[str]:
+        """Наступна порція рядків (блокуюча: пошук схожих і оцінка), виконується в пулі"""
+        chunk = []
+        for index, result in enumerate(islice(results, BATCH_CHUNK_SIZE), start):
+            line = {
+                "index": index,
+                "property_id": result['id'],
+                "estimated_value": result.get('estimated_price'),
+                "price_range": result.get('price_range'),
+                "confidence": result.get('confidence', 0.0),
+                "model_used": result.get('method'),
+                "similar_properties_count": result.get('similar_properties_count', 0),
+                "avg_similarity": result.get('avg_similarity', 0),
+            }
+            if result.get('error'):
+                line["error"] = result['error']
+            chunk.append(json.dumps(line, ensure_ascii=False) + "\n")
+        return chunk
+
+    # Перша порція рахується до початку відповіді, щоб переповнена група дала 503
+    first = await run_blocking('valuation', next_lines, 0)
+
+    async def lines():
+        chunk, sent = first, 0
+        while chunk:
+            yield ''.join(chunk)
+            sent += len(chunk)
+            if len(chunk) < BATCH_CHUNK_SIZE:
+                return
+            try:
+                chunk = await blocking_pool.run('valuation', next_lines, sent)
+            except PoolSaturated as e:
+                # Статус вже відправлено - повідомляємо про обрив рядком потоку
+                yield json.dumps({"index": sent, "error": str(e)}, ensure_ascii=False) + "\n"
+                return
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def _cached_market_response(request: Request, key: tuple, compute) -> Response:
+    """
+    Відповідь з кешу ринкової статистики з ETag та Cache-Control.
+    Промах рахується в пулі потоків; помилки не кешуються, а при збігу
+    If-None-Match з актуальним значенням повертається 304
+    """
+    cached = await run_blocking('market', market_cache.get, key, compute,
+                                lambda value: not value.get('error'))
+    if cached.value.get('error'):
+        raise HTTPException(status_code=404, detail=cached.value['error'])
+
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": f"public, max-age={cached.max_age()}",
+    }
+
+    if request.headers.get("if-none-match") == cached.etag:
+        return Response(status_code=304, headers=headers)
+
+    return JSONResponse(content=cached.value, headers=headers)
+
 @app.get("/market/stats")
 async def get_market_stats(
+    request: Request,
     city: str = Query(..., description="Назва міста"),
     district: Optional[str] = Query(None, description="Назва району")
 ):
-    """Отримує статистику ринку"""
-    try:
-        if city.lower() != 'харків':
-            raise HTTPException(status_code=404, detail="Місто не підтримується")
+    """Отримує статистику ринку (місто та райони з rollup market_stats)"""
+    def compute():
+        return market_analyzer.get_rollup_stats(city, district)
 
-        # Повертаємо базову статистику для Харкова
-        return {
-            "city": "Харків",
-            "current_avg_price": KHARKIV_CITY.averagePricePerSqm,
-            "demand_level": "medium",
-            "total_listings": 1000,  # Заглушка
-            "top_districts": [
-                {"district": "Центр", "avg_price_per_sqm": 1400},
-                {"district": "Олексіївка", "avg_price_per_sqm": 1300},
-                {"district": "Шевченківський", "avg_price_per_sqm": 1250},
-                {"district": "Салтівка", "avg_price_per_sqm": 850},
-                {"district": "Немишлянський", "avg_price_per_sqm": 1050}
-            ],
-            "price_trends": [
-                {"date": "2024-01-01", "avg_price_per_sqm": 1150},
-                {"date": "2024-02-01", "avg_price_per_sqm": 1180},
-                {"date": "2024-03-01", "avg_price_per_sqm": 1200}
-            ],
-            "recommendations": [
-                "Високий попит на нерухомість в центрі",
-                "Салтівка - найдешевший район для покупки",
-                "Олексіївка - престижний район з новобудовами"
-            ]
-        }
+    try:
+        key = ('stats', normalize_name(city), normalize_name(district), None)
+        return await _cached_market_response(request, key, compute)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting market stats: {str(e)}")
 
 @app.get("/market/trends")
 async def get_price_trends(
+    request: Request,
     city: str = Query(..., description="Назва міста"),
-    months: int = Query(6, description="Кількість місяців")
+    months: int = Query(6, ge=1, le=60, description="Кількість місяців")
 ):
-    """Отримує тренди цін"""
-    try:
-        if city.lower() != 'харків':
-            raise HTTPException(status_code=404, detail="Місто не підтримується")
+    """Отримує тренди цін (денні значення з rollup market_stats)"""
+    def compute():
+        if not market_analyzer.find_city(city):
+            return {"error": "Місто не підтримується"}
+        return {"trends": market_analyzer.get_price_trends(city, months)}
 
-        # Повертаємо базові тренди
-        return {
-            "trends": [
-                {"date": "2024-01-01", "avg_price_per_sqm": 1150, "total_listings": 850},
-                {"date": "2024-02-01", "avg_price_per_sqm": 1180, "total_listings": 920},
-                {"date": "2024-03-01", "avg_price_per_sqm": 1200, "total_listings": 980}
-            ]
-        }
+    try:
+        return await _cached_market_response(request, ('trends', normalize_name(city), '', months), compute)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting price trends: {str(e)}")
 
@@ -326,32 +465,55 @@ async def search_properties(
     try:
         # Отримуємо останні оголошення з бази даних (SQLite)
         sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
-        from models import PropertyListing, City as CityModel
+        from models import PropertyListing, District as DistrictModel
 
-        with db_manager.get_session() as session:
-            city_obj = session.query(CityModel).filter_by(name=city).first()
-            if not city_obj:
+        def work():
+            """Пошук у БД (виконується в пулі потоків)"""
+            # Місто і район - за нормалізованою назвою з довідника в пам'яті
+            city_id, district_id = knn_valuator.snapshot_cache.resolve_location(city, district)
+            if city_id is None or (district and district_id is None):
                 return {"properties": []}
 
-            listings = session.query(PropertyListing).filter(
-                PropertyListing.city_id == city_obj.id,
-                PropertyListing.is_active == True
-            ).order_by(PropertyListing.created_at.desc()).limit(limit).all()
+            with db_manager.get_session() as session:
+                # Один запит з проекцією колонок: назва району підтягується тим самим запитом
+                query = session.query(
+                    PropertyListing.id,
+                    PropertyListing.title,
+                    PropertyListing.price_uah,
+                    PropertyListing.area_total,
+                    PropertyListing.rooms,
+                    PropertyListing.address,
+                    PropertyListing.url,
+                    DistrictModel.name.label('district')
+                ).outerjoin(
+                    DistrictModel, DistrictModel.id == PropertyListing.district_id
+                ).filter(
+                    PropertyListing.city_id == city_id,
+                    PropertyListing.is_active == True
+                )
+                if district_id is not None:
+                    query = query.filter(PropertyListing.district_id == district_id)
+                rows = query.order_by(PropertyListing.created_at.desc()).limit(limit).all()
+
+                return {
+                    "properties": [
+                        {
+                            "id": row.id,
+                            "title": row.title,
+                            "price_uah": row.price_uah,
+                            "area_total": row.area_total,
+                            "rooms": row.rooms,
+                            "address": row.address,
+                            "url": row.url,
+                            "district": row.district
+                        }
+                        for row in rows
+                    ]
+                }
 
-            return {
-                "properties": [
-                    {
-                        "id": listing.id,
-                        "title": listing.title,
-                        "price_uah": listing.price_uah,
-                        "area_total": listing.area_total,
-                        "rooms": listing.rooms,
-                        "address": listing.address,
-                        "url": listing.url
-                    }
-                    for listing in listings
-                ]
-            }
+        return await run_blocking('database', work)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching properties: {str(e)}")
 
@@ -373,8 +535,7 @@ async def trigger_scraping(
         sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
         from main_scraper import DataCollector
 
-        collector = DataCollector()
-        data = collector.collect_data(cities, sources, pages)
+        data = await run_blocking('admin', lambda: DataCollector().collect_data(cities, sources, pages))
 
         return {
             "message": "Збір даних запущено",
@@ -383,6 +544,8 @@ async def trigger_scraping(
             "total_listings": sum(len(listings) for city_listings in data.values()
                                for listings in city_listings.values())
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error triggering scraping: {str(e)}")
 
@@ -390,92 +553,120 @@ async def trigger_scraping(
 async def get_admin_stats():
     """Отримує статистику для адмін панелі"""
     try:
-        stats = db_manager.get_stats_summary()
+        stats = await run_blocking('database', db_manager.get_stats_summary)
 
         # Повертаємо базову статистику для MVP
         return {
             **stats,
             'recent_listings_24h': 0,
             'active_sources': ['olx', 'dom_ria', 'realt', 'address'],
+            'listing_snapshot': knn_valuator.snapshot_cache.stats(),
+            'market_cache': market_cache.stats(),
+            'valuation_cache': valuation_cache.stats(),
+            'blocking_pool': blocking_pool.stats(),
             'note': 'Для MVP використовується симуляція'
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting admin stats: {str(e)}")
 
 
+@app.get("/admin/ml/bundles")
+async def get_model_bundles():
+    """Збережені пакети ML моделей та активна версія"""
+    bundles = await run_blocking('admin', ml_model.list_bundles)
+    return {"active": ml_model.bundle_version, "bundles": bundles}
+
+@app.post("/admin/ml/bundles/{version}/activate")
+async def activate_model_bundle(version: str):
+    """Перемикає пакет ML моделей без перезапуску (інші процеси підхоплять через CURRENT)"""
+    if not await run_blocking('admin', ml_model.activate_bundle, version):
+        raise HTTPException(status_code=404, detail=f"Пакет моделей {version} не знайдено")
+    return {"active": ml_model.bundle_version}
+
+
 @app.post("/properties/add")
 async def add_property(property_data: PropertyData):
     """Додає нове оголошення в базу даних для покращення точності оцінки"""
     try:
-        # Генеруємо ID для нерухомості
-        property_id = f"prop_{int(datetime.utcnow().timestamp())}_{hash(property_data.city) % 10000}"
-
-        # Отримуємо або створюємо місто та район
-        with db_manager.get_session() as session:
-            city_obj = session.query(City).filter_by(name=property_data.city).first()
-            if not city_obj:
-                city_obj = City(
-                    id=f"city_{hash(property_data.city) % 10000}",
-                    name=property_data.city,
-                    region="Україна",  # Можна покращити
-                    coordinates={"latitude": 50.0, "longitude": 30.0},  # Заглушка
-                    average_price_per_sqm=1200  # Заглушка
-                )
-                session.add(city_obj)
-                session.commit()
-
-            district_obj = None
-            if property_data.district:
-                district_obj = session.query(District).filter_by(
-                    name=property_data.district,
-                    city_id=city_obj.id
-                ).first()
-                if not district_obj:
-                    district_obj = District(
-                        id=f"dist_{hash(property_data.district) % 10000}",
-                        city_id=city_obj.id,
-                        name=property_data.district,
-                        type="district"
+        def work():
+            """Запис оголошення в БД"""
+            # Генеруємо ID для нерухомості
+            property_id = f"prop_{int(datetime.utcnow().timestamp())}_{hash(property_data.city) % 10000}"
+
+            # Отримуємо або створюємо місто та район
+            with db_manager.get_session() as session:
+                city_obj = session.query(City).filter_by(name=property_data.city).first()
+                if not city_obj:
+                    city_obj = City(
+                        id=f"city_{hash(property_data.city) % 10000}",
+                        name=property_data.city,
+                        region="Україна",  # Можна покращити
+                        coordinates={"latitude": 50.0, "longitude": 30.0},  # Заглушка
+                        average_price_per_sqm=1200  # Заглушка
                     )
-                    session.add(district_obj)
+                    session.add(city_obj)
                     session.commit()
 
-        # Створюємо запис в PropertyListing
-        from models import PropertyListing
-
-        new_listing = PropertyListing(
-            id=property_id,
-            title=f"Квартира {property_data.area}м², {property_data.rooms}к, {property_data.city}",
-            city_id=city_obj.id,
-            district_id=district_obj.id if district_obj else None,
-            address="",  # Можна додати поле адреси в PropertyData
-            area_total=property_data.area,
-            rooms=property_data.rooms,
-            floor=property_data.floor,
-            total_floors=property_data.total_floors,
-            building_type=property_data.building_type,
-            condition=property_data.condition,
-            has_balcony=property_data.has_balcony,
-            has_elevator=property_data.has_elevator,
-            heating=property_data.heating,
-            price_uah=0,  # Ціна буде додана окремо
-            is_active=True
-        )
+                district_obj = None
+                if property_data.district:
+                    district_obj = session.query(District).filter_by(
+                        name=property_data.district,
+                        city_id=city_obj.id
+                    ).first()
+                    if not district_obj:
+                        district_obj = District(
+                            id=f"dist_{hash(property_data.district) % 10000}",
+                            city_id=city_obj.id,
+                            name=property_data.district,
+                            type="district"
+                        )
+                        session.add(district_obj)
+                        session.commit()
+
+            # Створюємо запис в PropertyListing
+            from models import PropertyListing
+
+            new_listing = PropertyListing(
+                id=property_id,
+                title=f"Квартира {property_data.area}м², {property_data.rooms}к, {property_data.city}",
+                city_id=city_obj.id,
+                district_id=district_obj.id if district_obj else None,
+                address="",  # Можна додати поле адреси в PropertyData
+                area_total=property_data.area,
+                rooms=property_data.rooms,
+                floor=property_data.floor,
+                total_floors=property_data.total_floors,
+                building_type=property_data.building_type,
+                condition=property_data.condition,
+                has_balcony=property_data.has_balcony,
+                has_elevator=property_data.has_elevator,
+                heating=property_data.heating,
+                price_uah=0,  # Ціна буде додана окремо
+                is_active=True
+            )
 
-        # Обчислюємо додаткові поля
-        new_listing.calculate_price_per_sqm()
-        new_listing.categorize_floor()
+            # Обчислюємо додаткові поля
+            new_listing.calculate_price_per_sqm()
+            new_listing.categorize_floor()
 
-        with db_manager.get_session() as session:
-            session.add(new_listing)
-            session.commit()
+            with db_manager.get_session() as session:
+                session.add(new_listing)
+                session.commit()
 
-        return {
-            "property_id": property_id,
-            "message": "Оголошення додано успішно",
-            "note": "Для точної оцінки додайте реальну ціну через /properties/{id}/price"
-        }
+            # Нове оголошення має одразу потрапити в знімок для KNN
+            knn_valuator.snapshot_cache.invalidate(city_obj.id)
 
+            return {
+                "property_id": property_id,
+                "message": "Оголошення додано успішно",
+                "note": "Для точної оцінки додайте реальну ціну через /properties/{id}/price"
+            }
+
+        return await run_blocking('database', work)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error adding property: {e}")
         raise HTTPException(status_code=500, detail=f"Error adding property: {str(e)}")
@@ -489,22 +680,28 @@ async def update_property_price(property_id: str, price_data: dict):
         if not price_uah or price_uah <= 0:
             raise HTTPException(status_code=400, detail="Вкажіть коректну ціну")
 
-        with db_manager.get_session() as session:
-            listing = session.query(PropertyListing).filter_by(id=property_id).first()
-            if not listing:
-                raise HTTPException(status_code=404, detail="Оголошення не знайдено")
+        def work():
+            """Оновлення ціни в БД"""
+            with db_manager.get_session() as session:
+                listing = session.query(PropertyListing).filter_by(id=property_id).first()
+                if not listing:
+                    raise HTTPException(status_code=404, detail="Оголошення не знайдено")
 
-            listing.price_uah = price_uah
-            listing.calculate_price_per_sqm()
-            session.commit()
+                listing.price_uah = price_uah
+                listing.calculate_price_per_sqm()
+                city_id = listing.city_id
+                session.commit()
 
-        return {
-            "property_id": property_id,
-            "price_uah": price_uah,
-            "price_per_sqm": listing.price_per_sqm,
-            "message": "Ціна оновлена успішно"
-        }
+            knn_valuator.snapshot_cache.invalidate(city_id)
+
+            return {
+                "property_id": property_id,
+                "price_uah": price_uah,
+                "price_per_sqm": listing.price_per_sqm,
+                "message": "Ціна оновлена успішно"
+            }
 
+        return await run_blocking('database', work)
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,88 @@
+"""
+TTL кеш відповідей ринкової статистики
+Ключ - (ендпоінт, місто, район, місяці). При промаху лише один потік
+рахує значення, решта запитів з тим самим ключем чекають на його
+блокуванні й отримують готовий результат. Для кожного значення
+зберігається ETag, щоб клієнти могли перевіряти актуальність без тіла.
+Значення, які не слід кешувати (помилки), віддаються, але не зберігаються
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+@dataclass
+class CachedValue:
+    """Закешоване значення з ETag та часом закінчення (time.monotonic)"""
+    value: Any
+    etag: str
+    expires_at: float
+
+    def max_age(self, now: float = None) -> int:
+        """Скільки секунд значення ще актуальне"""
+        now = time.monotonic() if now is None else now
+        return max(0, int(self.expires_at - now))
+
+
+class MarketDataCache:
+    """Потокобезпечний TTL кеш з об'єднанням одночасних промахів"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+
+        self._values: Dict[Hashable, CachedValue] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+        }
+
+    def get(self, key: Hashable, compute: Callable[[], Any],
+            cacheable: Optional[Callable[[Any], bool]] = None) -> CachedValue:
+        """
+        Повертає значення ключа, при промаху рахує його через compute().
+        Якщо cacheable(значення) хибне, значення не зберігається
+        """
+        cached = self._values.get(key)
+        if cached is not None and cached.expires_at > time.monotonic():
+            self.counters['hits'] += 1
+            return cached
+
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        with lock:
+            # Поки чекали на блокування, значення міг порахувати інший запит
+            cached = self._values.get(key)
+            if cached is not None and cached.expires_at > time.monotonic():
+                self.counters['coalesced'] += 1
+                return cached
+
+            self.counters['misses'] += 1
+            value = compute()
+            cached = CachedValue(value, _etag(value), time.monotonic() + self.ttl)
+            if cacheable is None or cacheable(value):
+                self._values[key] = cached
+            return cached
+
+    def invalidate(self):
+        """Скидає всі значення"""
+        with self._locks_guard:
+            self._values.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Лічильники кешу"""
+        return {**self.counters, 'entries': len(self._values), 'ttl': self.ttl}
+
+
+def _etag(value: Any) -> str:
+    """Слабкий ETag за вмістом JSON відповіді"""
+    body = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return f'W/"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'
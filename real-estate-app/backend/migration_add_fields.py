@@ -7,8 +7,10 @@ import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
 
+from sqlalchemy import bindparam, inspect, select, text, update
+
 from database import DatabaseManager
-from models import PropertyListing
+from models import PropertyListing, City, District, normalize_name
 
 def add_new_fields():
     """Додає нові поля до таблиці PropertyListing"""
@@ -36,6 +38,44 @@ def add_new_fields():
         print(f"❌ Помилка міграції: {e}")
         return False
 
+def add_normalized_name_columns(db_manager: DatabaseManager = None):
+    """
+    Додає колонки name_normalized до cities та districts (create_tables не
+    змінює існуючі таблиці), заповнює їх та створює індекси
+    """
+    print("🔄 Додаємо нормалізовані назви міст і районів...")
+
+    db_manager = db_manager or DatabaseManager()
+
+    try:
+        with db_manager.engine.begin() as conn:
+            inspector = inspect(conn)
+            for table in (City.__table__, District.__table__):
+                columns = {column['name'] for column in inspector.get_columns(table.name)}
+                if 'name_normalized' not in columns:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN name_normalized VARCHAR(100)"))
+
+                rows = conn.execute(select(table.c.id, table.c.name)).all()
+                if rows:
+                    conn.execute(
+                        update(table).where(table.c.id == bindparam('row_id'))
+                        .values(name_normalized=bindparam('normalized')),
+                        [{'row_id': row.id, 'normalized': normalize_name(row.name)} for row in rows]
+                    )
+                print(f"   - {table.name}: {len(rows)} назв")
+
+        for table in (City.__table__, District.__table__):
+            for index in table.indexes:
+                if 'name_normalized' in index.columns:
+                    index.create(db_manager.engine, checkfirst=True)
+
+        print("✅ Нормалізовані назви додано")
+        return True
+
+    except Exception as e:
+        print(f"❌ Помилка міграції назв: {e}")
+        return False
+
 def check_database_structure():
     """Перевіряє структуру бази даних"""
     print("🔍 Перевірка структури бази даних...")
@@ -79,6 +119,9 @@ if __name__ == "__main__":
     # Крок 2: Міграція
     success &= add_new_fields()
 
+    # Крок 3: Нормалізовані назви для точного пошуку міст і районів
+    success &= add_normalized_name_columns()
+
     if success:
         print("\n🎉 Міграція виконана успішно!")
         print("💡 Тепер база даних готова для KNN оцінки нерухомості")
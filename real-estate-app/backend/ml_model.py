@@ -5,17 +5,24 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, Tuple, Any
+from typing import Dict, List, NamedTuple, Optional, Tuple, Any
 import os
+import copy
+import json
+import math
+import time
+import shutil
+import hashlib
 from datetime import datetime
 
 # Опциональные импорты sklearn
 try:
+    from sklearn.base import clone
     from sklearn.model_selection import train_test_split, cross_val_score
     from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
     from sklearn.linear_model import LinearRegression
-    from sklearn.preprocessing import StandardScaler, LabelEncoder
-    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.metrics import mean_absolute_error, r2_score
     import joblib
     SKLEARN_AVAILABLE = True
 except ImportError:
@@ -25,18 +32,97 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Модуль імпортується і як ml_model (backend), і як backend.ml_model (скрипти навчання)
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from category_encoding import CategoryEncoder
+from tree_inference import compile_model, load_compiled, save_compiled
+
+if SKLEARN_AVAILABLE:
+    from training_pool import TrainingPool
+
+# Категоріальні та числові ознаки (числові стандартизуються)
+CATEGORICAL_COLUMNS = ['city', 'district', 'building_type', 'condition', 'heating']
+NUMERIC_COLUMNS = ['area_total', 'rooms', 'floor', 'total_floors', 'year_built']
+
+# Порядок вибору моделі, якщо метрики навчання недоступні
+MODEL_PREFERENCE = ['gradient_boosting', 'random_forest', 'linear']
+
+# Інкрементальне донавчання: мінімум нових записів, мінімум нових дерев
+# за запуск та межа розміру ансамблю (далі - лише повне навчання)
+INCREMENTAL_MIN_ROWS = 50
+INCREMENTAL_MIN_ESTIMATORS = 5
+MAX_ENSEMBLE_ESTIMATORS = 500
+
+# Пакети моделей: model_dir/bundles/<версія>/, активна версія - у model_dir/CURRENT
+BUNDLES_DIR = 'bundles'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+SKLEARN_PAYLOAD = 'sklearn_models.joblib'
+
+
+class InferenceState(NamedTuple):
+    """
+    Все, що потрібно для прогнозу без pandas. Замінюється одним присвоєнням,
+    тому перемикання пакета моделей не змішує стани в паралельних запитах
+    """
+    version: Optional[str]
+    feature_columns: List[str]
+    numeric_columns: List[str]
+    scaler_mean: np.ndarray
+    scaler_scale: np.ndarray
+    category_encoders: Dict[str, CategoryEncoder]
+    compiled_models: Dict[str, Any]
+    best_model_name: Optional[str]
+    model_metrics: Dict[str, Dict[str, float]]
+
 class RealEstateMLModel:
     """ML модель для оцінки вартості нерухомості"""
 
-    def __init__(self, model_dir: str = 'models'):
+    def __init__(self, model_dir: str = 'models', reload_interval: float = 30.0, max_workers: int = None):
         self.model_dir = model_dir
-        self.models = {}
+        # Бюджет потоків навчання та крос-валідації (TRAINING_MAX_WORKERS або кількість ядер)
+        self.max_workers = max_workers
         self.scalers = {}
         self.label_encoders = {}
 
+        # Моделі sklearn пакета завантажуються лише при першому зверненні
+        self._models = {}
+        self._models_path = None
+
+        # Стан для прогнозування без pandas
+        self.feature_columns: List[str] = []
+        self.model_metrics: Dict[str, Dict[str, float]] = {}
+        self.best_model_name = None
+        self.inference: Optional[InferenceState] = None
+
+        # Метадані навчання для маніфесту пакета
+        self.training_data_hash = None
+        self.training_rows = 0
+        self.training_watermark: Optional[datetime] = None
+        self.bundle_version = None
+
+        # Як часто перевіряти, чи не змінилась активна версія (CURRENT)
+        self.reload_interval = reload_interval
+        self._last_reload_check = time.monotonic()
+
         # Створюємо директорію для моделей, якщо вона не існує
         os.makedirs(model_dir, exist_ok=True)
 
+    @property
+    def models(self) -> Dict[str, Any]:
+        """Навчені моделі sklearn (з пакета - ледаче завантаження з mmap)"""
+        if self._models_path is not None:
+            self._models = joblib.load(self._models_path, mmap_mode='r')
+            self._models_path = None
+        return self._models
+
+    @models.setter
+    def models(self, models: Dict[str, Any]):
+        self._models = models
+        self._models_path = None
+
     def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
         """Підготовка ознак для навчання моделі"""
 
@@ -46,41 +132,34 @@ class RealEstateMLModel:
         # Якщо sklearn доступен, используем продвинутую обработку
         if SKLEARN_AVAILABLE:
             # Обробка категоріальних змінних
-            categorical_columns = ['city', 'district', 'building_type', 'condition', 'heating']
-
-            for col in categorical_columns:
+            for col in CATEGORICAL_COLUMNS:
                 if col in df_processed.columns:
-                    # Використовуємо Label Encoding для категоріальних змінних
+                    # Коди категорій (int32); невідомі при прогнозі - окремий код
                     if col not in self.label_encoders:
-                        self.label_encoders[col] = LabelEncoder()
-                        df_processed[col] = self.label_encoders[col].fit_transform(df_processed[col].astype(str))
-                    else:
-                        # Для нових даних використовуємо вже навчену трансформацію
-                        df_processed[col] = df_processed[col].astype(str)
-                        # Обробляємо невідомі категорії
-                        known_categories = set(self.label_encoders[col].classes_)
-                        df_processed[col] = df_processed[col].apply(
-                            lambda x: x if x in known_categories else 'unknown'
-                        )
-                        df_processed[col] = self.label_encoders[col].transform(df_processed[col])
-
-            # Обробка числових ознак
-            numeric_columns = ['area_total', 'rooms', 'floor', 'total_floors', 'year_built']
+                        self.label_encoders[col] = CategoryEncoder().fit(df_processed[col])
+                    df_processed[col] = self.label_encoders[col].transform(df_processed[col])
+
+            # Обробка числових ознак (лише наявних у даних)
+            numeric_columns = [col for col in NUMERIC_COLUMNS if col in df_processed.columns]
 
             # Стандартизація числових ознак
-            if numeric_columns[0] in df_processed.columns:  # Перевіряємо, чи є area_total
+            if numeric_columns[:1] == ['area_total']:  # Перевіряємо, чи є area_total
                 if 'scaler' not in self.scalers:
                     self.scalers['scaler'] = StandardScaler()
-                    numeric_data = df_processed[numeric_columns].fillna(df_processed[numeric_data].mean())
+                    # float64: компактні колонки (float32/int16) масштабуються так само, як при прогнозі
+                    numeric_data = df_processed[numeric_columns].astype(np.float64)
+                    numeric_data = numeric_data.fillna(numeric_data.mean())
                     self.scalers['scaler'].fit(numeric_data)
                 else:
-                    numeric_data = df_processed[numeric_columns].fillna(df_processed[numeric_columns].mean())
+                    numeric_columns = list(self.scalers['scaler'].feature_names_in_)
+                    numeric_data = df_processed.reindex(columns=numeric_columns).astype(np.float64)
+                    numeric_data = numeric_data.fillna(pd.Series(self.scalers['scaler'].mean_, index=numeric_columns))
 
                 df_processed[numeric_columns] = self.scalers['scaler'].transform(numeric_data)
 
-        # Створюємо додаткові ознаки (работают без sklearn)
+        # Створюємо додаткові ознаки (работают без sklearn). Ціна за м² не
+        # використовується: вона виводиться з цільової змінної і невідома при прогнозі
         if 'area_total' in df_processed.columns and 'rooms' in df_processed.columns:
-            df_processed['price_per_sqm'] = df_processed['price_uah'] / df_processed['area_total']
             df_processed['room_density'] = df_processed['rooms'] / df_processed['area_total']
 
         if 'floor' in df_processed.columns and 'total_floors' in df_processed.columns:
@@ -89,13 +168,13 @@ class RealEstateMLModel:
             df_processed['is_last_floor'] = (df_processed['floor'] == df_processed['total_floors']).astype(int)
 
         # Цільова змінна
-        target = df_processed['price_uah']
+        target = df_processed['price_uah'] if 'price_uah' in df_processed.columns else None
 
         # Ознаки для навчання
         feature_columns = [
             'area_total', 'rooms', 'floor', 'total_floors', 'year_built',
             'city', 'district', 'building_type', 'condition', 'heating',
-            'has_balcony', 'has_elevator', 'price_per_sqm', 'room_density',
+            'has_balcony', 'has_elevator', 'room_density',
             'floor_ratio', 'is_first_floor', 'is_last_floor'
         ]
 
@@ -113,6 +192,16 @@ class RealEstateMLModel:
 
         logger.info(f"Починаю навчання моделей на {len(df)} записах")
 
+        # Навчання з нуля: нові енкодери, скейлер і моделі (новий, ще не збережений пакет)
+        self.scalers = {}
+        self.label_encoders = {}
+        self.models = {}
+        self.bundle_version = None
+
+        self.training_data_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values).hexdigest()
+        self.training_rows = len(df)
+        self.training_watermark = _watermark(df)
+
         # Підготовка даних
         X, y = self.prepare_features(df)
 
@@ -145,44 +234,12 @@ class RealEstateMLModel:
             )
         }
 
-        results = {}
-
-        for name, model in models.items():
-            try:
-                logger.info(f"Навчаю модель {name}")
-
-                # Навчання моделі
-                model.fit(X_train, y_train)
-
-                # Оцінка на тестовій вибірці
-                y_pred = model.predict(X_test)
-
-                # Метрики якості
-                mae = mean_absolute_error(y_test, y_pred)
-                mse = mean_squared_error(y_test, y_pred)
-                rmse = np.sqrt(mse)
-                r2 = r2_score(y_test, y_pred)
-
-                results[name] = {
-                    'model': model,
-                    'mae': mae,
-                    'rmse': rmse,
-                    'r2': r2,
-                    'feature_importance': None
-                }
-
-                logger.info(f"Модель {name}: MAE={mae:.0f}, RMSE={rmse:.0f}, R2={r2:.3f}")
-
-                # Для Random Forest та Gradient Boosting зберігаємо важливість ознак
-                if hasattr(model, 'feature_importances_'):
-                    results[name]['feature_importance'] = dict(zip(X.columns, model.feature_importances_))
-
-                # Зберігаємо модель
-                self.models[name] = model
-
-            except Exception as e:
-                logger.error(f"Помилка навчання моделі {name}: {e}")
-                results[name] = {'error': str(e)}
+        # Моделі навчаються паралельно в окремих процесах
+        results = TrainingPool(self.max_workers).fit_all(models, X_train, y_train, X_test, y_test)
+        for name, result in results.items():
+            if 'error' not in result:
+                logger.info(f"Модель {name}: MAE={result['mae']:.0f}, RMSE={result['rmse']:.0f}, R2={result['r2']:.3f}")
+                self.models[name] = result['model']
 
         # Визначаємо найкращу модель
         best_model = None
@@ -198,12 +255,194 @@ class RealEstateMLModel:
 
         logger.info(f"Найкраща модель: {best_model} з MAE={best_score:.0f}")
 
+        # Стан для прогнозування: порядок ознак, метрики, компактні предиктори
+        self.feature_columns = list(X.columns)
+        self.model_metrics = {
+            name: {'mae': float(result['mae']), 'rmse': float(result['rmse']), 'r2': float(result['r2'])}
+            for name, result in results.items()
+            if isinstance(result, dict) and 'error' not in result
+        }
+        self.best_model_name = best_model
+        self.compile_models()
+
         return results
 
+    def update_models(self, df: pd.DataFrame, holdout_size: float = 0.2, tolerance: float = 0.02) -> Dict[str, Any]:
+        """
+        Інкрементальне донавчання на оголошеннях, змінених після training_watermark.
+        Енкодери та скейлер не змінюються, ансамблі (RandomForest,
+        GradientBoosting) доповнюються деревами через warm_start, навченими лише
+        на нових даних, - вартість залежить від розміру дельти. Кожен кандидат
+        перевіряється на відкладеній частині дельти: він замінює модель, лише
+        якщо його MAE не гірший за поточний більш ніж на tolerance.
+        Стан змінюється тільки якщо прийнято хоча б одного кандидата
+        """
+
+        if not SKLEARN_AVAILABLE:
+            return {'error': 'sklearn недоступен для навчання моделей'}
+
+        if self.inference is None or not self.models:
+            return {'error': 'Немає навчених моделей для донавчання'}
+
+        if len(df) < INCREMENTAL_MIN_ROWS:
+            return {'error': f'Недостатньо нових даних для донавчання: {len(df)} записів'}
+
+        logger.info(f"Донавчання моделей на {len(df)} нових записах (позначка {self.training_watermark})")
+
+        X, y = self.prepare_features(df)
+        X = X[self.feature_columns]
+        X_train, X_holdout, y_train, y_holdout = train_test_split(
+            X, y, test_size=holdout_size, random_state=42
+        )
+
+        # Копії ансамблів з додатковими деревами; решта моделей не змінюється
+        candidates = {}
+        for name, model in self.models.items():
+            extra = self._extra_estimators(model, len(X_train))
+            if extra:
+                candidate = copy.deepcopy(model)
+                candidate.set_params(warm_start=True, n_estimators=model.n_estimators + extra)
+                candidates[name] = candidate
+
+        fitted = TrainingPool(self.max_workers).fit_all(candidates, X_train, y_train, X_holdout, y_holdout)
+
+        results = {}
+        accepted = {}
+        for name, model in self.models.items():
+            baseline_mae = mean_absolute_error(y_holdout, model.predict(X_holdout))
+            result = fitted.get(name)
+
+            if result is None:
+                results[name] = {'status': 'skipped', 'baseline_mae': baseline_mae, 'mae': baseline_mae}
+            elif 'error' in result:
+                results[name] = {'status': 'error', 'error': result['error'],
+                                 'baseline_mae': baseline_mae, 'mae': baseline_mae}
+            else:
+                accept = result['mae'] <= baseline_mae * (1 + tolerance)
+                results[name] = dict(result, status='updated' if accept else 'rejected', baseline_mae=baseline_mae,
+                                     n_estimators=result['model'].n_estimators)
+                if accept:
+                    result['model'].set_params(warm_start=False)
+                    accepted[name] = result['model']
+                else:
+                    results[name]['candidate_mae'] = result['mae']
+                    results[name]['mae'] = baseline_mae
+
+            logger.info(f"Модель {name}: {results[name]['status']}, MAE на відкладених "
+                        f"{baseline_mae:.0f} -> {results[name]['mae']:.0f}")
+
+        best_model = min(results, key=lambda name: results[name]['mae'])
+        results['best_model'] = best_model
+        results['best_mae'] = results[best_model]['mae']
+        results['promoted'] = bool(accepted)
+
+        if not accepted:
+            logger.warning("Жоден кандидат не пройшов перевірку, моделі не змінено")
+            return results
+
+        self.models = {**self.models, **accepted}
+        for name in accepted:
+            self.model_metrics[name] = {key: float(results[name][key]) for key in ('mae', 'rmse', 'r2')}
+        self.best_model_name = best_model
+
+        delta_hash = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).values).hexdigest()
+        self.training_data_hash = hashlib.sha256(f"{self.training_data_hash}:{delta_hash}".encode()).hexdigest()
+        self.training_rows += len(df)
+        self.training_watermark = _watermark(df) or self.training_watermark
+
+        # Новий, ще не збережений пакет
+        self.bundle_version = None
+        self.compile_models()
+        return results
+
+    def _extra_estimators(self, model: Any, rows: int) -> int:
+        """
+        Скільки дерев додати ансамблю: пропорційно частці нових даних, не
+        менше INCREMENTAL_MIN_ESTIMATORS і в межах MAX_ENSEMBLE_ESTIMATORS.
+        0 - модель не підтримує warm_start або ансамбль уже максимальний
+        """
+        params = model.get_params()
+        if 'warm_start' not in params or 'n_estimators' not in params:
+            return 0
+        n_estimators = params['n_estimators']
+        extra = max(INCREMENTAL_MIN_ESTIMATORS, math.ceil(n_estimators * rows / max(1, self.training_rows)))
+        return max(0, min(extra, MAX_ENSEMBLE_ESTIMATORS - n_estimators))
+
+    def compile_models(self):
+        """Будує компактні NumPy предиктори для моделей та оновлює стан прогнозу"""
+        compiled_models = {}
+        for name, model in self.models.items():
+            compiled = compile_model(model)
+            if compiled is not None:
+                compiled_models[name] = compiled
+            else:
+                logger.warning(f"Модель {name} не підтримує компактний прогноз, використовую predict")
+
+        if self.best_model_name not in self.models:
+            self.best_model_name = next((name for name in MODEL_PREFERENCE if name in self.models), None)
+
+        scaler = self.scalers['scaler']
+        self.inference = InferenceState(
+            version=self.bundle_version,
+            feature_columns=list(self.feature_columns),
+            numeric_columns=list(scaler.feature_names_in_),
+            scaler_mean=scaler.mean_,
+            scaler_scale=scaler.scale_,
+            category_encoders=dict(self.label_encoders),
+            compiled_models=compiled_models,
+            best_model_name=self.best_model_name,
+            model_metrics=dict(self.model_metrics),
+        )
+
+    @staticmethod
+    def _feature_matrix(records: List[Dict[str, Any]], state: InferenceState) -> np.ndarray:
+        """
+        Матриця ознак у порядку навчання без pandas - ті самі перетворення,
+        що й prepare_features: коди категорій, стандартизація (пропуски -
+        середні навчання), похідні ознаки від стандартизованих значень
+        """
+        numeric = np.array(
+            [[np.nan if record.get(col) is None else record[col] for col in state.numeric_columns]
+             for record in records],
+            dtype=np.float64
+        ).reshape(len(records), len(state.numeric_columns))
+        numeric = np.where(np.isnan(numeric), state.scaler_mean, numeric)
+        numeric = (numeric - state.scaler_mean) / state.scaler_scale
+        values = dict(zip(state.numeric_columns, numeric.T))
+
+        for col, encoder in state.category_encoders.items():
+            values[col] = encoder.transform([record.get(col) for record in records]).astype(np.float64)
+
+        for col in ('has_balcony', 'has_elevator'):
+            values[col] = np.array([float(bool(record.get(col))) for record in records])
+
+        if 'area_total' in values and 'rooms' in values:
+            values['room_density'] = values['rooms'] / values['area_total']
+        if 'floor' in values and 'total_floors' in values:
+            values['floor_ratio'] = values['floor'] / values['total_floors']
+            values['is_first_floor'] = (values['floor'] == 1).astype(np.float64)
+            values['is_last_floor'] = (values['floor'] == values['total_floors']).astype(np.float64)
+
+        return np.column_stack([values[col] for col in state.feature_columns])
+
+    def predict_batch(self, records: List[Dict[str, Any]], model_name: str = None) -> np.ndarray:
+        """Прогноз цін для списку об'єктів однією векторною операцією"""
+        state = self.inference
+        model_name = model_name or state.best_model_name
+        X = self._feature_matrix(records, state)
+
+        compiled = state.compiled_models.get(model_name)
+        if compiled is not None:
+            return compiled.predict(X)
+        return self.models[model_name].predict(pd.DataFrame(X, columns=state.feature_columns))
+
     def predict_price(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
         """Прогнозування ціни для конкретного об'єкта"""
 
-        if not self.models:
+        self.reload_if_changed()
+
+        state = self.inference
+        if state is None:
             return {
                 'error': 'Моделі не навчені',
                 'predicted_price': None,
@@ -211,47 +450,27 @@ class RealEstateMLModel:
             }
 
         try:
-            # Конвертуємо словник в DataFrame
-            df = pd.DataFrame([property_data])
-
-            # Підготовка ознак
-            X, _ = self.prepare_features(df)
-
             # Якщо недостатньо ознак, використовуємо просту формулу
-            if len(X.columns) < 5:
+            if len(state.feature_columns) < 5 or state.best_model_name is None:
                 logger.warning("Недостатньо ознак для ML моделі, використовую просту оцінку")
                 return self._simple_prediction(property_data)
 
-            # Прогнозування найкращою моделлю
-            best_model_name = None
-            best_model = None
-            best_mae = float('inf')
-
-            for name, model in self.models.items():
-                if hasattr(model, 'predict'):
-                    try:
-                        pred = model.predict(X)
-                        mae = abs(pred[0] - property_data.get('price_uah', 0))
-                        if mae < best_mae:
-                            best_mae = mae
-                            best_model = model
-                            best_model_name = name
-                    except:
-                        continue
-
-            if best_model is None:
-                return self._simple_prediction(property_data)
+            # Найкраща модель визначена при навчанні - один прогноз
+            predicted_price = float(self.predict_batch([property_data])[0])
 
-            predicted_price = best_model.predict(X)[0]
-
-            # Обчислення впевненості на основі MAE найкращої моделі
-            confidence = max(0, min(1, 1 - (best_mae / predicted_price)))
+            # Впевненість на основі MAE моделі на тестовій вибірці
+            mae = state.model_metrics.get(state.best_model_name, {}).get('mae')
+            if mae is not None and predicted_price > 0:
+                confidence = max(0, min(1, 1 - (mae / predicted_price)))
+            else:
+                confidence = 0.7
 
             return {
                 'predicted_price': max(0, predicted_price),
                 'confidence': confidence,
-                'model_used': best_model_name,
-                'mae': best_mae
+                'model_used': state.best_model_name,
+                'model_version': state.version,
+                'mae': mae
             }
 
         except Exception as e:
@@ -316,81 +535,207 @@ class RealEstateMLModel:
             'note': 'Використано просту формулу оцінки'
         }
 
-    def save_models(self) -> bool:
-        """Збереження навченых моделей"""
+    def save_models(self, activate: bool = True) -> bool:
+        """
+        Зберігає навчені моделі одним пакетом версії <час>_<хеш даних>:
+        маніфест (ознаки, енкодери, скейлер, метрики, хеш даних навчання),
+        плоскі масиви дерев (.npy) та моделі sklearn без стиснення (mmap).
+        activate - зробити пакет активним (файл CURRENT)
+        """
 
         if not SKLEARN_AVAILABLE:
             logger.warning("sklearn недоступен, сохранение моделей невозможно")
             return False
 
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-            for name, model in self.models.items():
-                if hasattr(model, 'fit'):  # Перевіряємо, чи це валідна модель
-                    model_path = os.path.join(self.model_dir, f'{name}_model_{timestamp}.pkl')
-                    joblib.dump(model, model_path)
-                    logger.info(f"Збережено модель {name} в {model_path}")
+            if self.inference is None:
+                self.compile_models()
+
+            version = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{(self.training_data_hash or 'unknown')[:8]}"
+            bundle_path = os.path.join(self.model_dir, BUNDLES_DIR, version)
+            staging_path = bundle_path + '.tmp'
+            shutil.rmtree(staging_path, ignore_errors=True)
+            os.makedirs(staging_path)
+
+            scaler = self.scalers['scaler']
+            manifest = {
+                'version': version,
+                'created_at': datetime.utcnow().isoformat(),
+                'feature_columns': list(self.feature_columns),
+                'numeric_columns': list(scaler.feature_names_in_),
+                'scaler': {'mean': scaler.mean_.tolist(), 'scale': scaler.scale_.tolist()},
+                'encoders': {col: [str(c) for c in encoder.classes_] for col, encoder in self.label_encoders.items()},
+                'metrics': self.model_metrics,
+                'best_model': self.best_model_name,
+                'training_data_hash': self.training_data_hash,
+                'training_rows': self.training_rows,
+                'training_watermark': self.training_watermark.isoformat() if self.training_watermark else None,
+                'models': {
+                    name: save_compiled(compiled, staging_path, name)
+                    for name, compiled in self.inference.compiled_models.items()
+                },
+                'sklearn_payload': SKLEARN_PAYLOAD,
+            }
 
-            # Зберігаємо скейлери та енкодери
-            for name, scaler in self.scalers.items():
-                scaler_path = os.path.join(self.model_dir, f'{name}_{timestamp}.pkl')
-                joblib.dump(scaler, scaler_path)
+            joblib.dump(dict(self.models), os.path.join(staging_path, SKLEARN_PAYLOAD))
+            with open(os.path.join(staging_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
 
-            for name, encoder in self.label_encoders.items():
-                encoder_path = os.path.join(self.model_dir, f'{name}_encoder_{timestamp}.pkl')
-                joblib.dump(encoder, encoder_path)
+            # Пакет з'являється лише повністю записаним
+            os.replace(staging_path, bundle_path)
+            self.bundle_version = version
+            self.inference = self.inference._replace(version=version)
+            logger.info(f"Збережено пакет моделей {version} в {bundle_path}")
 
-            logger.info("Всі моделі збережено")
+            if activate:
+                self._write_current(version)
             return True
 
         except Exception as e:
             logger.error(f"Помилка збереження моделей: {e}")
             return False
 
-    def load_models(self, timestamp: str = None) -> bool:
-        """Завантаження навченых моделей"""
+    def load_models(self, version: str = None) -> bool:
+        """
+        Завантажує пакет моделей (за замовчуванням активний з CURRENT або
+        найновіший). Масиви дерев відображаються в пам'ять (mmap) і
+        спільні для всіх процесів через page cache; моделі sklearn
+        завантажуються лише при першому зверненні до self.models
+        """
 
         if not SKLEARN_AVAILABLE:
             logger.warning("sklearn недоступен, загрузка моделей невозможна")
             return False
 
         try:
-            if timestamp is None:
-                # Знаходимо найновіші файли моделей
-                model_files = [f for f in os.listdir(self.model_dir) if f.endswith('.pkl')]
-                if not model_files:
-                    logger.warning("Не знайдено збережених моделей")
-                    return False
-
-                # Беремо найновіші файли
-                model_files.sort(reverse=True)
-                timestamp = model_files[0].split('_')[-1].replace('.pkl', '')
-
-            # Завантажуємо моделі
-            for name in ['linear', 'random_forest', 'gradient_boosting']:
-                model_path = os.path.join(self.model_dir, f'{name}_model_{timestamp}.pkl')
-                if os.path.exists(model_path):
-                    self.models[name] = joblib.load(model_path)
-                    logger.info(f"Завантажено модель {name}")
-
-            # Завантажуємо скейлери та енкодери
-            scaler_path = os.path.join(self.model_dir, f'scaler_{timestamp}.pkl')
-            if os.path.exists(scaler_path):
-                self.scalers['scaler'] = joblib.load(scaler_path)
-
-            for col in ['city', 'district', 'building_type', 'condition', 'heating']:
-                encoder_path = os.path.join(self.model_dir, f'{col}_encoder_{timestamp}.pkl')
-                if os.path.exists(encoder_path):
-                    self.label_encoders[col] = joblib.load(encoder_path)
-
-            logger.info("Всі моделі завантажено")
+            if version is None:
+                version = self.current_version()
+            if version is None:
+                bundles = self.list_bundles()
+                version = bundles[-1]['version'] if bundles else None
+            if version is None:
+                logger.warning("Не знайдено збережених моделей")
+                return False
+
+            bundle_path = os.path.join(self.model_dir, BUNDLES_DIR, version)
+            with open(os.path.join(bundle_path, MANIFEST_FILE), encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            compiled_models = {
+                name: load_compiled(bundle_path, meta, mmap_mode='r')
+                for name, meta in manifest['models'].items()
+            }
+
+            label_encoders = {col: CategoryEncoder(classes) for col, classes in manifest['encoders'].items()}
+
+            numeric_columns = manifest['numeric_columns']
+            scaler = StandardScaler()
+            scaler.mean_ = np.array(manifest['scaler']['mean'])
+            scaler.scale_ = np.array(manifest['scaler']['scale'])
+            scaler.var_ = scaler.scale_ ** 2
+            scaler.n_features_in_ = len(numeric_columns)
+            scaler.feature_names_in_ = np.array(numeric_columns, dtype=object)
+            scaler.n_samples_seen_ = manifest['training_rows']
+
+            state = InferenceState(
+                version=version,
+                feature_columns=manifest['feature_columns'],
+                numeric_columns=numeric_columns,
+                scaler_mean=scaler.mean_,
+                scaler_scale=scaler.scale_,
+                category_encoders=label_encoders,
+                compiled_models=compiled_models,
+                best_model_name=manifest['best_model'],
+                model_metrics=manifest['metrics'],
+            )
+
+            self.scalers = {'scaler': scaler}
+            self.label_encoders = label_encoders
+            self.feature_columns = manifest['feature_columns']
+            self.model_metrics = manifest['metrics']
+            self.best_model_name = manifest['best_model']
+            self.training_data_hash = manifest['training_data_hash']
+            self.training_rows = manifest['training_rows']
+            watermark = manifest.get('training_watermark')
+            self.training_watermark = datetime.fromisoformat(watermark) if watermark else None
+            self._models = {}
+            self._models_path = os.path.join(bundle_path, manifest['sklearn_payload'])
+            self.bundle_version = version
+
+            # Запити, що вже виконуються, дочитують попередній стан
+            self.inference = state
+
+            logger.info(f"Завантажено пакет моделей {version}")
             return True
 
         except Exception as e:
             logger.error(f"Помилка завантаження моделей: {e}")
             return False
 
+    def activate_bundle(self, version: str) -> bool:
+        """Перемикає активний пакет без перезапуску (і для інших процесів через CURRENT)"""
+        if version not in {bundle['version'] for bundle in self.list_bundles()}:
+            logger.warning(f"Пакет моделей {version} не знайдено")
+            return False
+        if not self.load_models(version):
+            return False
+        self._write_current(version)
+        return True
+
+    def reload_if_changed(self):
+        """Підхоплює пакет, активований в іншому процесі (не частіше reload_interval)"""
+        if self.bundle_version is None:
+            return
+
+        now = time.monotonic()
+        if now - self._last_reload_check < self.reload_interval:
+            return
+        self._last_reload_check = now
+
+        current = self.current_version()
+        if current is not None and current != self.bundle_version:
+            logger.info(f"Активний пакет змінився: {self.bundle_version} -> {current}")
+            self.load_models(current)
+
+    def current_version(self) -> Optional[str]:
+        """Версія з файлу CURRENT"""
+        try:
+            with open(os.path.join(self.model_dir, CURRENT_FILE), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def list_bundles(self) -> List[Dict[str, Any]]:
+        """Збережені пакети (від найстарішого) з короткими даними маніфестів"""
+        bundles_path = os.path.join(self.model_dir, BUNDLES_DIR)
+        if not os.path.isdir(bundles_path):
+            return []
+
+        current = self.current_version()
+        bundles = []
+        for version in sorted(os.listdir(bundles_path)):
+            manifest_path = os.path.join(bundles_path, version, MANIFEST_FILE)
+            if not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            bundles.append({
+                'version': version,
+                'created_at': manifest['created_at'],
+                'best_model': manifest['best_model'],
+                'metrics': manifest['metrics'],
+                'training_rows': manifest['training_rows'],
+                'active': version == current,
+            })
+        return bundles
+
+    def _write_current(self, version: str):
+        """Атомарно записує активну версію"""
+        current_path = os.path.join(self.model_dir, CURRENT_FILE)
+        with open(current_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(version)
+        os.replace(current_path + '.tmp', current_path)
+
     def evaluate_models(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Оцінка якості моделей"""
 
@@ -403,12 +748,18 @@ class RealEstateMLModel:
             return {'error': 'Недостатньо даних для оцінки'}
 
         results = {}
+        pool = TrainingPool(self.max_workers)
+        folds = 5
 
         for name, model in self.models.items():
             if hasattr(model, 'predict'):
                 try:
-                    # Крос-валідація
-                    scores = cross_val_score(model, X, y, cv=5, scoring='neg_mean_absolute_error')
+                    # Крос-валідація: фолди паралельно, кожен фолд в один потік
+                    candidate = clone(model)
+                    if 'n_jobs' in candidate.get_params():
+                        candidate.set_params(n_jobs=1)
+                    scores = cross_val_score(candidate, X, y, cv=folds, scoring='neg_mean_absolute_error',
+                                             n_jobs=pool.cv_jobs(folds))
                     mae_cv = -scores.mean()
 
                     # Прогнозування
@@ -427,6 +778,12 @@ class RealEstateMLModel:
 
         return results
 
+def _watermark(df: pd.DataFrame) -> Optional[datetime]:
+    """Позначка навчальних даних - найпізніший updated_at (якщо колонка є)"""
+    if 'updated_at' not in df.columns or df['updated_at'].isna().all():
+        return None
+    return pd.Timestamp(df['updated_at'].max()).to_pydatetime()
+
 def prepare_training_data(csv_path: str = None) -> pd.DataFrame:
     """Підготовка даних для навчання моделі"""
 
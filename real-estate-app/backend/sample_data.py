@@ -0,0 +1,43 @@
+"""
+Тестова база для тестів бекенду: міста Харків і Київ, три райони Харкова
+та випадкові оголошення (з фіксованим seed)
+"""
+
+import sys
+import os
+import random
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from database import DatabaseManager
+from models import PropertyListing, City, District
+
+
+def make_database(size: int = 1500) -> DatabaseManager:
+    """Створює тестову базу в пам'яті з випадковими оголошеннями"""
+    rng = random.Random(11)
+    db_manager = DatabaseManager('sqlite://')
+    db_manager.create_tables()
+
+    with db_manager.get_session() as session:
+        session.add(City(id='kharkiv', name='Харків', region='Харківська', latitude=49.99, longitude=36.23))
+        session.add(City(id='kyiv', name='Київ', region='Київська', latitude=50.45, longitude=30.52))
+        for i, name in enumerate(['Центр', 'Салтівка', 'Олексіївка']):
+            session.add(District(id=f'district_{i}', city_id='kharkiv', name=name, type='district'))
+        session.flush()
+
+        for i in range(size):
+            session.add(PropertyListing(
+                id=f'listing_{i}', external_id=str(i), source='olx', title='Квартира', url=f'https://olx.ua/{i}',
+                city_id=rng.choice(['kharkiv', 'kharkiv', 'kyiv']),
+                district_id=rng.choice(['district_0', 'district_1', 'district_2', None]),
+                price_uah=rng.randint(500_000, 5_000_000), area_total=round(rng.uniform(20, 150), 1),
+                rooms=rng.choice([1, 2, 3, 4]), floor=rng.randint(1, 16), total_floors=rng.randint(5, 16),
+                building_type=rng.choice(['brick', 'panel', None]), condition=rng.choice(['good', 'fair']),
+                has_balcony=rng.choice([True, False]), has_elevator=rng.choice([True, False, None]),
+                latitude=rng.choice([None, rng.uniform(49.9, 50.1)]), longitude=rng.uniform(36.1, 36.4),
+                year_built=rng.choice([None, rng.randint(1960, 2020)]), address=f'вул. Тестова, {i}'
+            ))
+
+    return db_manager
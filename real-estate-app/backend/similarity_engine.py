@@ -0,0 +1,261 @@
+"""
+Векторизоване ядро схожості для KNN оцінки нерухомості
+Зберігає порівнювані поля кандидатів у колонкових масивах NumPy і рахує
+той самий зважений score, що й SimpleKNNValuator.calculate_similarity_score,
+для всього набору кандидатів за кілька операцій над масивами
+"""
+
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence
+
+import numpy as np
+
+# Опис факторів схожості у тому ж порядку, що й у calculate_similarity_score
+# (порядок важливий, щоб суми з плаваючою комою збігалися з еталоном).
+# (поле, тип, назва ваги в SimilarityWeights, параметр)
+#   category - точний збіг рядків, параметр: чи ігнорувати регістр
+#   range    - 1 - |різниця| / діапазон, параметр: діапазон
+#   exact    - точний збіг чисел
+#   boolean  - збіг булевих значень (None = відсутнє)
+#   location - відстань між координатами, параметр: максимальна відстань в км
+SIMILARITY_FIELDS = [
+    ('city', 'category', 'city_match', True),
+    ('district', 'category', 'district_match', True),
+    ('location', 'location', 'location_distance', 10.0),
+    ('distance_to_center', 'range', 'distance_to_center', 5.0),
+    ('area_total', 'range', 'area_similarity', 100.0),
+    ('rooms', 'exact', 'rooms_match', None),
+    ('floor', 'range', 'floor_similarity', 20.0),
+    ('total_floors', 'range', 'total_floors_similarity', 30.0),
+    ('floor_category', 'category', 'floor_category_match', False),
+    ('building_type', 'category', 'building_type_match', False),
+    ('year_built', 'range', 'year_built_similarity', 50.0),
+    ('condition', 'category', 'condition_match', False),
+    ('developer', 'category', 'developer_match', True),
+    ('building_series', 'category', 'building_series_match', True),
+    ('has_balcony', 'boolean', 'balcony_match', None),
+    ('has_elevator', 'boolean', 'elevator_match', None),
+    ('heating', 'category', 'heating_match', False),
+]
+
+NUMERIC_COLUMNS = ['latitude', 'longitude'] + [
+    field for field, kind, _, _ in SIMILARITY_FIELDS if kind in ('range', 'exact', 'boolean')
+]
+CATEGORY_COLUMNS = {
+    field: ignore_case for field, kind, _, ignore_case in SIMILARITY_FIELDS if kind == 'category'
+}
+
+# Код для відсутнього значення та для значення, якого немає серед кандидатів
+MISSING_CODE = -1
+UNKNOWN_CODE = -2
+
+
+def _normalize_category(value: Any, ignore_case: bool) -> Any:
+    """Приводить категоріальне значення до ключа словника кодів"""
+    return value.lower() if ignore_case else value
+
+
+def euclidean_distance_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Векторна версія SimpleKNNValuator._calculate_euclidean_distance"""
+    distance = np.sqrt((lats - lat) ** 2 + (lons - lon) ** 2)
+    km_per_degree = 111.0 * np.cos(np.radians((lat + lats) / 2))
+    return distance * km_per_degree
+
+
+def flat_distance_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Векторна версія KNNValuator._calculate_distance (111 км на градус)"""
+    return np.sqrt((lats - lat) ** 2 + (lons - lon) ** 2) * 111.0
+
+
+class FeatureMatrix:
+    """Колонкове представлення кандидатів для векторного порівняння"""
+
+    def __init__(self, ids: np.ndarray, numeric: Dict[str, np.ndarray],
+                 codes: Dict[str, np.ndarray], vocabularies: Dict[str, Dict[Any, int]]):
+        self.ids = ids
+        self.numeric = numeric
+        self.codes = codes
+        self.vocabularies = vocabularies
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence[Any]],
+                     vocabularies: Optional[Dict[str, Dict[Any, int]]] = None) -> 'FeatureMatrix':
+        """
+        Будує матрицю з колонок сирих значень (як у словниках оголошень).
+        Порожні значення (None, 0, '') вважаються відсутніми, як і в
+        calculate_similarity_score; для булевих полів відсутнім є лише None.
+        vocabularies - словники кодів існуючої матриці, які треба продовжити
+        (для подальшого concat)
+        """
+        ids = np.asarray(columns['id'], dtype=object)
+        size = len(ids)
+
+        numeric = {}
+        for field in NUMERIC_COLUMNS:
+            values = columns.get(field)
+            if values is None:
+                numeric[field] = np.full(size, np.nan)
+            elif field in ('has_balcony', 'has_elevator'):
+                numeric[field] = np.fromiter(
+                    (np.nan if v is None else float(v) for v in values), dtype=np.float64, count=size
+                )
+            else:
+                numeric[field] = np.fromiter(
+                    (float(v) if v else np.nan for v in values), dtype=np.float64, count=size
+                )
+
+        codes = {}
+        base_vocabularies = vocabularies or {}
+        vocabularies = {}
+        for field, ignore_case in CATEGORY_COLUMNS.items():
+            vocabulary: Dict[Any, int] = dict(base_vocabularies.get(field, {}))
+            values = columns.get(field)
+            if values is None:
+                codes[field] = np.full(size, MISSING_CODE, dtype=np.int32)
+            else:
+                codes[field] = np.fromiter(
+                    (vocabulary.setdefault(_normalize_category(v, ignore_case), len(vocabulary))
+                     if v else MISSING_CODE for v in values),
+                    dtype=np.int32, count=size
+                )
+            vocabularies[field] = vocabulary
+
+        return cls(ids, numeric, codes, vocabularies)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]]) -> 'FeatureMatrix':
+        """Будує матрицю зі списку словників оголошень"""
+        records = list(records)
+        fields = ['id'] + NUMERIC_COLUMNS + list(CATEGORY_COLUMNS)
+        return cls.from_columns({field: [r.get(field) for r in records] for field in fields})
+
+    def concat(self, other: 'FeatureMatrix') -> 'FeatureMatrix':
+        """
+        Повертає нову матрицю з рядками обох матриць.
+        other має бути побудована з vocabularies=self.vocabularies
+        """
+        return FeatureMatrix(
+            np.concatenate([self.ids, other.ids]),
+            {field: np.concatenate([self.numeric[field], other.numeric[field]]) for field in self.numeric},
+            {field: np.concatenate([self.codes[field], other.codes[field]]) for field in self.codes},
+            other.vocabularies
+        )
+
+    def take(self, indices: np.ndarray) -> 'FeatureMatrix':
+        """Повертає нову матрицю з вибраними рядками"""
+        return FeatureMatrix(
+            self.ids[indices],
+            {field: column[indices] for field, column in self.numeric.items()},
+            {field: column[indices] for field, column in self.codes.items()},
+            self.vocabularies
+        )
+
+    def category_code(self, field: str, value: Any) -> int:
+        """Повертає код категорії або UNKNOWN_CODE, якщо її немає серед кандидатів"""
+        key = _normalize_category(value, CATEGORY_COLUMNS[field])
+        return self.vocabularies[field].get(key, UNKNOWN_CODE)
+
+
+class SimilarityKernel:
+    """Обчислює зважений score схожості цільового об'єкта з усіма кандидатами"""
+
+    def __init__(self, weights, distance_fn=euclidean_distance_km):
+        self.weights = weights
+        self.distance_fn = distance_fn
+
+    def score(self, target: Mapping[str, Any], matrix: FeatureMatrix) -> np.ndarray:
+        """
+        Повертає масив score від 0 до 1 для кожного рядка матриці,
+        еквівалентний calculate_similarity_score(target, candidate)
+        """
+        return self.score_batch([target], matrix)[0]
+
+    def score_batch(self, targets: Sequence[Mapping[str, Any]], matrix: FeatureMatrix) -> np.ndarray:
+        """
+        Повертає матрицю score розміром (цілі x рядки) за один прохід.
+        Для цілі без значення поля до суми додається 0, тому кожен рядок
+        збігається з score(target, matrix) до біта
+        """
+        size = len(matrix)
+        score = np.zeros((len(targets), size))
+        total_weight = np.zeros((len(targets), size))
+
+        for field, kind, weight_name, param in SIMILARITY_FIELDS:
+            weight = getattr(self.weights, weight_name)
+
+            if kind == 'location':
+                located = np.array([bool(t.get('latitude') and t.get('longitude')) for t in targets])
+                if not located.any():
+                    continue
+                lat = np.array([t['latitude'] if ok else np.nan for t, ok in zip(targets, located)])[:, None]
+                lon = np.array([t['longitude'] if ok else np.nan for t, ok in zip(targets, located)])[:, None]
+                lats, lons = matrix.numeric['latitude'], matrix.numeric['longitude']
+                present = located[:, None] & ~(np.isnan(lats) | np.isnan(lons))
+                with np.errstate(invalid='ignore'):
+                    distance = self.distance_fn(lat, lon, lats, lons)
+                    similarity = np.maximum(0, 1 - (distance / param))
+
+            elif kind == 'category':
+                values = [t.get(field) for t in targets]
+                if not any(values):
+                    continue
+                codes = matrix.codes[field]
+                target_codes = np.array([
+                    matrix.category_code(field, v) if v else MISSING_CODE for v in values
+                ])[:, None]
+                present = (target_codes != MISSING_CODE) & (codes != MISSING_CODE)
+                similarity = codes == target_codes
+
+            elif kind == 'boolean':
+                values = [t.get(field) for t in targets]
+                if all(v is None for v in values):
+                    continue
+                column = matrix.numeric[field]
+                target_values = np.array([np.nan if v is None else float(v) for v in values])[:, None]
+                present = ~np.isnan(target_values) & ~np.isnan(column)
+                similarity = column == target_values
+
+            else:
+                values = [t.get(field) for t in targets]
+                if not any(values):
+                    continue
+                column = matrix.numeric[field]
+                target_values = np.array([float(v) if v else np.nan for v in values])[:, None]
+                present = ~np.isnan(target_values) & ~np.isnan(column)
+                if kind == 'exact':
+                    similarity = column == target_values
+                else:
+                    with np.errstate(invalid='ignore'):
+                        similarity = np.maximum(0, 1 - (np.abs(column - target_values) / param))
+
+            score += np.where(present, similarity * weight, 0.0)
+            total_weight += np.where(present, weight, 0.0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total_weight > 0, score / total_weight, 0.0)
+
+
+def top_k_indices(scores: np.ndarray, k: int, candidates: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Повертає індекси k найкращих score у порядку спадання.
+    Рівні score впорядковуються за індексом, як при стабільному сортуванні.
+    candidates - необов'язковий масив допустимих індексів
+    """
+    if candidates is None:
+        candidates = np.arange(len(scores))
+    if k <= 0 or len(candidates) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    values = scores[candidates]
+    if k < len(candidates):
+        kth_value = values[np.argpartition(-values, k - 1)[k - 1]]
+        above = np.flatnonzero(values > kth_value)
+        ties = np.flatnonzero(values == kth_value)[:k - len(above)]
+        selected = np.concatenate([above, ties])
+    else:
+        selected = np.arange(len(candidates))
+
+    order = np.lexsort((selected, -values[selected]))
+    return candidates[selected[order]]
@@ -0,0 +1,103 @@
+"""
+Просторовий індекс оголошень за координатами
+Рівномірна сітка на спроєктованих (рівнопроміжна проєкція) координатах:
+рядки відсортовані за ключем клітинки, тому запит по радіусу - це кілька
+бінарних пошуків замість перебору всіх оголошень
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+KM_PER_DEGREE = 111.0
+
+# Зсув і крок для упаковки номерів клітинок (cx, cy) в один int64 ключ
+_CELL_OFFSET = 1 << 20
+_KEY_STRIDE = 1 << 21
+
+
+class GridIndex:
+    """
+    Індекс рядків за координатами з рівномірною сіткою клітинок cell_km.
+    Рядки без координат (NaN) не індексуються і доступні через without_coordinates
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, cell_km: float = 1.0):
+        self.cell_km = cell_km
+
+        has_coordinates = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        self.without_coordinates = np.flatnonzero(~has_coordinates)
+        rows = np.flatnonzero(has_coordinates)
+
+        # Опорна широта для проєкції довготи в кілометри
+        self.ref_latitude = float(latitudes[rows].mean()) if len(rows) else 0.0
+        self.km_per_degree_lon = KM_PER_DEGREE * np.cos(np.radians(self.ref_latitude))
+
+        x, y = self._project(latitudes[rows], longitudes[rows])
+        keys = self._cell_key(np.floor(x / cell_km), np.floor(y / cell_km))
+        order = np.argsort(keys, kind='stable')
+
+        self.rows = rows[order]
+        self.keys = keys[order]
+        self.x = x[order]
+        self.y = y[order]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _project(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        """Переводить координати в кілометри на площині"""
+        return longitudes * self.km_per_degree_lon, latitudes * KM_PER_DEGREE
+
+    @staticmethod
+    def _cell_key(cx, cy):
+        """Пакує номери клітинок в один ключ"""
+        return (np.asarray(cx, dtype=np.int64) + _CELL_OFFSET) * _KEY_STRIDE + \
+            (np.asarray(cy, dtype=np.int64) + _CELL_OFFSET)
+
+    def query_radius(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        """Повертає відсортовані індекси рядків у межах radius_km від точки"""
+        if len(self.rows) == 0:
+            return np.empty(0, dtype=np.int64)
+
+        qx, qy = self._project(latitude, longitude)
+        cx_min, cx_max = int(np.floor((qx - radius_km) / self.cell_km)), int(np.floor((qx + radius_km) / self.cell_km))
+        cy_min, cy_max = int(np.floor((qy - radius_km) / self.cell_km)), int(np.floor((qy + radius_km) / self.cell_km))
+
+        # Для кожного стовпця сітки клітинки cy_min..cy_max лежать суцільним діапазоном ключів
+        columns = np.arange(cx_min, cx_max + 1)
+        starts = np.searchsorted(self.keys, self._cell_key(columns, cy_min), side='left')
+        ends = np.searchsorted(self.keys, self._cell_key(columns, cy_max), side='right')
+
+        # Розгортаємо діапазони [start, end) в один масив позицій без циклу
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(lengths.sum())
+        distance_sq = (self.x[positions] - qx) ** 2 + (self.y[positions] - qy) ** 2
+        return np.sort(self.rows[positions[distance_sq <= radius_km ** 2]])
+
+
+def radius_prefilter(index: GridIndex, candidates: np.ndarray, latitude: Optional[float],
+                     longitude: Optional[float], min_count: int,
+                     radii_km: Sequence[float]) -> np.ndarray:
+    """
+    Звужує кандидатів до тих, що лежать у радіусі від точки.
+    Радіус розширюється по radii_km, доки кандидатів не стане щонайменше
+    min_count; якщо не вистачає і на найбільшому радіусі - повертає всіх.
+    Рядки без координат залишаються завжди: відстань для них невідома,
+    і фактор відстані для них не враховується у score
+    """
+    if not (latitude and longitude) or len(candidates) <= min_count:
+        return candidates
+
+    size = len(index) + len(index.without_coordinates)
+    for radius_km in radii_km:
+        keep = np.zeros(size, dtype=bool)
+        keep[index.without_coordinates] = True
+        keep[index.query_radius(latitude, longitude, radius_km)] = True
+
+        selected = candidates[keep[candidates]]
+        if len(selected) >= min_count:
+            return selected
+
+    return candidates
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Тест пакетної оцінки: estimate_price_batch має давати ті самі результати,
+що й оцінка кожного об'єкта окремо
+"""
+
+import sys
+import os
+import random
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from knn_valuation import KNNValuator
+from knn_valuation_simple import SimpleKNNValuator
+from sample_data import make_database
+
+
+def make_targets(count: int):
+    """Цілі з різними містами, районами та частково відсутніми полями"""
+    rng = random.Random(5)
+    targets = []
+    for i in range(count):
+        targets.append({
+            'id': rng.choice([f'target_{i}', f'listing_{rng.randint(0, 1499)}']),
+            'city': rng.choice(['Харків', 'Київ']),
+            'district': rng.choice(['Центр', 'Салтівка', None]),
+            'area_total': rng.uniform(25, 140),
+            'rooms': rng.choice([1, 2, 3, None]),
+            'floor': rng.randint(1, 12),
+            'total_floors': rng.choice([9, 12, 16]),
+            'building_type': rng.choice(['brick', 'panel', None]),
+            'has_balcony': rng.choice([True, False, None]),
+            'latitude': rng.choice([None, rng.uniform(49.9, 50.1)]),
+            'longitude': rng.uniform(36.1, 36.4),
+        })
+    return targets
+
+
+def test_batch_matches_single_estimates():
+    """Пакетна оцінка збігається з поодинокою для обох валюаторів"""
+    db_manager = make_database()
+    targets = make_targets(120)
+
+    for valuator, estimate in [
+        (SimpleKNNValuator(db_manager, k=10), 'estimate_price_simple'),
+        (KNNValuator(db_manager, k=10), 'estimate_price'),
+    ]:
+        expected = [getattr(valuator, estimate)(target) for target in targets]
+        actual = list(valuator.estimate_price_batch(iter(targets)))
+
+        assert [r['id'] for r in actual] == [t['id'] for t in targets]
+        for single, batched in zip(expected, actual):
+            batched = dict(batched)
+            batched.pop('id')
+            assert batched == single
+
+
+if __name__ == "__main__":
+    print("🚀 Запуск тесту пакетної оцінки\n")
+    test_batch_matches_single_estimates()
+    print("✅ Пакетна оцінка збігається з поодинокою")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Тест пулу блокуючої роботи: межі груп, відхилення при переповненій черзі
+та доступність /health, поки оцінки насичують свою групу
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from blocking_pool import BlockingPool, PoolSaturated
+
+
+def test_lane_limit_and_queue_depth():
+    """Одночасно виконується не більше limit задач групи, решта чекає в черзі"""
+    pool = BlockingPool({'valuation': 2, 'health': 1}, max_waiting=3)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow():
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        time.sleep(0.1)
+        with lock:
+            active.pop()
+        return 'ok'
+
+    async def scenario():
+        tasks = [asyncio.create_task(pool.run('valuation', slow)) for _ in range(5)]
+        await asyncio.sleep(0.02)
+        stats = pool.stats()['valuation']
+        assert stats['running'] == 2 and stats['waiting'] == 3
+
+        # Черга заповнена - нова задача відхиляється одразу
+        try:
+            await pool.run('valuation', slow)
+            raise AssertionError("очікувалось PoolSaturated")
+        except PoolSaturated as e:
+            assert e.lane == 'valuation'
+
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == ['ok'] * 5
+    assert max(peak) == 2
+
+    stats = pool.stats()['valuation']
+    assert stats['completed'] == 5 and stats['rejected'] == 1 and stats['peak_waiting'] == 3
+    assert stats['running'] == 0 and stats['waiting'] == 0
+    pool.shutdown()
+
+
+def test_health_responsive_while_valuations_saturated():
+    """/health відповідає швидко, поки оцінки займають усі свої потоки"""
+    import httpx
+
+    import main
+    from sample_data import make_database
+
+    def slow_valuation(property_id):
+        time.sleep(0.5)
+        return {"property_id": property_id}
+
+    original = main.db_manager, main._compute_valuation, main.blocking_pool
+    main.db_manager = make_database(20)
+    main._compute_valuation = slow_valuation
+    main.blocking_pool = BlockingPool({'valuation': 2, 'health': 1}, max_waiting=64)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            valuations = [asyncio.create_task(client.get(f'/properties/p{i}/valuation')) for i in range(8)]
+            await asyncio.sleep(0.05)
+
+            started = time.monotonic()
+            health = await client.get('/health')
+            health_seconds = time.monotonic() - started
+
+            responses = await asyncio.gather(*valuations)
+            return health, health_seconds, responses
+
+    try:
+        health, health_seconds, responses = asyncio.run(scenario())
+        assert health.status_code == 200
+        assert health_seconds < 0.3, health_seconds
+        assert all(response.status_code == 200 for response in responses)
+        assert main.blocking_pool.stats()['valuation']['peak_waiting'] >= 5
+    finally:
+        main.blocking_pool.shutdown()
+        main.db_manager, main._compute_valuation, main.blocking_pool = original
+
+
+def test_health_saturated_returns_503():
+    """Переповнена група 'health' - 503 з Retry-After, а не 500"""
+    import httpx
+
+    import main
+
+    original = main.blocking_pool
+    main.blocking_pool = BlockingPool({'health': 1}, max_waiting=1)
+
+    async def scenario():
+        release = threading.Event()
+        # Одна задача виконується, друга заповнює чергу
+        busy = [asyncio.create_task(main.blocking_pool.run('health', release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.02)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.get('/health')
+        release.set()
+        await asyncio.gather(*busy)
+        return response
+
+    try:
+        response = asyncio.run(scenario())
+        assert response.status_code == 503
+        assert response.headers['retry-after'] == '1'
+    finally:
+        main.blocking_pool.shutdown()
+        main.blocking_pool = original
+
+
+def test_batch_valuation_runs_in_valuation_lane():
+    """Пакетна оцінка рахується порціями в групі 'valuation' та отримує 503 при переповненій черзі"""
+    import json
+
+    import httpx
+
+    import main
+    from knn_valuation_simple import SimpleKNNValuator
+    from sample_data import make_database
+
+    original = main.knn_valuator, main.blocking_pool, main.BATCH_CHUNK_SIZE
+    main.knn_valuator = SimpleKNNValuator(make_database(50), k=5)
+    main.blocking_pool = BlockingPool({'valuation': 1, 'health': 1}, max_waiting=1)
+    main.BATCH_CHUNK_SIZE = 2
+    properties = [{'property_id': f'p{i}', 'city': 'Харків', 'area': 40.0 + i, 'rooms': 2} for i in range(5)]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            response = await client.post('/valuations/batch', json={'properties': properties})
+
+            # Група зайнята, черга заповнена - новий пакет відхиляється до початку потоку
+            release = threading.Event()
+            busy = [asyncio.create_task(main.blocking_pool.run('valuation', release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.02)
+            rejected = await client.post('/valuations/batch', json={'properties': properties})
+            release.set()
+            await asyncio.gather(*busy)
+            return response, rejected
+
+    try:
+        response, rejected = asyncio.run(scenario())
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line['property_id'] for line in lines] == [f'p{i}' for i in range(5)]
+        assert [line['index'] for line in lines] == list(range(5))
+        # Три порції (2 + 2 + 1) пройшли через групу 'valuation'
+        assert main.blocking_pool.stats()['valuation']['completed'] >= 3
+        assert rejected.status_code == 503
+    finally:
+        main.blocking_pool.shutdown()
+        main.knn_valuator, main.blocking_pool, main.BATCH_CHUNK_SIZE = original
+
+
+if __name__ == "__main__":
+    print("=== Тест пулу блокуючої роботи ===")
+    test_lane_limit_and_queue_depth()
+    print("✅ Межі груп та черга працюють")
+    test_health_responsive_while_valuations_saturated()
+    print("✅ /health доступний при насичених оцінках")
+    test_health_saturated_returns_503()
+    print("✅ Переповнена перевірка здоров'я - 503")
+    test_batch_valuation_runs_in_valuation_lane()
+    print("✅ Пакетна оцінка в групі valuation")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Тест векторного кодування категорій: коди збігаються з LabelEncoder,
+невідомі значення та пропуски не ламають навчання і прогноз
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sklearn.preprocessing import LabelEncoder
+
+from category_encoding import CategoryEncoder, MISSING_CATEGORY, UNKNOWN_CODE
+from ml_model import RealEstateMLModel, create_synthetic_data
+
+
+def test_encoder_codes():
+    """Коди як у LabelEncoder, невідомі - UNKNOWN_CODE, однаково для малих і великих масивів"""
+    rng = np.random.default_rng(0)
+    districts = np.array(['Центр', 'Салтівка', 'Олексіївка', 'Холодна Гора', 'ХТЗ'], dtype=object)
+    train = pd.Series(rng.choice(districts, size=5000))
+    train[::97] = None
+
+    encoder = CategoryEncoder().fit(train)
+    labels = train.fillna(MISSING_CATEGORY).astype(str)
+    reference = LabelEncoder().fit(labels)
+    assert list(encoder.classes_) == list(reference.classes_)
+    assert MISSING_CATEGORY in encoder.classes_
+
+    codes = encoder.transform(train)
+    assert codes.dtype == np.int32
+    np.testing.assert_array_equal(codes, reference.transform(labels))
+
+    # Нові значення - окремий код, пропуски (None та NaN) - категорія пропусків
+    values = ['Центр', 'Новий район', None, np.nan, 'ХТЗ'] * 100
+    expected = [encoder.encode(value) for value in values]
+    assert expected[:5] == [reference.transform(['Центр'])[0], UNKNOWN_CODE,
+                            encoder.encode(None), encoder.encode(None), reference.transform(['ХТЗ'])[0]]
+    np.testing.assert_array_equal(encoder.transform(values), expected)
+    np.testing.assert_array_equal(encoder.transform(values[:5]), expected[:5])
+
+    # Categorical (завантажувач даних) кодується так само, як рядки
+    np.testing.assert_array_equal(encoder.transform(pd.Series(values, dtype='category')), expected)
+
+    # Відновлення з маніфесту пакета
+    restored = CategoryEncoder(encoder.classes_)
+    np.testing.assert_array_equal(restored.transform(values), expected)
+
+
+def test_prepare_features_unknown_categories():
+    """Невідомий район при повторній підготовці ознак отримує UNKNOWN_CODE"""
+    df = create_synthetic_data(300)
+    ml_model = RealEstateMLModel(model_dir=tempfile.mkdtemp())
+    X_train, _ = ml_model.prepare_features(df)
+    assert X_train['district'].dtype == np.int32
+
+    new_data = df.head(10).copy()
+    new_data.loc[new_data.index[:3], 'district'] = 'Невідомий район'
+    X_new, _ = ml_model.prepare_features(new_data)
+    assert (X_new['district'].iloc[:3] == UNKNOWN_CODE).all()
+    np.testing.assert_array_equal(X_new['district'].iloc[3:], X_train['district'].iloc[3:10])
+
+
+if __name__ == "__main__":
+    print("=== Тест кодування категорій ===")
+    test_encoder_codes()
+    print("✅ Коди збігаються з LabelEncoder")
+    test_prepare_features_unknown_categories()
+    print("✅ Невідомі категорії кодуються окремим кодом")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Тест інкрементального донавчання: читаються лише оголошення після
+позначки пакета, ансамблі доповнюються деревами, кандидат без перевірки
+на відкладених даних не замінює моделі
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from sqlalchemy import update
+
+from ml_model import RealEstateMLModel
+from models import PropertyListing
+from sample_data import make_database
+from training_data import load_training_frame
+
+
+def make_history():
+    """База, де 1200 оголошень старі, а 300 змінені після навчання"""
+    db_manager = make_database(1500)
+    trained_at = datetime(2026, 1, 10)
+    with db_manager.get_session() as session:
+        session.execute(update(PropertyListing).values(updated_at=trained_at - timedelta(days=3)))
+        session.execute(
+            update(PropertyListing)
+            .where(PropertyListing.id.in_([f'listing_{i}' for i in range(1200, 1500)]))
+            .values(updated_at=trained_at + timedelta(hours=1))
+        )
+    return db_manager, trained_at
+
+
+def test_incremental_update_from_watermark():
+    db_manager, trained_at = make_history()
+    model_dir = tempfile.mkdtemp()
+
+    full = load_training_frame(db_manager.engine)
+    history = full[full['updated_at'] <= trained_at]
+    ml_model = RealEstateMLModel(model_dir=model_dir, max_workers=1)
+    ml_model.train_models(history)
+    assert ml_model.training_watermark == trained_at - timedelta(days=3)
+    assert ml_model.save_models()
+    base_version = ml_model.bundle_version
+
+    # Новий процес: позначка з маніфесту, дельта - лише змінені оголошення
+    retrained = RealEstateMLModel(model_dir=model_dir, max_workers=1)
+    assert retrained.load_models()
+    assert retrained.training_watermark == ml_model.training_watermark
+    delta = load_training_frame(db_manager.engine, since=retrained.training_watermark)
+    assert len(delta) == 300
+
+    results = retrained.update_models(delta, tolerance=1.0)
+    assert results['promoted']
+    assert results['linear']['status'] == 'skipped'
+    for name in ('random_forest', 'gradient_boosting'):
+        assert results[name]['status'] == 'updated'
+        # 100 дерев на 1200 записах -> 20 нових дерев на 240 записах дельти
+        assert results[name]['n_estimators'] == 120
+        assert len(np.ravel(retrained.models[name].estimators_)) == 120
+        assert not retrained.models[name].warm_start
+
+    assert retrained.training_rows == 1500
+    assert retrained.training_watermark == trained_at + timedelta(hours=1)
+
+    record = delta.drop(columns='price_uah').iloc[0].to_dict()
+    for name in ('random_forest', 'gradient_boosting'):
+        X, _ = retrained.prepare_features(delta.head(20))
+        np.testing.assert_allclose(retrained.predict_batch(delta.head(20).to_dict('records'), name),
+                                   retrained.models[name].predict(X), rtol=1e-9)
+    assert retrained.predict_price(record)['predicted_price'] > 0
+
+    assert retrained.save_models()
+    assert retrained.current_version() == retrained.bundle_version != base_version
+    reloaded = RealEstateMLModel(model_dir=model_dir)
+    assert reloaded.load_models()
+    assert reloaded.training_watermark == trained_at + timedelta(hours=1)
+    assert reloaded.training_rows == 1500
+
+
+def test_rejected_candidates_keep_models():
+    """Кандидати, гірші за поточні моделі на відкладених даних, відхиляються"""
+    db_manager, trained_at = make_history()
+    full = load_training_frame(db_manager.engine)
+    ml_model = RealEstateMLModel(model_dir=tempfile.mkdtemp(), max_workers=1)
+    ml_model.train_models(full[full['updated_at'] <= trained_at])
+    inference = ml_model.inference
+    watermark = ml_model.training_watermark
+
+    delta = load_training_frame(db_manager.engine, since=watermark)
+    results = ml_model.update_models(delta, tolerance=-1.0)
+    assert not results['promoted']
+    assert {results[name]['status'] for name in ('random_forest', 'gradient_boosting')} == {'rejected'}
+    assert ml_model.inference is inference
+    assert ml_model.training_watermark == watermark
+    assert len(ml_model.models['random_forest'].estimators_) == 100
+
+    assert 'error' in ml_model.update_models(delta.head(10))
+
+
+if __name__ == "__main__":
+    print("=== Тест інкрементального донавчання ===")
+    test_incremental_update_from_watermark()
+    print("✅ Донавчання на змінених оголошеннях")
+    test_rejected_candidates_keep_models()
+    print("✅ Кандидати без перевірки відхиляються")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Тест інкрементального оновлення знімка оголошень: зміни після watermark
+підхоплюються без повного перезавантаження, версія знімка та покоління
+кешу зростають лише при змінах
+"""
+
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from listing_snapshot import ListingSnapshotCache
+from models import PropertyListing
+from sample_data import make_database
+
+REFRESH_INTERVAL = 0.05
+
+
+def update_listing(db_manager, listing_id: str, **values):
+    """Змінює оголошення так, як це робить збереження з парсера (зсуваючи updated_at)"""
+    with db_manager.get_session() as session:
+        session.query(PropertyListing).filter(PropertyListing.id == listing_id).update(
+            {**values, 'updated_at': datetime.utcnow() + timedelta(seconds=1)}
+        )
+
+
+def test_incremental_refresh():
+    """Змінена ціна та деактивоване оголошення підхоплюються після refresh_interval"""
+    db_manager = make_database(60)
+    cache = ListingSnapshotCache(db_manager, refresh_interval=REFRESH_INTERVAL)
+
+    first = cache.get('kharkiv')
+    assert cache.counters['misses'] == 1 and cache.counters['full_reloads'] == 1
+    generation = cache.generation
+
+    changed_id, removed_id = first.listings[0].id, first.listings[1].id
+    old_price = first.listings[0].price_uah
+    update_listing(db_manager, changed_id, price_uah=old_price + 12345)
+    update_listing(db_manager, removed_id, is_active=False)
+
+    # До закінчення інтервалу - той самий знімок без запитів
+    assert cache.get('kharkiv') is first
+    assert cache.counters['hits'] == 1 and cache.counters['incremental_refreshes'] == 0
+
+    time.sleep(REFRESH_INTERVAL + 0.01)
+    second = cache.get('kharkiv')
+    assert second is not first
+    assert second.version == first.version + 1
+    assert cache.generation == generation + 1
+    assert cache.counters['hits'] == 2 and cache.counters['misses'] == 1
+    assert cache.counters['incremental_refreshes'] == 1 and cache.counters['rows_refreshed'] == 2
+    assert cache.counters['full_reloads'] == 1
+
+    assert second.listings[second.positions[changed_id]].price_uah == old_price + 12345
+    assert removed_id not in second.positions
+    assert len(second) == len(first) - 1
+    # Попередній знімок не змінився - читачі зі старим посиланням бачать узгоджені дані
+    assert first.listings[first.positions[changed_id]].price_uah == old_price
+    assert removed_id in first.positions
+
+    stats = cache.stats()['snapshots']['kharkiv']
+    assert stats['version'] == second.version and stats['rows'] == len(second)
+    assert stats['staleness_seconds'] < REFRESH_INTERVAL
+
+    # Без змін - той самий знімок і покоління, лише оновлена позначка часу
+    time.sleep(REFRESH_INTERVAL + 0.01)
+    assert cache.get('kharkiv') is second
+    assert cache.generation == generation + 1
+    assert cache.counters['incremental_refreshes'] == 2 and cache.counters['rows_refreshed'] == 2
+    assert cache.stats()['snapshots']['kharkiv']['staleness_seconds'] < REFRESH_INTERVAL
+
+
+def test_listing_moved_to_another_city():
+    """Оголошення, перенесене в інше місто, зникає зі знімка старого міста"""
+    db_manager = make_database(60)
+    cache = ListingSnapshotCache(db_manager, refresh_interval=REFRESH_INTERVAL)
+    kharkiv = cache.get('kharkiv')
+    kyiv = cache.get('kyiv')
+
+    moved_id = kharkiv.listings[0].id
+    update_listing(db_manager, moved_id, city_id='kyiv', district_id=None)
+
+    time.sleep(REFRESH_INTERVAL + 0.01)
+    assert moved_id not in cache.get('kharkiv').positions
+    assert len(cache.get('kharkiv')) == len(kharkiv) - 1
+    assert moved_id in cache.get('kyiv').positions
+    assert len(cache.get('kyiv')) == len(kyiv) + 1
+    assert cache.get(None).listings[cache.get(None).positions[moved_id]].city == 'Київ'
+
+
+if __name__ == "__main__":
+    print("=== Тест інкрементального оновлення знімка ===")
+    test_incremental_refresh()
+    print("✅ Зміни після watermark підхоплюються інкрементально")
+    test_listing_moved_to_another_city()
+    print("✅ Перенесене в інше місто оголошення прибирається зі старого знімка")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Тест реєстру міст і районів: індекси за id та нормалізованою назвою,
+кілька міст, масиви центрів районів та ендпоінти довідника
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from location_types.location import (
+    KHARKIV_CITY, LOCATIONS, City, District, LocationRegistry,
+    get_city_coordinates, get_district_by_id, get_district_coordinates, get_districts_for_city,
+)
+
+KYIV_CITY = City(
+    id="8000000000",
+    name="Київ",
+    region="Київська",
+    coordinates={"latitude": 50.4501, "longitude": 30.5234},
+    average_price_per_sqm=2000,
+    districts=[
+        District(id="8036300000", name="Печерський", type="district",
+                 coordinates={"latitude": 50.4270, "longitude": 30.5550}),
+        District(id="kyiv_center", name="Центр", type="microdistrict"),
+    ],
+)
+
+
+def test_lookups_by_id_and_normalized_name():
+    district = KHARKIV_CITY.districts[0]
+    assert get_district_by_id(district.id) is district
+    assert get_district_by_id('unknown') is None
+
+    # Регістр, пробіли та вид апострофа не мають значення
+    assert LOCATIONS.district_by_name(' харків ', 'основ’янський') is district
+    assert LOCATIONS.district_by_name('ХАРКІВ', "Основ'янський") is district
+    assert get_district_coordinates('центр') == {"latitude": 49.9935, "longitude": 36.2304}
+    assert get_district_coordinates('Центр', 'Одеса') is None
+
+    assert get_districts_for_city('ХАРКІВ') == [d.name for d in KHARKIV_CITY.districts]
+    assert get_districts_for_city('Одеса') == []
+    assert get_city_coordinates('харків') == KHARKIV_CITY.coordinates
+
+
+def test_multiple_cities_and_arrays():
+    registry = LocationRegistry([KHARKIV_CITY, KYIV_CITY])
+    assert registry.city_names() == ['Харків', 'Київ']
+
+    # Однакові назви районів у різних містах не змішуються
+    assert registry.district_by_name('Київ', 'Центр').id == 'kyiv_center'
+    assert registry.district_by_name('Харків', 'Центр').id == 'micro_kharkiv_centr'
+    assert registry.district_city('8036300000') is KYIV_CITY
+
+    # Райони без координат у масиви не потрапляють
+    arrays = registry.district_arrays('київ')
+    assert list(arrays.ids) == ['8036300000']
+    np.testing.assert_array_equal(arrays.latitudes, [50.4270])
+    assert not arrays.latitudes.flags.writeable
+
+    kharkiv = registry.district_arrays('Харків')
+    assert len(kharkiv.ids) == len(KHARKIV_CITY.districts)
+    np.testing.assert_array_equal(kharkiv.longitudes, [d.coordinates['longitude'] for d in KHARKIV_CITY.districts])
+
+    # Заміна міста прибирає старі райони з індексів
+    registry.add_city(City(id=KYIV_CITY.id, name="Київ", region="Київська", coordinates=KYIV_CITY.coordinates,
+                           districts=[], average_price_per_sqm=2000))
+    assert registry.get_district('8036300000') is None
+    assert registry.district_names('Київ') == []
+
+
+def test_district_resolver_uses_registry_arrays():
+    """Визначник районів працює на масивах реєстру без запиту до БД"""
+    from district_assignment import DistrictResolver
+
+    arrays = LOCATIONS.district_arrays(KHARKIV_CITY.name)
+    resolver = DistrictResolver()
+    resolver.load_arrays({KHARKIV_CITY.id: arrays})
+    resolved = resolver.resolve([KHARKIV_CITY.id] * len(arrays.ids), arrays.latitudes, arrays.longitudes)
+    assert list(resolved) == list(arrays.ids)
+
+
+def test_location_endpoints():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    assert client.get('/cities').json() == {'cities': ['Харків']}
+    assert client.get('/cities/харків/districts').json()['districts'] == [d.name for d in KHARKIV_CITY.districts]
+    assert client.get('/cities/Одеса/districts').status_code == 404
+
+
+if __name__ == "__main__":
+    print("=== Тест реєстру міст і районів ===")
+    test_lookups_by_id_and_normalized_name()
+    print("✅ Пошук за id та нормалізованою назвою")
+    test_multiple_cities_and_arrays()
+    print("✅ Кілька міст та масиви центрів районів")
+    test_district_resolver_uses_registry_arrays()
+    print("✅ Визначник районів на масивах реєстру")
+    test_location_endpoints()
+    print("✅ Ендпоінти довідника")
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Тест кешу ринкової статистики: один розрахунок на ключ при одночасних
+промахах, закінчення TTL, ETag та 304 у ендпоінтах /market/*
+"""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from market_cache import MarketDataCache
+
+
+def test_concurrent_misses_compute_once():
+    """16 одночасних запитів з одним ключем - один розрахунок"""
+    cache = MarketDataCache(ttl=60.0)
+    calls = []
+    started = threading.Barrier(16)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'value': 42}
+
+    def request(_):
+        started.wait()
+        return cache.get(('stats', 'Харків', '', None), compute)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(request, range(16)))
+
+    assert len(calls) == 1
+    assert all(result.value == {'value': 42} for result in results)
+    assert len({result.etag for result in results}) == 1
+    assert cache.counters['misses'] == 1
+    assert cache.counters['hits'] + cache.counters['coalesced'] == 15
+
+
+def test_ttl_expiry_and_etag():
+    """Після TTL значення перераховується, ETag змінюється разом з вмістом"""
+    cache = MarketDataCache(ttl=0.05)
+    values = iter([{'price': 1}, {'price': 1}, {'price': 2}])
+
+    first = cache.get('key', lambda: next(values))
+    assert cache.get('key', lambda: next(values)) is first
+
+    time.sleep(0.06)
+    second = cache.get('key', lambda: next(values))
+    assert second is not first and second.etag == first.etag
+
+    time.sleep(0.06)
+    third = cache.get('key', lambda: next(values))
+    assert third.etag != first.etag
+
+
+def test_market_endpoints_revalidate():
+    """Ендпоінти повертають ETag/Cache-Control та 304 для If-None-Match"""
+    from datetime import datetime
+
+    from fastapi.testclient import TestClient
+
+    import main
+    from analyzers.market_analyzer import MarketAnalyzer
+    from analyzers.market_rollup import MarketStatsRollup
+    from sqlalchemy import func
+
+    from models import MarketStats, PropertyListing
+    from sample_data import make_database
+
+    db_manager = make_database(400)
+    with db_manager.get_session() as session:
+        session.query(PropertyListing).update({'created_at': datetime.utcnow()})
+    MarketStatsRollup(db_manager).run()
+
+    original = main.db_manager, main.market_analyzer, main.market_cache
+    main.db_manager = db_manager
+    main.market_analyzer = MarketAnalyzer(db_manager)
+    main.market_cache = MarketDataCache(ttl=60.0)
+    try:
+        client = TestClient(main.app)
+
+        response = client.get('/market/stats', params={'city': 'Харків', 'district': 'Центр'})
+        assert response.status_code == 200
+        body = response.json()
+        assert body['total_listings'] > 0 and body['district']['district'] == 'Центр'
+        assert response.headers['cache-control'].startswith('public, max-age=')
+
+        # Статистика з rollup market_stats, а не з оголошень
+        with db_manager.get_session() as session:
+            expected = session.query(func.sum(MarketStats.total_listings)).filter(
+                MarketStats.city_id == 'kharkiv', MarketStats.district_id.is_(None)).scalar()
+            expected_district = session.query(func.sum(MarketStats.total_listings)).filter(
+                MarketStats.city_id == 'kharkiv', MarketStats.district_id == 'district_0').scalar()
+            session.query(PropertyListing).delete()
+        assert body['total_listings'] == expected
+        assert body['district']['listings_count'] == expected_district
+
+        etag = response.headers['etag']
+        revalidated = client.get('/market/stats', params={'city': 'Харків', 'district': 'Центр'},
+                                 headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304 and revalidated.headers['etag'] == etag
+        # Назва міста та району нормалізується в ключі кешу
+        same = client.get('/market/stats', params={'city': ' харків', 'district': 'ЦЕНТР'})
+        assert same.status_code == 200 and same.headers['etag'] == etag
+        assert main.market_cache.counters['misses'] == 1
+
+        trends = client.get('/market/trends', params={'city': 'Харків', 'months': 12})
+        assert trends.status_code == 200
+        assert trends.json()['trends'][0]['total_listings'] > 0
+
+        # Помилки не кешуються, і 304 для них не повертається
+        missing = client.get('/market/trends', params={'city': 'Атлантида'})
+        assert missing.status_code == 404
+        assert client.get('/market/trends', params={'city': 'Атлантида'},
+                          headers={'If-None-Match': missing.headers.get('etag', '*')}).status_code == 404
+        assert main.market_cache.stats()['entries'] == 2
+    finally:
+        main.db_manager, main.market_analyzer, main.market_cache = original
+
+
+if __name__ == "__main__":
+    print("=== Тест кешу ринкової статистики ===")
+    test_concurrent_misses_compute_once()
+    print("✅ Одночасні промахи об'єднуються в один розрахунок")
+    test_ttl_expiry_and_etag()
+    print("✅ TTL та ETag працюють")
+    test_market_endpoints_revalidate()
+    print("✅ Ендпоінти підтримують ревалідацію")
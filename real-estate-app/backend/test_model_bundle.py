@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Тест пакетів моделей: один пакет на навчання з маніфестом, завантаження
+з mmap, ледаче завантаження sklearn та перемикання версій без перезапуску
+"""
+
+import sys
+import os
+import json
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_model import RealEstateMLModel, create_synthetic_data
+
+
+def train_bundle(model_dir: str, n_samples: int, seed_offset: int = 0):
+    df = create_synthetic_data(n_samples)
+    df['area_total'] += seed_offset
+    ml_model = RealEstateMLModel(model_dir=model_dir)
+    ml_model.train_models(df)
+    assert ml_model.save_models()
+    return ml_model, df.drop(columns='price_uah').to_dict('records')
+
+
+def test_bundle_roundtrip_with_mmap():
+    """Пакет містить маніфест і масиви; завантажений дає ті самі прогнози"""
+    model_dir = tempfile.mkdtemp()
+    trained, records = train_bundle(model_dir, 400)
+
+    bundle_path = os.path.join(model_dir, 'bundles', trained.bundle_version)
+    with open(os.path.join(bundle_path, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['feature_columns'] == trained.feature_columns
+    assert manifest['training_data_hash'] == trained.training_data_hash
+    assert manifest['best_model'] == trained.best_model_name
+    assert set(manifest['encoders']) == {'city', 'district', 'building_type', 'condition', 'heating'}
+
+    loaded = RealEstateMLModel(model_dir=model_dir)
+    assert loaded.load_models()
+    assert loaded.bundle_version == trained.bundle_version
+
+    # Масиви дерев відображені з файлів, моделі sklearn ще не завантажені
+    forest = loaded.inference.compiled_models['random_forest']
+    assert isinstance(forest.children.base, np.memmap)
+    assert loaded._models_path is not None
+
+    np.testing.assert_array_equal(loaded.predict_batch(records), trained.predict_batch(records))
+    assert loaded.predict_price(records[0])['model_version'] == trained.bundle_version
+
+    # Звернення до models завантажує sklearn моделі з пакета
+    assert set(loaded.models) == {'linear', 'random_forest', 'gradient_boosting'}
+    X, _ = loaded.prepare_features(create_synthetic_data(400).drop(columns='price_uah'))
+    np.testing.assert_allclose(loaded.models['gradient_boosting'].predict(X),
+                               loaded.predict_batch(records, 'gradient_boosting'), rtol=1e-9)
+
+
+def test_switch_bundles_at_runtime():
+    """Активація іншого пакета підхоплюється іншими процесами через CURRENT"""
+    model_dir = tempfile.mkdtemp()
+    first, records = train_bundle(model_dir, 300)
+    second, _ = train_bundle(model_dir, 300, seed_offset=5)
+    assert first.bundle_version != second.bundle_version
+
+    # Останній збережений пакет активний
+    worker = RealEstateMLModel(model_dir=model_dir, reload_interval=0.0)
+    assert worker.load_models()
+    assert worker.bundle_version == second.bundle_version
+
+    admin = RealEstateMLModel(model_dir=model_dir)
+    assert admin.activate_bundle(first.bundle_version)
+    assert not admin.activate_bundle('../../etc')
+    assert [b['version'] for b in admin.list_bundles() if b['active']] == [first.bundle_version]
+
+    # Робочий процес бачить нову версію при наступному прогнозі
+    prediction = worker.predict_price(records[0])
+    assert prediction['model_version'] == first.bundle_version
+    np.testing.assert_array_equal(worker.predict_batch(records), first.predict_batch(records))
+
+
+if __name__ == "__main__":
+    print("=== Тест пакетів моделей ===")
+    test_bundle_roundtrip_with_mmap()
+    print("✅ Пакет зберігається та завантажується з mmap")
+    test_switch_bundles_at_runtime()
+    print("✅ Пакети перемикаються без перезапуску")
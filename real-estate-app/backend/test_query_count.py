@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Регресійний тест кількості SQL запитів: оцінка одного об'єкта не повинна
+залежати від кількості кандидатів (без ледачого завантаження city/district)
+"""
+
+import sys
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from sqlalchemy import event, text
+
+from knn_valuation_simple import SimpleKNNValuator
+from listing_snapshot import ListingSnapshotCache
+from migration_add_fields import add_normalized_name_columns
+from models import City, District
+from sample_data import make_database
+
+TARGET = {
+    'city': 'Харків',
+    'district': 'Центр',
+    'area_total': 60.0,
+    'rooms': 2,
+    'floor': 3,
+    'total_floors': 9,
+    'building_type': 'brick',
+    'condition': 'good',
+    'has_balcony': True,
+}
+
+
+@contextmanager
+def count_statements(engine):
+    """Рахує SQL запити, виконані через engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_valuation_statement_count_is_constant():
+    """Холодна оцінка - 2 запити, тепла - жодного, незалежно від розміру бази"""
+    for size in (50, 1000):
+        db_manager = make_database(size)
+        cache = ListingSnapshotCache(db_manager, refresh_interval=3600.0)
+        valuator = SimpleKNNValuator(db_manager, k=10, snapshot_cache=cache)
+
+        # Довідник міст і районів та одне завантаження знімка з назвами через join
+        with count_statements(db_manager.engine) as statements:
+            result = valuator.estimate_price_simple(TARGET)
+        assert result['similar_properties_count'] > 0
+        assert result['similar_properties'][0]['city'] == 'Харків'
+        assert len(statements) == 2, statements
+
+        # Знімок і довідник вже в пам'яті
+        with count_statements(db_manager.engine) as statements:
+            valuator.estimate_price_simple(TARGET)
+            valuator.get_market_stats_simple(city='харків', district=' центр')
+        assert len(statements) == 0, statements
+
+        # Перечитування довідника та один запит змін знімка
+        cache.invalidate()
+        with count_statements(db_manager.engine) as statements:
+            valuator.estimate_price_simple(TARGET)
+        assert len(statements) == 2, statements
+
+
+def test_location_names_resolve_exactly():
+    """Точний збіг нормалізованих назв замість пошуку підрядка"""
+    db_manager = make_database(10)
+    with db_manager.get_session() as session:
+        session.add(District(id='kyiv_center', city_id='kyiv', name='Центр', type='district'))
+        # Рядок, доданий в обхід ORM, без name_normalized
+        session.execute(District.__table__.insert().values(
+            id='kyiv_podil', city_id='kyiv', name='Поділ', type='district'))
+
+    cache = ListingSnapshotCache(db_manager)
+    assert cache.resolve_location(' ХАРКІВ ', 'центр') == ('kharkiv', 'district_0')
+    assert cache.resolve_location('Київ', 'Центр') == ('kyiv', 'kyiv_center')
+    assert cache.resolve_location('Київ', 'поділ') == ('kyiv', 'kyiv_podil')
+    # Назва району без міста - лише однозначна
+    assert cache.resolve_location(None, 'Салтівка') == (None, 'district_1')
+    assert cache.resolve_location(None, 'Центр') == (None, None)
+    # Підрядок більше не збігається
+    assert cache.resolve_location('Харк', 'Салт') == (None, None)
+    assert cache.counters['location_reloads'] == 1
+
+    # Нова назва після завантаження довідника - один запит за індексом, далі з пам'яті
+    with db_manager.get_session() as session:
+        session.add(District(id='district_new', city_id='kharkiv', name="Основ'янський", type='district'))
+    with count_statements(db_manager.engine) as statements:
+        assert cache.resolve_location('Харків', 'основ’янський') == ('kharkiv', 'district_new')
+        assert cache.resolve_location('Харків', "Основ'янський") == ('kharkiv', 'district_new')
+        assert cache.resolve_location('Одеса') == (None, None)
+        assert cache.resolve_location('Одеса') == (None, None)
+    assert len(statements) == 2, statements
+
+
+def test_location_misses_are_bounded_and_unlocked():
+    """Невідомі назви - LRU з межею; повільний холодний пошук не блокує теплі"""
+    db_manager = make_database(10)
+    cache = ListingSnapshotCache(db_manager, max_location_misses=2)
+    assert cache.resolve_location('Харків') == ('kharkiv', None)
+
+    for city in ('Одеса', 'Львів', 'Дніпро'):
+        assert cache.resolve_location(city) == (None, None)
+    assert cache.stats()['locations']['misses'] == 2
+    # Найдавніша невідома назва витіснена - знову запит до БД
+    with count_statements(db_manager.engine) as statements:
+        cache.resolve_location('Дніпро')
+        cache.resolve_location('Одеса')
+    assert len(statements) == 1, statements
+
+    started = threading.Event()
+
+    def slow_statement(conn, cursor, statement, parameters, context, executemany):
+        started.set()
+        time.sleep(0.5)
+
+    event.listen(db_manager.engine, 'before_cursor_execute', slow_statement)
+    try:
+        slow = threading.Thread(target=cache.resolve_location, args=('Запоріжжя',))
+        slow.start()
+        assert started.wait(1.0)
+        begin = time.monotonic()
+        assert cache.resolve_location('Харків', 'Центр') == ('kharkiv', 'district_0')
+        assert time.monotonic() - begin < 0.2
+        slow.join()
+    finally:
+        event.remove(db_manager.engine, 'before_cursor_execute', slow_statement)
+
+
+def test_search_resolves_names():
+    """Пошук оголошень знаходить місто та район за нормалізованою назвою"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from models import PropertyListing
+
+    db_manager = make_database(200)
+    with db_manager.get_session() as session:
+        expected = {row.id for row in session.query(PropertyListing.id).filter(
+            PropertyListing.city_id == 'kharkiv', PropertyListing.district_id == 'district_1',
+            PropertyListing.is_active == True)}
+
+    original = main.db_manager, main.knn_valuator
+    main.db_manager = db_manager
+    main.knn_valuator = SimpleKNNValuator(db_manager, k=10)
+    try:
+        client = TestClient(main.app)
+        found = client.get('/properties/search', params={'city': ' ХАРКІВ ', 'district': 'салтівка', 'limit': 500})
+        assert found.status_code == 200
+        properties = found.json()['properties']
+        assert {item['id'] for item in properties} == expected
+        assert {item['district'] for item in properties} == {'Салтівка'}
+
+        unknown = client.get('/properties/search', params={'city': 'Харків', 'district': 'Атлантида'})
+        assert unknown.json() == {'properties': []}
+    finally:
+        main.db_manager, main.knn_valuator = original
+
+
+def test_migration_fills_normalized_names():
+    """Міграція додає та заповнює name_normalized у існуючій базі"""
+    db_manager = make_database(0)
+    with db_manager.engine.begin() as conn:
+        for table in ('cities', 'districts'):
+            conn.execute(text(f"DROP INDEX IF EXISTS idx_{table}_name_normalized"))
+        conn.execute(text("DROP INDEX IF EXISTS idx_districts_city_name_normalized"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_cities_name_normalized"))
+        conn.execute(text("ALTER TABLE cities DROP COLUMN name_normalized"))
+        conn.execute(text("ALTER TABLE districts DROP COLUMN name_normalized"))
+
+    assert add_normalized_name_columns(db_manager)
+    assert add_normalized_name_columns(db_manager)
+    with db_manager.get_session() as session:
+        assert session.query(City.id).filter(City.name_normalized == 'харків').scalar() == 'kharkiv'
+        assert session.query(District.id).filter(District.name_normalized == 'олексіївка').scalar() == 'district_2'
+
+
+if __name__ == "__main__":
+    print("🚀 Запуск тесту кількості SQL запитів\n")
+    test_valuation_statement_count_is_constant()
+    print("✅ Кількість запитів на оцінку не залежить від кількості кандидатів")
+    test_location_names_resolve_exactly()
+    print("✅ Точний пошук міст і районів за нормалізованою назвою")
+    test_location_misses_are_bounded_and_unlocked()
+    print("✅ Невідомі назви обмежені, пошук у БД поза блокуванням")
+    test_search_resolves_names()
+    print("✅ Пошук оголошень за нормалізованими назвами")
+    test_migration_fills_normalized_names()
+    print("✅ Міграція нормалізованих назв")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Тест сіткового просторового індексу: запит по радіусу має збігатися
+з повним перебором, а префільтр - розширювати радіус при нестачі кандидатів
+"""
+
+import sys
+import os
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+import numpy as np
+
+from spatial_index import GridIndex, radius_prefilter, KM_PER_DEGREE
+
+
+def make_coordinates(size: int, seed: int = 0):
+    """Випадкові координати навколо Харкова, частина без координат"""
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(49.85, 50.15, size)
+    lons = rng.uniform(36.05, 36.45, size)
+    missing = rng.random(size) < 0.1
+    lats[missing] = np.nan
+    lons[missing] = np.nan
+    return lats, lons
+
+
+def brute_force(index: GridIndex, lats, lons, lat, lon, radius_km):
+    """Еталон: повний перебір у тій самій проєкції"""
+    dx = (lons - lon) * index.km_per_degree_lon
+    dy = (lats - lat) * KM_PER_DEGREE
+    with np.errstate(invalid='ignore'):
+        return np.flatnonzero(dx ** 2 + dy ** 2 <= radius_km ** 2)
+
+
+def test_query_radius_matches_brute_force():
+    """query_radius повертає ті самі рядки, що й повний перебір"""
+    lats, lons = make_coordinates(5000)
+    index = GridIndex(lats, lons, cell_km=1.0)
+    rng = np.random.default_rng(1)
+
+    for _ in range(50):
+        lat, lon = rng.uniform(49.85, 50.15), rng.uniform(36.05, 36.45)
+        radius_km = rng.choice([0.5, 2.0, 7.3, 10.0, 40.0])
+        expected = brute_force(index, lats, lons, lat, lon, radius_km)
+        np.testing.assert_array_equal(index.query_radius(lat, lon, radius_km), expected)
+
+    assert len(index) + len(index.without_coordinates) == len(lats)
+
+
+def test_prefilter_widens_radius_and_keeps_unlocated():
+    """Префільтр розширює радіус і не відкидає рядки без координат"""
+    lats, lons = make_coordinates(2000, seed=3)
+    index = GridIndex(lats, lons)
+    candidates = np.arange(0, 2000, 2)
+    lat, lon = 49.99, 36.23
+
+    radii_km = (1.0, 5.0, 20.0)
+    unlocated = set(index.without_coordinates) & set(candidates)
+    min_count = len(unlocated) + 150
+
+    result = radius_prefilter(index, candidates, lat, lon, min_count=min_count, radii_km=radii_km)
+    assert len(result) >= min_count
+    assert set(result) <= set(candidates)
+    assert unlocated <= set(result)
+
+    # Результат - найменший радіус, на якому кандидатів вистачає
+    for radius_km in radii_km:
+        nearby = set(brute_force(index, lats, lons, lat, lon, radius_km)) & set(candidates)
+        if len(nearby | unlocated) >= min_count:
+            assert radius_km > radii_km[0]
+            assert set(result) == nearby | unlocated
+            break
+
+    # Недостатньо кандидатів на всіх радіусах - повертаються всі
+    result = radius_prefilter(index, candidates, lat, lon, min_count=10 ** 6, radii_km=(1.0,))
+    np.testing.assert_array_equal(result, candidates)
+
+    # Без координат цілі фільтр не застосовується
+    result = radius_prefilter(index, candidates, None, None, min_count=10, radii_km=(1.0,))
+    np.testing.assert_array_equal(result, candidates)
+
+
+if __name__ == "__main__":
+    print("🚀 Запуск тестів просторового індексу\n")
+    test_query_radius_matches_brute_force()
+    print("✅ Запит по радіусу збігається з повним перебором")
+    test_prefilter_widens_radius_and_keeps_unlocated()
+    print("✅ Префільтр розширює радіус і зберігає рядки без координат")
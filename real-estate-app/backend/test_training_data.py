@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Тест порційного завантаження навчальних даних: ті самі записи, що й
+один запит, компактні типи колонок, знімок на диску без звернення до БД
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from sqlalchemy import text
+
+from ml_model import RealEstateMLModel
+from sample_data import make_database
+from training_data import TRAINING_QUERY, load_snapshot, load_training_frame, save_snapshot
+
+
+def test_chunked_load_matches_single_query():
+    """Порції по 97 записів дають ті самі дані, що й один запит"""
+    db_manager = make_database(1000)
+    df = load_training_frame(db_manager.engine, chunksize=97)
+
+    with db_manager.engine.connect() as conn:
+        result = conn.execute(text(TRAINING_QUERY), {'is_active': True})
+        reference = pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()))
+    assert len(df) == len(reference) == 1000
+
+    assert df['area_total'].dtype == np.float32
+    assert df['rooms'].dtype == np.int16
+    assert df['floor'].dtype == np.float32
+    for col in ('city', 'district', 'building_type', 'condition', 'heating'):
+        assert isinstance(df[col].dtype, pd.CategoricalDtype)
+
+    np.testing.assert_array_equal(df['price_uah'], reference['price_uah'])
+    np.testing.assert_allclose(df['area_total'], reference['area_total'], rtol=1e-6)
+    np.testing.assert_array_equal(df['rooms'], reference['rooms'])
+    np.testing.assert_array_equal(df['has_elevator'], reference['has_elevator'].fillna(0).astype(int))
+    assert list(df['city'].astype(str)) == list(reference['city'])
+    assert list(df['district'].astype(str)) == list(reference['district'].fillna('Невідомий'))
+    assert list(df['building_type'].astype(str)) == list(reference['building_type'].fillna('panel'))
+
+    # Компактні типи займають менше пам'яті, ніж рядки object
+    assert df.memory_usage(deep=True).sum() < reference.memory_usage(deep=True).sum() / 3
+
+
+def test_snapshot_round_trip():
+    """Знімок відновлює ті самі дані, на них можна навчати модель"""
+    df = load_training_frame(make_database(600).engine, chunksize=250)
+    path = os.path.join(tempfile.mkdtemp(), 'training_snapshot')
+    assert load_snapshot(path) is None
+
+    save_snapshot(df, path)
+    restored = load_snapshot(path)
+    pd.testing.assert_frame_equal(restored, df)
+
+    ml_model = RealEstateMLModel(model_dir=tempfile.mkdtemp(), max_workers=1)
+    results = ml_model.train_models(restored)
+    assert results['best_model'] is not None
+
+
+if __name__ == "__main__":
+    print("=== Тест завантаження навчальних даних ===")
+    test_chunked_load_matches_single_query()
+    print("✅ Порційне завантаження збігається з одним запитом")
+    test_snapshot_round_trip()
+    print("✅ Знімок на диску відновлює дані")
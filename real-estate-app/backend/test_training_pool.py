@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Тест паралельного навчання: моделі з пулу процесів ті самі, що й при
+послідовному навчанні, результати містять час та пікову пам'ять
+"""
+
+import sys
+import os
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ml_model import RealEstateMLModel, create_synthetic_data
+import training_pool
+from training_pool import TrainingPool, plan_workers
+
+
+def test_plan_workers():
+    """Процесів не більше, ніж моделей, загальний бюджет не перевищено"""
+    assert plan_workers(3, 8) == (3, 2)
+    assert plan_workers(3, 2) == (2, 1)
+    assert plan_workers(3, 1) == (1, 1)
+    assert plan_workers(1, 8) == (1, 8)
+
+
+def test_parallel_training_matches_sequential():
+    """Пул процесів і послідовне навчання дають однакові прогнози"""
+    df = create_synthetic_data(400)
+    records = df.drop(columns='price_uah').head(50).to_dict('records')
+
+    sequential = RealEstateMLModel(model_dir=tempfile.mkdtemp(), max_workers=1)
+    parallel = RealEstateMLModel(model_dir=tempfile.mkdtemp(), max_workers=3)
+    sequential_results = sequential.train_models(df)
+    parallel_results = parallel.train_models(df)
+
+    assert parallel_results['best_model'] == sequential_results['best_model']
+    for name in ('linear', 'random_forest', 'gradient_boosting'):
+        result = parallel_results[name]
+        assert result['wall_seconds'] > 0
+        assert result['peak_memory_mb'] > 0
+        assert parallel.models[name].get_params().get('n_jobs') is None
+        np.testing.assert_allclose(parallel.predict_batch(records, name),
+                                   sequential.predict_batch(records, name), rtol=1e-9)
+        print(f"{name}: {result['wall_seconds']:.2f} с, {result['peak_memory_mb']:.0f} МБ")
+
+    evaluation = parallel.evaluate_models(df)
+    assert all('cv_mae' in evaluation[name] for name in parallel.models)
+
+
+def test_fallback_without_max_tasks_per_child():
+    """До Python 3.11 кожна модель навчається в окремому однопроцесному пулі"""
+    from sklearn.linear_model import LinearRegression, Ridge
+
+    df = create_synthetic_data(200)
+    X = df[['area_total', 'rooms', 'floor', 'total_floors']]
+    y = df['price_uah']
+    models = {'linear': LinearRegression(), 'ridge': Ridge(), 'ridge_strong': Ridge(alpha=10.0)}
+
+    original = training_pool.MAX_TASKS_PER_CHILD
+    training_pool.MAX_TASKS_PER_CHILD = False
+    try:
+        results = TrainingPool(max_workers=2).fit_all(models, X, y, X, y)
+    finally:
+        training_pool.MAX_TASKS_PER_CHILD = original
+
+    assert set(results) == set(models)
+    for name, result in results.items():
+        np.testing.assert_allclose(result['model'].predict(X), models[name].fit(X, y).predict(X), rtol=1e-9)
+
+
+if __name__ == "__main__":
+    print("=== Тест паралельного навчання ===")
+    test_plan_workers()
+    print("✅ Розподіл бюджету потоків")
+    test_parallel_training_matches_sequential()
+    print("✅ Паралельне навчання збігається з послідовним")
+    test_fallback_without_max_tasks_per_child()
+    print("✅ Навчання без max_tasks_per_child")
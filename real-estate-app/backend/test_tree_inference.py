@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Тест компактного прогнозування: плоскі масиви дерев дають ті самі
+прогнози, що й sklearn, для одного рядка та великих пакетів
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+
+from ml_model import RealEstateMLModel, create_synthetic_data
+from tree_inference import FlatForest, FlatLinear, compile_model
+
+
+def test_flat_models_match_sklearn():
+    """RandomForest, GradientBoosting та лінійна модель - прогнози збігаються"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1500, 12))
+    y = 3 * X[:, 0] + np.sin(X[:, 1]) + rng.normal(size=1500)
+    X_test = rng.normal(size=(3000, 12))
+
+    for model, kind in ((RandomForestRegressor(n_estimators=30, max_depth=12, random_state=0), FlatForest),
+                        (GradientBoostingRegressor(n_estimators=40, max_depth=6, random_state=0), FlatForest),
+                        (LinearRegression(), FlatLinear)):
+        model.fit(X, y)
+        compiled = compile_model(model)
+        assert isinstance(compiled, kind)
+
+        np.testing.assert_allclose(compiled.predict(X_test), model.predict(X_test), rtol=1e-12, atol=1e-9)
+        np.testing.assert_allclose(compiled.predict(X_test[0]), model.predict(X_test[:1]), rtol=1e-12, atol=1e-9)
+
+
+def test_model_predictions_without_pandas():
+    """predict_batch дає ті самі ціни, що й sklearn на prepare_features"""
+    df = create_synthetic_data(600)
+    ml_model = RealEstateMLModel(model_dir=tempfile.mkdtemp())
+    results = ml_model.train_models(df)
+    assert ml_model.best_model_name == results['best_model']
+    assert set(ml_model.inference.compiled_models) == {'linear', 'random_forest', 'gradient_boosting'}
+
+    features = df.drop(columns='price_uah')
+    X, _ = ml_model.prepare_features(features)
+    records = features.to_dict('records')
+
+    for name, model in ml_model.models.items():
+        np.testing.assert_allclose(ml_model.predict_batch(records, name), model.predict(X), rtol=1e-9)
+
+    # Невідома категорія та відсутні числові ознаки не ламають прогноз
+    record = dict(records[0], district='Невідомий район', floor=None)
+    prediction = ml_model.predict_price(record)
+    assert prediction['model_used'] == results['best_model']
+    assert prediction['predicted_price'] > 0
+
+    # Затримка одного прогнозу - мікросекунди, а не мілісекунди
+    timings = []
+    for _ in range(300):
+        started = time.perf_counter()
+        ml_model.predict_price(records[1])
+        timings.append(time.perf_counter() - started)
+    p50 = np.percentile(timings, 50) * 1e6
+    print(f"predict_price ({ml_model.best_model_name}): p50 {p50:.0f} мкс, "
+          f"p99 {np.percentile(timings, 99) * 1e6:.0f} мкс")
+    assert p50 < 2000
+
+
+if __name__ == "__main__":
+    print("=== Тест компактного прогнозування ===")
+    test_flat_models_match_sklearn()
+    print("✅ Плоскі дерева збігаються з sklearn")
+    test_model_predictions_without_pandas()
+    print("✅ Прогноз без pandas збігається з prepare_features")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Тест кешу оцінок: канонічний ключ, LRU витіснення, TTL та скидання
+при зміні знімка оголошень або пакета моделей
+"""
+
+import sys
+import os
+import time
+
+# Додаємо шляхи до модулів
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data-collection'))
+
+from valuation_cache import ValuationCache
+
+PROPERTY = {
+    'city': 'Харків',
+    'district': 'Центр',
+    'area_total': 60.2,
+    'rooms': 2,
+    'floor': 3,
+    'total_floors': 9,
+    'building_type': 'brick',
+    'condition': 'good',
+    'heating': 'central',
+    'has_balcony': True,
+    'has_elevator': None,
+}
+
+
+def test_canonical_key_and_lru():
+    """Регістр, пробіли та площа в межах кроку не змінюють ключ; LRU витісняє найдавніше"""
+    cache = ValuationCache(max_entries=2, ttl=60.0, area_step=1.0)
+    calls = []
+
+    def compute(canonical):
+        calls.append(canonical)
+        return {'estimated_value': int(canonical['area_total'] * 1000)}
+
+    versions = lambda: (1, 'bundle_a')
+
+    assert cache.get(PROPERTY, versions, compute) == {'estimated_value': 60000}
+    same = dict(PROPERTY, city=' харків ', district='ЦЕНТР', area_total=59.8, description='інший опис')
+    assert cache.get(same, versions, compute) == {'estimated_value': 60000}
+    assert len(calls) == 1
+    # Оцінка рахується на канонічних ознаках, назви - у вихідному регістрі
+    assert calls[0]['area_total'] == 60.0 and calls[0]['city'] == 'Харків'
+    assert 'description' not in calls[0]
+
+    cache.get(dict(PROPERTY, area_total=61.6), versions, compute)
+    cache.get(dict(PROPERTY, rooms=3), versions, compute)
+    assert cache.counters['evictions'] == 1
+    # Витіснено найдавніше використане значення (площа 60)
+    cache.get(PROPERTY, versions, compute)
+    assert len(calls) == 4
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 4 and stats['entries'] == 2
+    assert stats['hit_rate'] == 0.2
+
+
+def test_key_includes_location_and_year():
+    """Об'єкти, що відрізняються лише координатами чи роком, мають різні оцінки"""
+    cache = ValuationCache(max_entries=10, ttl=60.0)
+    compute = lambda canonical: (canonical['latitude'], canonical['longitude'], canonical['year_built'])
+    versions = lambda: 1
+
+    a = dict(PROPERTY, latitude=49.99351, longitude=36.23042, year_built=1965)
+    b = dict(a, latitude=50.01, longitude=36.31)
+    assert cache.get(a, versions, compute) == (49.9935, 36.2304, 1965)
+    assert cache.get(b, versions, compute) == (50.01, 36.31, 1965)
+    assert cache.get(dict(a, year_built=2015), versions, compute) == (49.9935, 36.2304, 2015)
+    assert cache.get(dict(a, distance_to_center=4.2), versions, compute) == (49.9935, 36.2304, 1965)
+    # Різниця менша за точність координат - те саме значення
+    assert cache.get(dict(a, latitude=49.99349), versions, compute) == (49.9935, 36.2304, 1965)
+    assert cache.counters['misses'] == 4 and cache.counters['hits'] == 1
+
+    # Невідома наявність ліфта не зводиться до її відсутності
+    cache.get(dict(a, has_elevator=False), versions, compute)
+    assert cache.counters['misses'] == 5
+
+
+def test_ttl_and_version_invalidation():
+    """Значення застаріває за TTL або при зміні версії знімка чи пакета моделей"""
+    cache = ValuationCache(max_entries=10, ttl=0.05)
+    state = {'generation': 1, 'bundle': 'bundle_a'}
+    versions = lambda: (state['generation'], state['bundle'])
+    calls = []
+    compute = lambda canonical: calls.append(1) or len(calls)
+
+    assert cache.get(PROPERTY, versions, compute) == 1
+    assert cache.get(PROPERTY, versions, compute) == 1
+    time.sleep(0.06)
+    assert cache.get(PROPERTY, versions, compute) == 2
+    assert cache.counters['expired'] == 1
+
+    cache.ttl = 60.0
+    state['bundle'] = 'bundle_b'
+    assert cache.get(PROPERTY, versions, compute) == 3
+    state['generation'] = 2
+    assert cache.get(PROPERTY, versions, compute) == 4
+    assert cache.get(PROPERTY, versions, compute) == 4
+    assert cache.counters['stale'] == 2
+
+
+def test_snapshot_changes_invalidate_knn_valuations():
+    """Перша оцінка завантажує знімок і кешується, зміна оголошень її скидає"""
+    from knn_valuation_simple import SimpleKNNValuator
+    from sample_data import make_database
+
+    valuator = SimpleKNNValuator(make_database(600), k=15)
+    cache = ValuationCache()
+    versions = lambda: valuator.snapshot_cache.generation
+
+    first = cache.get(PROPERTY, versions, valuator.estimate_price_simple)
+    assert first['estimated_price'] > 0
+    assert cache.get(PROPERTY, versions, valuator.estimate_price_simple) is first
+    assert cache.counters['hits'] == 1
+
+    valuator.snapshot_cache.invalidate()
+    assert cache.get(PROPERTY, versions, valuator.estimate_price_simple) is not first
+    assert cache.counters['stale'] == 1
+
+
+def test_valuation_endpoint_uses_cache():
+    """Повторна оцінка того самого об'єкта береться з кешу, property_id - з запиту"""
+    from fastapi.testclient import TestClient
+
+    import main
+    from knn_valuation_simple import SimpleKNNValuator
+    from sample_data import make_database
+
+    original = main.knn_valuator, main.valuation_cache
+    main.knn_valuator = SimpleKNNValuator(make_database(600), k=15)
+    main.valuation_cache = ValuationCache()
+    try:
+        client = TestClient(main.app)
+        first = client.get('/properties/prop_1/valuation').json()
+        second = client.get('/properties/prop_2/valuation').json()
+
+        assert first['property_id'] == 'prop_1' and second['property_id'] == 'prop_2'
+        assert first['estimated_value'] == second['estimated_value']
+        assert main.valuation_cache.counters['hits'] == 1 and main.valuation_cache.counters['misses'] == 1
+        assert client.get('/admin/stats').json()['valuation_cache']['hit_rate'] == 0.5
+    finally:
+        main.knn_valuator, main.valuation_cache = original
+
+
+if __name__ == "__main__":
+    print("=== Тест кешу оцінок ===")
+    test_canonical_key_and_lru()
+    print("✅ Канонічний ключ та LRU витіснення")
+    test_key_includes_location_and_year()
+    print("✅ Координати та рік побудови в ключі")
+    test_ttl_and_version_invalidation()
+    print("✅ TTL та скидання за версіями")
+    test_snapshot_changes_invalidate_knn_valuations()
+    print("✅ Зміна знімка скидає оцінки KNN")
+    test_valuation_endpoint_uses_cache()
+    print("✅ Ендпоінт оцінки використовує кеш")
@@ -0,0 +1,213 @@
+"""
+Завантаження навчальних даних порціями
+Запит до property_listings читається порціями (на PostgreSQL - серверним
+курсором), кожна порція одразу стискається: числові колонки - float32/int16,
+рядкові ознаки - category. Результат можна зберегти колонковим знімком
+(.npy на колонку), щоб повторні навчання не звертались до БД. З позначкою
+since читаються лише оголошення, змінені після неї (інкрементальне донавчання)
+"""
+
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import DateTime, bindparam, text
+
+logger = logging.getLogger(__name__)
+
+# Розмір порції читання з БД
+TRAINING_CHUNK_SIZE = int(os.getenv('TRAINING_CHUNK_SIZE', 50_000))
+
+TRAINING_QUERY = """
+SELECT
+    pl.price_uah,
+    pl.area_total,
+    pl.rooms,
+    pl.floor,
+    pl.total_floors,
+    pl.building_type,
+    pl.condition,
+    pl.heating,
+    pl.has_balcony,
+    pl.has_elevator,
+    c.name as city,
+    d.name as district,
+    pl.updated_at
+FROM property_listings pl
+JOIN cities c ON pl.city_id = c.id
+LEFT JOIN districts d ON pl.district_id = d.id
+WHERE pl.price_uah > 0
+AND pl.area_total > 10
+AND pl.area_total < 500
+AND pl.is_active = :is_active
+"""
+
+# Лише оголошення, змінені після позначки попереднього навчання
+SINCE_FILTER = "AND pl.updated_at > :since"
+
+# Типи колонок після стиснення (nullable цілі - float32 з NaN)
+COLUMN_DTYPES = {
+    'price_uah': np.int32,
+    'area_total': np.float32,
+    'rooms': np.int16,
+    'floor': np.float32,
+    'total_floors': np.float32,
+    'has_balcony': np.int8,
+    'has_elevator': np.int8,
+}
+
+DATETIME_COLUMNS = ['updated_at']
+
+# Рядкові ознаки та значення для пропусків
+CATEGORY_DEFAULTS = {
+    'city': None,
+    'district': 'Невідомий',
+    'building_type': 'panel',
+    'condition': 'good',
+    'heating': 'central',
+}
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def training_query(since: Optional[datetime] = None):
+    """Запит навчальних даних; з since - лише змінені після позначки"""
+    if since is None:
+        return text(TRAINING_QUERY).columns(updated_at=DateTime)
+    return text(TRAINING_QUERY + SINCE_FILTER).bindparams(
+        bindparam('since', type_=DateTime)
+    ).columns(updated_at=DateTime)
+
+
+def iter_training_chunks(engine: Any, chunksize: int = TRAINING_CHUNK_SIZE,
+                         since: Optional[datetime] = None) -> Iterator[pd.DataFrame]:
+    """Порції навчальних даних, вже стиснені (compact_chunk)"""
+    params = {'is_active': True}
+    if since is not None:
+        params['since'] = since
+
+    with engine.connect() as conn:
+        # stream_results - серверний курсор (PostgreSQL), без нього драйвер
+        # отримує весь результат у пам'ять ще до першої порції
+        result = conn.execution_options(stream_results=True).execute(training_query(since), params)
+        columns = list(result.keys())
+        for rows in result.partitions(chunksize):
+            yield compact_chunk(pd.DataFrame.from_records(rows, columns=columns))
+
+
+def compact_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Типи колонок порції: числові - вужчі, рядкові - category"""
+    for col, dtype in COLUMN_DTYPES.items():
+        if col not in chunk.columns:
+            continue
+        values = pd.to_numeric(chunk[col], errors='coerce')
+        if np.issubdtype(dtype, np.integer):
+            values = values.fillna(0)
+        chunk[col] = values.astype(dtype)
+
+    for col in DATETIME_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = pd.to_datetime(chunk[col])
+
+    for col, default in CATEGORY_DEFAULTS.items():
+        if col not in chunk.columns:
+            continue
+        values = chunk[col]
+        if default is not None:
+            values = values.fillna(default)
+        chunk[col] = values.astype('category')
+
+    return chunk
+
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Об'єднує порції; категорії різних порцій зводяться до спільного набору"""
+    if not chunks:
+        return pd.DataFrame(columns=list(COLUMN_DTYPES) + list(CATEGORY_DEFAULTS) + DATETIME_COLUMNS)
+
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [chunk[col] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = pd.Series(union_categoricals(parts), name=col)
+        else:
+            columns[col] = pd.Series(np.concatenate([part.to_numpy() for part in parts]), name=col)
+    return pd.DataFrame(columns)
+
+
+def load_training_frame(engine: Any, chunksize: int = TRAINING_CHUNK_SIZE,
+                        since: Optional[datetime] = None) -> pd.DataFrame:
+    """Навчальні дані з БД (усі або змінені після since): порціями, у стисненому вигляді"""
+    chunks = []
+    rows = 0
+    for chunk in iter_training_chunks(engine, chunksize, since):
+        chunks.append(chunk)
+        rows += len(chunk)
+        logger.info(f"Прочитано {rows} записів")
+
+    df = concat_chunks(chunks)
+    logger.info(f"Навчальні дані: {len(df)} записів, {df.memory_usage(deep=True).sum() / 2 ** 20:.1f} МБ")
+    return df
+
+
+def save_snapshot(df: pd.DataFrame, path: str) -> str:
+    """
+    Колонковий знімок: числова колонка - <колонка>.npy, категоріальна -
+    коди <колонка>.codes.npy та категорії в маніфесті. Каталог з'являється
+    лише повністю записаним
+    """
+    staging_path = path.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(staging_path, ignore_errors=True)
+    os.makedirs(staging_path)
+
+    columns: Dict[str, Dict[str, Any]] = {}
+    for col in df.columns:
+        values = df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            file_name = f'{col}.codes.npy'
+            np.save(os.path.join(staging_path, file_name), values.cat.codes.to_numpy())
+            columns[col] = {'file': file_name, 'categories': [str(c) for c in values.cat.categories]}
+        else:
+            file_name = f'{col}.npy'
+            np.save(os.path.join(staging_path, file_name), values.to_numpy())
+            columns[col] = {'file': file_name}
+
+    manifest = {
+        'created_at': datetime.utcnow().isoformat(),
+        'rows': len(df),
+        'columns': columns,
+    }
+    with open(os.path.join(staging_path, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging_path, path)
+    logger.info(f"Збережено знімок навчальних даних ({len(df)} записів) в {path}")
+    return path
+
+
+def load_snapshot(path: str) -> Optional[pd.DataFrame]:
+    """Знімок з save_snapshot або None, якщо його немає"""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    columns = {}
+    for col, meta in manifest['columns'].items():
+        values = np.load(os.path.join(path, meta['file']), mmap_mode='r')
+        if 'categories' in meta:
+            columns[col] = pd.Categorical.from_codes(values, categories=meta['categories'])
+        else:
+            columns[col] = values
+    logger.info(f"Завантажено знімок навчальних даних від {manifest['created_at']} ({manifest['rows']} записів)")
+    return pd.DataFrame(columns)
+
@@ -0,0 +1,157 @@
+"""
+Паралельне навчання моделей-кандидатів
+Кожна модель навчається в окремому процесі (один процес - одна модель,
+тому пікова пам'ять процесу - це пікова пам'ять навчання саме цієї моделі).
+Загальна кількість робочих потоків обмежена max_workers: процесів не більше,
+ніж моделей, решта бюджету віддається n_jobs ансамблів, що його підтримують
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+logger = logging.getLogger(__name__)
+
+# max_tasks_per_child у ProcessPoolExecutor з'явився в Python 3.11
+MAX_TASKS_PER_CHILD = sys.version_info >= (3, 11)
+
+
+def default_max_workers() -> int:
+    """Бюджет потоків навчання: TRAINING_MAX_WORKERS або кількість ядер"""
+    return max(1, int(os.getenv('TRAINING_MAX_WORKERS', 0)) or os.cpu_count() or 1)
+
+
+def plan_workers(n_models: int, max_workers: int) -> Tuple[int, int]:
+    """(кількість процесів, n_jobs для моделі), так що добуток не перевищує max_workers"""
+    processes = max(1, min(n_models, max_workers))
+    return processes, max(1, max_workers // processes)
+
+
+def peak_memory_mb() -> Optional[float]:
+    """Пікова пам'ять (RSS) поточного процесу в МБ"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає КБ, macOS - байти
+    return round(peak / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+
+
+def fit_candidate(name: str, model: Any, X_train, y_train, X_test, y_test) -> Dict[str, Any]:
+    """Навчає одну модель та рахує метрики на тестовій вибірці"""
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    y_pred = model.predict(X_test)
+    result = {
+        'model': model,
+        'mae': mean_absolute_error(y_test, y_pred),
+        'rmse': np.sqrt(mean_squared_error(y_test, y_pred)),
+        'r2': r2_score(y_test, y_pred),
+        'feature_importance': None,
+        'fit_seconds': round(fit_seconds, 3),
+        'wall_seconds': round(time.perf_counter() - started, 3),
+        'peak_memory_mb': peak_memory_mb(),
+    }
+    if hasattr(model, 'feature_importances_'):
+        result['feature_importance'] = dict(zip(X_train.columns, model.feature_importances_))
+    return result
+
+
+class TrainingPool:
+    """Оркестратор навчання набору моделей з обмеженим бюджетом потоків"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or default_max_workers()
+
+    def fit_all(self, models: Dict[str, Any], X_train, y_train, X_test, y_test) -> Dict[str, Dict[str, Any]]:
+        """
+        Навчає всі моделі, повертає результат fit_candidate для кожної
+        або {'error': ...}, якщо навчання моделі впало
+        """
+        processes, n_jobs = plan_workers(len(models), self.max_workers)
+        for model in models.values():
+            if 'n_jobs' in model.get_params():
+                model.set_params(n_jobs=n_jobs)
+
+        logger.info(f"Навчання {len(models)} моделей: {processes} процесів, n_jobs={n_jobs} "
+                    f"(бюджет {self.max_workers} потоків)")
+
+        results = {}
+        if processes == 1:
+            # Без пулу: пікова пам'ять - накопичена для всього процесу
+            for name, model in models.items():
+                results[name] = self._safe_fit(name, model, X_train, y_train, X_test, y_test)
+        else:
+            # spawn: у кожного процесу власний лічильник пікової пам'яті
+            context = multiprocessing.get_context('spawn')
+            if MAX_TASKS_PER_CHILD:
+                with ProcessPoolExecutor(max_workers=processes, mp_context=context, max_tasks_per_child=1) as pool:
+                    futures = {
+                        name: pool.submit(fit_candidate, name, model, X_train, y_train, X_test, y_test)
+                        for name, model in models.items()
+                    }
+                    results.update(self._collect(futures))
+            else:
+                # Старіші версії: окремий однопроцесний пул на модель, хвилями по processes
+                names = list(models)
+                for start in range(0, len(names), processes):
+                    pools = {
+                        name: ProcessPoolExecutor(max_workers=1, mp_context=context)
+                        for name in names[start:start + processes]
+                    }
+                    try:
+                        futures = {
+                            name: pool.submit(fit_candidate, name, models[name], X_train, y_train, X_test, y_test)
+                            for name, pool in pools.items()
+                        }
+                        results.update(self._collect(futures))
+                    finally:
+                        for pool in pools.values():
+                            pool.shutdown()
+
+        for name, result in results.items():
+            if 'error' not in result:
+                # Прогноз одного рядка не повинен запускати пул потоків
+                if 'n_jobs' in result['model'].get_params():
+                    result['model'].set_params(n_jobs=None)
+                logger.info(f"Модель {name}: навчання {result['fit_seconds']:.1f} с, "
+                            f"пік пам'яті {result['peak_memory_mb']} МБ")
+        return results
+
+    @staticmethod
+    def _collect(futures: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Результати futures процесів; помилка моделі - {'error': ...}"""
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Помилка навчання моделі {name}: {e}")
+                results[name] = {'error': str(e)}
+        return results
+
+    @staticmethod
+    def _safe_fit(name: str, model: Any, X_train, y_train, X_test, y_test) -> Dict[str, Any]:
+        try:
+            return fit_candidate(name, model, X_train, y_train, X_test, y_test)
+        except Exception as e:
+            logger.error(f"Помилка навчання моделі {name}: {e}")
+            return {'error': str(e)}
+
+    def cv_jobs(self, folds: int) -> int:
+        """Скільки фолдів крос-валідації рахувати паралельно"""
+        return max(1, min(folds, self.max_workers))
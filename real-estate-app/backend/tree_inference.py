@@ -0,0 +1,190 @@
+"""
+Компактне представлення навчених моделей для швидкого прогнозування
+Дерева ансамблю (RandomForest, GradientBoosting) зберігаються як плоскі
+масиви NumPy вузлів (feature, threshold, children, value), а прогноз
+проходить усі дерева одночасно для всіх рядків - без pandas і без
+накладних витрат sklearn на перевірку вхідних даних
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Скільки рядків проходять дерева за один блок
+PREDICT_CHUNK_ROWS = 512
+
+
+class FlatForest:
+    """
+    Ансамбль дерев регресії у вигляді плоских масивів.
+    Листи посилаються самі на себе (обидва нащадки = вузол, threshold = +inf),
+    тому обхід - фіксована кількість кроків (max_depth) без розгалужень:
+    прогноз = base + scale * сума значень листів
+    """
+
+    kind = 'forest'
+    ARRAYS = ('feature', 'threshold', 'children', 'value', 'roots')
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int, scale: float, base: float, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children  # [лівий, правий] для кожного вузла поспіль
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.scale = scale
+        self.base = base
+        self.n_features = n_features
+
+    @classmethod
+    def from_estimators(cls, trees, scale: float, base: float, n_features: int) -> 'FlatForest':
+        """Збирає масиви з fitted DecisionTreeRegressor (атрибут tree_)"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in trees:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            children.append(np.column_stack([
+                np.where(is_leaf, nodes, tree.children_left),
+                np.where(is_leaf, nodes, tree.children_right)
+            ]).ravel() + offset)
+            values.append(tree.value.reshape(tree.node_count, -1)[:, 0])
+            roots.append(offset)
+
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds),
+            children=np.concatenate(children).astype(np.intp),
+            value=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            scale=scale,
+            base=base,
+            n_features=n_features,
+        )
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Прогноз для матриці ознак (n_rows, n_features) або одного рядка"""
+        # Дерева sklearn порівнюють ознаки у float32
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+
+        n_rows, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        totals = np.empty(n_rows)
+
+        # Блоками рядків, щоб масив вузлів (дерева x рядки) лишався в кеші
+        for start in range(0, n_rows, PREDICT_CHUNK_ROWS):
+            stop = min(n_rows, start + PREDICT_CHUNK_ROWS)
+            offsets = (np.arange(start, stop, dtype=np.intp) * n_features)[np.newaxis, :]
+            nodes = np.repeat(self.roots[:, np.newaxis], stop - start, axis=1)
+
+            for _ in range(self.max_depth):
+                go_right = flat[offsets + self.feature[nodes]] > self.threshold[nodes]
+                nodes = self.children[2 * nodes + go_right]
+
+            totals[start:stop] = self.value[nodes].sum(axis=0)
+
+        return self.base + self.scale * totals
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def params(self) -> Dict[str, Any]:
+        return {'max_depth': self.max_depth, 'scale': self.scale, 'base': self.base, 'n_features': self.n_features}
+
+
+class FlatLinear:
+    """Лінійна модель: коефіцієнти та зсув"""
+
+    kind = 'linear'
+    ARRAYS = ('coef',)
+
+    def __init__(self, coef: np.ndarray, intercept: float):
+        self.coef = coef
+        self.intercept = intercept
+        self.n_features = len(coef)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        return X @ self.coef + self.intercept
+
+    def params(self) -> Dict[str, Any]:
+        return {'intercept': self.intercept}
+
+
+def compile_model(model: Any) -> Optional[Any]:
+    """
+    Компактний предиктор для навченої моделі sklearn або None, якщо тип
+    не підтримується (тоді використовується model.predict)
+    """
+    estimators = getattr(model, 'estimators_', None)
+    n_features = getattr(model, 'n_features_in_', None)
+
+    # GradientBoostingRegressor: estimators_ - масив (n_estimators, 1)
+    if estimators is not None and hasattr(model, 'learning_rate') and hasattr(model, 'init_'):
+        init = model.init_
+        if hasattr(init, 'constant_'):
+            base = float(np.ravel(init.constant_)[0])
+        elif isinstance(init, str) and init == 'zero':
+            base = 0.0
+        else:
+            return None
+        return FlatForest.from_estimators(np.ravel(estimators), scale=model.learning_rate, base=base,
+                                          n_features=n_features)
+
+    # RandomForestRegressor / ExtraTreesRegressor: середнє дерев
+    if estimators is not None and all(hasattr(tree, 'tree_') for tree in estimators):
+        return FlatForest.from_estimators(estimators, scale=1.0 / len(estimators), base=0.0,
+                                          n_features=n_features)
+
+    # Одне дерево
+    if hasattr(model, 'tree_'):
+        return FlatForest.from_estimators([model], scale=1.0, base=0.0, n_features=n_features)
+
+    # Лінійна регресія з одним виходом
+    coef = getattr(model, 'coef_', None)
+    if coef is not None and np.ndim(coef) == 1:
+        return FlatLinear(np.asarray(coef, dtype=np.float64), float(model.intercept_))
+
+    return None
+
+
+_KINDS = {cls.kind: cls for cls in (FlatForest, FlatLinear)}
+
+
+def save_compiled(compiled: Any, directory: str, name: str) -> Dict[str, Any]:
+    """Зберігає масиви предиктора у .npy файли, повертає опис для маніфесту"""
+    files = {}
+    for field in compiled.ARRAYS:
+        files[field] = f'{name}.{field}.npy'
+        np.save(os.path.join(directory, files[field]), getattr(compiled, field))
+    return {'kind': compiled.kind, 'arrays': files, 'params': compiled.params()}
+
+
+def load_compiled(directory: str, meta: Dict[str, Any], mmap_mode: Optional[str] = 'r') -> Any:
+    """
+    Відновлює предиктор з опису маніфесту. З mmap_mode масиви читаються
+    зі сторінкового кешу ОС і спільні для всіх процесів, що їх відкрили
+    """
+    arrays = {
+        # asarray - звичайний ndarray поверх mmap (без накладних витрат np.memmap)
+        field: np.asarray(np.load(os.path.join(directory, file_name), mmap_mode=mmap_mode))
+        for field, file_name in meta['arrays'].items()
+    }
+    return _KINDS[meta['kind']](**arrays, **meta['params'])
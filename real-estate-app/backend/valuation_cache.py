@@ -0,0 +1,143 @@
+"""
+LRU кеш результатів оцінки вартості
+Ключ - канонічний кортеж ознак об'єкта (назви без зайвих пробілів і без
+урахування регістру, площа округлена до area_step м²), тому повторні
+запити з форми з тими самими параметрами не запускають KNN та ML модель.
+Оцінка рахується лише на ознаках ключа (координати округлені до
+coordinate_precision знаків), тож значення не залежить від інших полів.
+Кожне значення пам'ятає версії даних, на яких пораховане (покоління
+знімків оголошень, пакет моделей): якщо версія змінилась, значення
+вважається застарілим
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Ознаки ключа в порядку кортежу: все, що враховують KNN (схожість, відбір
+# за радіусом, виключення самого об'єкта за id) та ML модель
+KEY_FIELDS = ('id', 'city', 'district', 'area_total', 'rooms', 'floor', 'total_floors', 'floor_category',
+              'building_type', 'building_series', 'developer', 'year_built', 'condition', 'heating',
+              'has_balcony', 'has_elevator', 'latitude', 'longitude', 'distance_to_center')
+
+_TEXT_FIELDS = ('city', 'district', 'floor_category', 'building_type', 'building_series', 'developer',
+                'condition', 'heating')
+_INT_FIELDS = ('rooms', 'floor', 'total_floors', 'year_built')
+_FLAG_FIELDS = ('has_balcony', 'has_elevator')
+_COORDINATE_FIELDS = ('latitude', 'longitude')
+
+
+class ValuationCache:
+    """
+    Потокобезпечний LRU + TTL кеш. max_entries - скільки значень
+    зберігати (найдавніше використане витісняється), ttl - секунд,
+    coordinate_precision - знаків після коми в координатах (4 - близько 10 м)
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 600.0, area_step: float = 1.0,
+                 coordinate_precision: int = 4):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.area_step = area_step
+        self.coordinate_precision = coordinate_precision
+
+        # ключ -> (значення, версії, час закінчення)
+        self._values: 'OrderedDict[Tuple, Tuple[Any, Hashable, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expired': 0,
+            'stale': 0,
+        }
+
+    def canonical(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Ознаки ключа у канонічному вигляді (саме на них рахується оцінка)"""
+        canonical = {field: property_data.get(field) for field in KEY_FIELDS}
+        for field in _TEXT_FIELDS:
+            value = property_data.get(field)
+            canonical[field] = ' '.join(str(value).split()) if value else None
+        for field in _INT_FIELDS:
+            value = property_data.get(field)
+            canonical[field] = int(value) if value is not None else None
+        for field in _FLAG_FIELDS:
+            # None (невідомо) KNN не порівнює, тому воно не зводиться до False
+            value = property_data.get(field)
+            canonical[field] = bool(value) if value is not None else None
+
+        area = property_data.get('area_total')
+        if area is not None:
+            canonical['area_total'] = round(round(float(area) / self.area_step) * self.area_step, 3)
+        for field in _COORDINATE_FIELDS:
+            value = property_data.get(field)
+            canonical[field] = round(float(value), self.coordinate_precision) if value is not None else None
+
+        distance = property_data.get('distance_to_center')
+        canonical['distance_to_center'] = round(float(distance), 2) if distance is not None else None
+        return canonical
+
+    def key(self, canonical: Dict[str, Any]) -> Tuple:
+        """Ключ кешу; назви порівнюються без урахування регістру"""
+        return tuple(
+            canonical[field].casefold() if field in _TEXT_FIELDS and canonical.get(field) else canonical.get(field)
+            for field in KEY_FIELDS
+        )
+
+    def get(self, property_data: Dict[str, Any], versions: Callable[[], Hashable],
+            compute: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Оцінка з кешу або compute(canonical) при промаху.
+        versions() - поточні версії даних; значення з іншими версіями
+        перераховується. Нове значення позначається версіями після compute:
+        перший розрахунок сам завантажує знімок і не повинен застаріти одразу
+        """
+        canonical = self.canonical(property_data)
+        key = self.key(canonical)
+        current = versions()
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is not None:
+                value, cached_versions, expires_at = cached
+                if cached_versions == current and expires_at > now:
+                    self._values.move_to_end(key)
+                    self.counters['hits'] += 1
+                    return value
+
+                del self._values[key]
+                self.counters['expired' if cached_versions == current else 'stale'] += 1
+            self.counters['misses'] += 1
+
+        # Рахуємо поза блокуванням: оцінка довга, інші ключі не чекають
+        value = compute(canonical)
+        computed_versions = versions()
+
+        with self._lock:
+            self._values[key] = (value, computed_versions, time.monotonic() + self.ttl)
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+                self.counters['evictions'] += 1
+        return value
+
+    def invalidate(self):
+        """Скидає всі значення"""
+        with self._lock:
+            self._values.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Лічильники, частка влучань та заповненість"""
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_rate': round(self.counters['hits'] / lookups, 4) if lookups else None,
+            'entries': len(self._values),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'area_step': self.area_step,
+            'coordinate_precision': self.coordinate_precision,
+        }
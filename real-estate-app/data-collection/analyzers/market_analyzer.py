@@ -11,7 +11,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, desc
 
 from database import DatabaseManager
-from models import PropertyListing, City, District, MarketStats
+from models import PropertyListing, City, District, MarketStats, normalize_name
 
 logger = logging.getLogger(__name__)
 
@@ -22,88 +22,103 @@ class MarketAnalyzer:
         self.db = db
 
     def calculate_city_stats(self, city_name: str, start_date: datetime, end_date: datetime) -> Optional[Dict]:
-        """Розраховує статистику для міста за період"""
+        """
+        Розраховує статистику для міста за період.
+        Агрегати рахуються в базі даних, з неї повертаються лише підсумкові рядки
+        """
         with self.db.get_session() as session:
             # Отримуємо ID міста
-            city = session.query(City).filter_by(name=city_name).first()
+            city = session.query(City.id, City.population).filter_by(name=city_name).first()
             if not city:
                 logger.warning(f"Місто '{city_name}' не знайдено")
                 return None
 
-            # Отримуємо оголошення за період
-            listings = session.query(PropertyListing).filter(
-                and_(
-                    PropertyListing.city_id == city.id,
-                    PropertyListing.is_active == True,
-                    PropertyListing.created_at.between(start_date, end_date)
-                )
-            ).all()
+            # Оголошення за період з коректною ціною та площею
+            conditions = and_(
+                PropertyListing.city_id == city.id,
+                PropertyListing.is_active == True,
+                PropertyListing.created_at.between(start_date, end_date),
+                PropertyListing.price_uah > 0,
+                PropertyListing.area_total > 0
+            )
 
-            if not listings:
-                logger.warning(f"Немає даних для міста '{city_name}' за вказаний період")
-                return None
+            totals = session.query(
+                func.count(PropertyListing.id).label('total_listings'),
+                func.sum(PropertyListing.price_uah).label('total_price'),
+                func.sum(PropertyListing.area_total).label('total_area'),
+                func.avg(PropertyListing.area_total).label('average_area')
+            ).filter(conditions).one()
 
-            # Перетворюємо в DataFrame для аналізу
-            df = pd.DataFrame([
-                {
-                    'price_uah': listing.price_uah,
-                    'area_total': listing.area_total,
-                    'rooms': listing.rooms,
-                    'floor': listing.floor,
-                    'district_id': listing.district_id,
-                    'building_type': listing.building_type,
-                    'condition': listing.condition
-                }
-                for listing in listings
-                if listing.price_uah > 0 and listing.area_total > 0
-            ])
-
-            if df.empty:
+            if not totals.total_listings:
+                logger.warning(f"Немає даних для міста '{city_name}' за вказаний період")
                 return None
 
             # Розраховуємо статистику
             stats = {
                 'city_id': city.id,
-                'total_listings': len(df),
-                'average_price_per_sqm': float(df['price_uah'].sum() / df['area_total'].sum()),
-                'median_price_per_sqm': float(df['price_uah'].divide(df['area_total']).median()),
-                'average_area': float(df['area_total'].mean()),
+                'total_listings': totals.total_listings,
+                'average_price_per_sqm': float(totals.total_price) / float(totals.total_area),
+                'median_price_per_sqm': self._median_price_per_sqm(session, conditions, totals.total_listings),
+                'average_area': float(totals.average_area),
                 'price_change_percent': self._calculate_price_change(city.id, start_date, end_date, session),
-                'demand_level': self._calculate_demand_level(len(df), city.population or 100000)
+                'demand_level': self._calculate_demand_level(totals.total_listings, city.population or 100000)
             }
 
             # Статистика по кімнатах
-            room_stats = self._calculate_room_stats(df)
+            room_stats = self._calculate_room_stats(session, conditions)
             stats.update(room_stats)
 
             return stats
 
+    def _median_price_per_sqm(self, session: Session, conditions, count: int) -> float:
+        """
+        Медіана ціни за м². PostgreSQL рахує percentile_cont, для інших СУБД
+        (SQLite) сортування в базі і вибірка одного-двох середніх рядків
+        """
+        price_per_sqm = PropertyListing.price_uah * 1.0 / PropertyListing.area_total
+
+        if self.db.engine.dialect.name == 'postgresql':
+            median = session.query(
+                func.percentile_cont(0.5).within_group(price_per_sqm)
+            ).filter(conditions).scalar()
+            return float(median)
+
+        middle = session.query(price_per_sqm.label('price_per_sqm')).filter(
+            conditions
+        ).order_by('price_per_sqm').limit(2 - count % 2).offset((count - 1) // 2).all()
+
+        return float(sum(row.price_per_sqm for row in middle) / len(middle))
+
     def _calculate_price_change(self, city_id: str, start_date: datetime, end_date: datetime, session: Session) -> float:
-        """Розраховує зміну ціни за місяць"""
-        # Отримуємо статистику за попередній місяць
+        """Розраховує зміну ціни відносно попереднього місяця за щоденним rollup market_stats"""
         prev_month_start = start_date - timedelta(days=30)
-        prev_month_end = start_date
-
-        current_stats = session.query(MarketStats).filter(
-            and_(
-                MarketStats.city_id == city_id,
-                MarketStats.date.between(start_date.date(), end_date.date())
-            )
-        ).first()
 
-        prev_stats = session.query(MarketStats).filter(
-            and_(
-                MarketStats.city_id == city_id,
-                MarketStats.date.between(prev_month_start.date(), prev_month_end.date())
-            )
-        ).first()
+        current_price = self._rollup_price_per_sqm(session, city_id, start_date, end_date)
+        prev_price = self._rollup_price_per_sqm(session, city_id, prev_month_start, start_date)
 
-        if current_stats and prev_stats and prev_stats.average_price_per_sqm > 0:
-            return ((current_stats.average_price_per_sqm - prev_stats.average_price_per_sqm)
-                   / prev_stats.average_price_per_sqm) * 100
+        if current_price and prev_price:
+            return ((current_price - prev_price) / prev_price) * 100
 
         return 0.0
 
+    @staticmethod
+    def _rollup_price_per_sqm(session: Session, city_id: str, start_date: datetime,
+                              end_date: datetime) -> Optional[float]:
+        """Середня ціна за м² по місту за період, зважена кількістю оголошень днів"""
+        total_price, total_listings = session.query(
+            func.sum(MarketStats.average_price_per_sqm * MarketStats.total_listings),
+            func.sum(MarketStats.total_listings)
+        ).filter(
+            MarketStats.city_id == city_id,
+            MarketStats.district_id.is_(None),
+            MarketStats.date >= start_date,
+            MarketStats.date < end_date
+        ).one()
+
+        if not total_listings:
+            return None
+        return float(total_price) / float(total_listings)
+
     def _calculate_demand_level(self, listings_count: int, population: int) -> str:
         """Визначає рівень попиту"""
         listings_per_1000 = (listings_count / population) * 1000
@@ -115,17 +130,20 @@ class MarketAnalyzer:
         else:
             return 'low'
 
-    def _calculate_room_stats(self, df: pd.DataFrame) -> Dict:
-        """Розраховує статистику по кількості кімнат"""
-        stats = {}
-
-        for rooms in [1, 2, 3, 4]:
-            room_df = df[df['rooms'] == rooms]
-            if not room_df.empty:
-                avg_price = room_df['price_uah'].divide(room_df['area_total']).mean()
-                stats[f'avg_price_{rooms}_room'] = float(avg_price) if not pd.isna(avg_price) else 0.0
-
-        return stats
+    def _calculate_room_stats(self, session: Session, conditions) -> Dict:
+        """Розраховує статистику по кількості кімнат (один згрупований запит)"""
+        rows = session.query(
+            PropertyListing.rooms,
+            func.avg(PropertyListing.price_uah * 1.0 / PropertyListing.area_total).label('avg_price_per_sqm')
+        ).filter(
+            conditions,
+            PropertyListing.rooms.in_([1, 2, 3, 4])
+        ).group_by(PropertyListing.rooms).all()
+
+        return {
+            f'avg_price_{row.rooms}_room': float(row.avg_price_per_sqm) if row.avg_price_per_sqm is not None else 0.0
+            for row in sorted(rows, key=lambda row: row.rooms)
+        }
 
     def get_top_districts_by_price(self, city_name: str, limit: int = 10) -> List[Dict]:
         """Отримує топ районів за ціною за м²"""
@@ -167,10 +185,92 @@ class MarketAnalyzer:
                 for stat in stats
             ]
 
+    @staticmethod
+    def _find_city(session: Session, city_name: str):
+        """Місто за нормалізованою назвою (регістр і зайві пробіли не мають значення)"""
+        return session.query(City.id, City.name, City.population).filter(
+            City.name_normalized == normalize_name(city_name)
+        ).first()
+
+    def find_city(self, city_name: str) -> Optional[str]:
+        """id міста за назвою або None"""
+        with self.db.get_session() as session:
+            city = self._find_city(session, city_name)
+            return city.id if city else None
+
+    def get_rollup_stats(self, city_name: str, district_name: Optional[str] = None, days: int = 30) -> Dict:
+        """
+        Статистика міста та районів за останні days днів з rollup market_stats.
+        Рядки з district_id = NULL - місто цілком, решта - райони; денні
+        середні зважуються кількістю оголошень дня. Медіана - зважене
+        середнє денних медіан
+        """
+        with self.db.get_session() as session:
+            city = self._find_city(session, city_name)
+            if not city:
+                return {'error': 'Місто не підтримується'}
+
+            end_date = datetime.utcnow()
+            start_date = end_date - timedelta(days=days)
+
+            rows = session.query(
+                MarketStats.district_id,
+                District.name.label('district_name'),
+                District.name_normalized.label('district_key'),
+                func.sum(MarketStats.total_listings).label('total_listings'),
+                func.sum(MarketStats.average_price_per_sqm * MarketStats.total_listings).label('price_sum'),
+                func.sum(MarketStats.median_price_per_sqm * MarketStats.total_listings).label('median_sum'),
+                func.sum(MarketStats.average_area * MarketStats.total_listings).label('area_sum')
+            ).outerjoin(
+                District, District.id == MarketStats.district_id
+            ).filter(
+                MarketStats.city_id == city.id,
+                MarketStats.date.between(start_date, end_date)
+            ).group_by(
+                MarketStats.district_id, District.name, District.name_normalized
+            ).all()
+
+        city_row = next((row for row in rows if row.district_id is None), None)
+        if city_row is None or not city_row.total_listings:
+            return {'error': 'Недостатньо даних'}
+
+        districts = [
+            (row.district_key or normalize_name(row.district_name), {
+                'district': row.district_name,
+                'avg_price_per_sqm': float(row.price_sum) / row.total_listings,
+                'median_price_per_sqm': float(row.median_sum) / row.total_listings,
+                'average_area': float(row.area_sum) / row.total_listings,
+                'listings_count': int(row.total_listings),
+            })
+            for row in rows if row.district_id is not None and row.total_listings
+        ]
+        top_districts = sorted((item for _, item in districts), key=lambda item: item['avg_price_per_sqm'],
+                               reverse=True)[:5]
+
+        city_stats = {
+            'average_price_per_sqm': float(city_row.price_sum) / city_row.total_listings,
+            'demand_level': self._calculate_demand_level(city_row.total_listings, city.population or 100000),
+        }
+        stats = {
+            'city': city.name,
+            'current_avg_price': city_stats['average_price_per_sqm'],
+            'median_price_per_sqm': float(city_row.median_sum) / city_row.total_listings,
+            'average_area': float(city_row.area_sum) / city_row.total_listings,
+            'demand_level': city_stats['demand_level'],
+            'total_listings': int(city_row.total_listings),
+            'top_districts': top_districts,
+            'price_trends': self.get_price_trends(city.name, 3),
+            'recommendations': self._generate_recommendations(city_stats, top_districts),
+        }
+        if district_name:
+            district_key = normalize_name(district_name)
+            stats['district'] = next((item for key, item in districts if key == district_key), None)
+        return stats
+
     def get_price_trends(self, city_name: str, months: int = 6) -> List[Dict]:
         """Отримує тренди цін за останні місяці"""
         with self.db.get_session() as session:
-            city = session.query(City).filter_by(name=city_name).first()
+            city = self._find_city(session, city_name)
             if not city:
                 return []
 
@@ -184,7 +284,8 @@ class MarketAnalyzer:
             ).filter(
                 and_(
                     MarketStats.city_id == city.id,
-                    MarketStats.date.between(start_date.date(), end_date.date())
+                    MarketStats.district_id.is_(None),
+                    MarketStats.date.between(start_date, end_date)
                 )
             ).order_by(MarketStats.date).all()
 
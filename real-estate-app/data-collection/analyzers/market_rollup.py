@@ -0,0 +1,156 @@
+"""
+Інкрементальне наповнення таблиці market_stats
+Щоденні агрегати по місту (district_id = NULL) та по районах. Кожен запуск
+перераховує лише ті пари (місто, день), оголошення яких створені або змінені
+після попереднього запуску; рядки пари замінюються цілком
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import and_, delete, func, or_
+from sqlalchemy.orm import Session
+
+from database import DatabaseManager
+from models import MarketStats, PropertyListing
+
+logger = logging.getLogger(__name__)
+
+# Скільки пар (місто, день) перераховувати одним запитом
+ROLLUP_CHUNK_SIZE = 200
+
+
+class MarketStatsRollup:
+    """
+    Щоденний rollup оголошень у market_stats.
+    Позначка попереднього запуску - максимальний market_stats.created_at,
+    тому окремий стан між перезапусками не потрібен
+    """
+
+    def __init__(self, db: DatabaseManager, chunk_size: int = ROLLUP_CHUNK_SIZE):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def run(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Перераховує змінені дні. since - явна позначка (за замовчуванням
+        попередній запуск; якщо таблиця порожня - повний перерахунок).
+        Повертає кількість перерахованих пар (місто, день) та записаних рядків
+        """
+        # Позначка фіксується до читання оголошень: зміни під час запуску
+        # потраплять у наступний
+        computed_at = datetime.utcnow()
+        summary = {'days': 0, 'rows': 0}
+
+        with self.db.get_session() as session:
+            if since is None:
+                since = session.query(func.max(MarketStats.created_at)).scalar()
+
+            touched = self._touched_days(session, since)
+            touched_list = sorted(touched)
+
+            for start in range(0, len(touched_list), self.chunk_size):
+                chunk = touched_list[start:start + self.chunk_size]
+                rows = self._compute_chunk(session, chunk, computed_at)
+
+                # Заміна рядків пари (місто, день) - upsert без унікального ключа
+                # з NULL district_id
+                session.execute(
+                    delete(MarketStats).where(or_(*[
+                        and_(MarketStats.city_id == city_id, MarketStats.date == _day_start(day))
+                        for city_id, day in chunk
+                    ])).execution_options(synchronize_session=False)
+                )
+                if rows:
+                    session.execute(MarketStats.__table__.insert(), rows)
+
+                summary['days'] += len(chunk)
+                summary['rows'] += len(rows)
+
+        logger.info(f"Rollup market_stats: перераховано {summary['days']} днів, записано {summary['rows']} рядків")
+        return summary
+
+    @staticmethod
+    def _touched_days(session: Session, since: Optional[datetime]) -> Set[Tuple[str, date]]:
+        """Пари (місто, день створення) оголошень, змінених після since"""
+        query = session.query(PropertyListing.city_id, func.date(PropertyListing.created_at)).distinct()
+        if since is not None:
+            query = query.filter(or_(PropertyListing.updated_at >= since, PropertyListing.created_at >= since))
+
+        return {(city_id, _as_date(day)) for city_id, day in query if day is not None}
+
+    @staticmethod
+    def _compute_chunk(session: Session, chunk: List[Tuple[str, date]],
+                       computed_at: datetime) -> List[Dict[str, Any]]:
+        """Рядки market_stats для пар (місто, день): місто цілком та кожен район"""
+        listings = session.query(
+            PropertyListing.city_id,
+            PropertyListing.district_id,
+            PropertyListing.created_at,
+            PropertyListing.price_uah,
+            PropertyListing.area_total,
+            PropertyListing.rooms
+        ).filter(
+            PropertyListing.is_active == True,
+            PropertyListing.price_uah > 0,
+            PropertyListing.area_total > 0,
+            or_(*[
+                and_(PropertyListing.city_id == city_id,
+                     PropertyListing.created_at >= _day_start(day),
+                     PropertyListing.created_at < _day_start(day) + timedelta(days=1))
+                for city_id, day in chunk
+            ])
+        ).all()
+
+        groups: Dict[Tuple[str, Optional[str], date], List[Any]] = {}
+        for listing in listings:
+            day = listing.created_at.date()
+            groups.setdefault((listing.city_id, None, day), []).append(listing)
+            if listing.district_id:
+                groups.setdefault((listing.city_id, listing.district_id, day), []).append(listing)
+
+        return [
+            _stats_row(city_id, district_id, day, group, computed_at)
+            for (city_id, district_id, day), group in groups.items()
+        ]
+
+
+def _stats_row(city_id: str, district_id: Optional[str], day: date, listings: Iterable[Any],
+               computed_at: datetime) -> Dict[str, Any]:
+    """Один рядок market_stats з оголошень групи"""
+    price = np.array([listing.price_uah for listing in listings], dtype=float)
+    area = np.array([listing.area_total for listing in listings], dtype=float)
+    rooms = np.array([listing.rooms or 0 for listing in listings])
+    price_per_sqm = price / area
+
+    row = {
+        'city_id': city_id,
+        'district_id': district_id,
+        'date': _day_start(day),
+        'total_listings': len(price),
+        'average_price_per_sqm': float(price.sum() / area.sum()),
+        'median_price_per_sqm': float(np.median(price_per_sqm)),
+        'average_area': float(area.mean()),
+        'created_at': computed_at,
+    }
+
+    for column, mask in (('avg_price_1_room', rooms == 1), ('avg_price_2_room', rooms == 2),
+                         ('avg_price_3_room', rooms == 3), ('avg_price_4_plus_room', rooms >= 4)):
+        row[column] = float(price_per_sqm[mask].mean()) if mask.any() else None
+
+    return row
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+def _as_date(value) -> date:
+    """func.date повертає date (PostgreSQL) або рядок 'YYYY-MM-DD' (SQLite)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
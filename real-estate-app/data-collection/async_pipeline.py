@@ -0,0 +1,184 @@
+"""
+Асинхронний пайплайн парсингу
+Сторінки пошуку -> картки оголошень -> детальні сторінки -> записи -> запис у БД.
+Етапи з'єднані обмеженими чергами (зворотний тиск: продюсер чекає, поки
+воркери і запис у БД встигають), мережа - одна aiohttp сесія з пулом
+з'єднань та обмеженням запитів на домен джерела
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from scrapers.politeness import AsyncDomainThrottle
+
+logger = logging.getLogger(__name__)
+
+# Маркер завершення етапу в черзі
+_DONE = object()
+
+
+class AsyncScrapingPipeline:
+    """
+    Продюсер/споживач пайплайн для асинхронного парсера.
+    scraper має надавати get_search_url, parse_search_page, parse_detail_page
+    (див. AsyncOLXScraper)
+    """
+
+    def __init__(self, scraper, workers: int = 4, queue_size: int = 100, write_batch_size: int = 200,
+                 max_concurrent_requests: int = 2, min_request_interval: float = 0.5,
+                 request_timeout: float = 15.0):
+        self.scraper = scraper
+        self.workers = workers
+        self.queue_size = queue_size
+        self.write_batch_size = write_batch_size
+        self.max_concurrent_requests = max_concurrent_requests
+        self.min_request_interval = min_request_interval
+        self.request_timeout = request_timeout
+
+        self.stats = {
+            'search_pages': 0,
+            'detail_pages': 0,
+            'failed_requests': 0,
+            'listings': 0,
+            'write_batches': 0,
+        }
+
+    def run(self, cities: List[str], max_pages: int,
+            writer: Optional[Callable[[Dict[str, List[Dict]]], Any]] = None) -> Dict[str, List[Dict]]:
+        """Синхронна обгортка над run_async (власний event loop)"""
+        return asyncio.run(self.run_async(cities, max_pages, writer))
+
+    async def run_async(self, cities: List[str], max_pages: int,
+                        writer: Optional[Callable[[Dict[str, List[Dict]]], Any]] = None
+                        ) -> Dict[str, List[Dict]]:
+        """
+        Збирає оголошення для міст. writer (синхронний, викликається в потоці)
+        отримує пачки {місто: [записи]} по мірі надходження.
+        Повертає всі записи по містах
+        """
+        started = time.monotonic()
+        results: Dict[str, List[Dict]] = {city: [] for city in cities}
+        cards: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        records: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        throttle = AsyncDomainThrottle(self.max_concurrent_requests, self.min_request_interval)
+
+        connector = aiohttp.TCPConnector(limit=self.workers + 1,
+                                         limit_per_host=self.max_concurrent_requests)
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout)
+        headers = {
+            'User-Agent': self.scraper.ua.random,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'uk-UA,uk;q=0.9,en;q=0.8',
+        }
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            consumers = [
+                asyncio.create_task(self._detail_worker(session, throttle, cards, records))
+                for _ in range(self.workers)
+            ]
+            writer_task = asyncio.create_task(self._writer(records, results, writer))
+
+            try:
+                await self._produce(session, throttle, cities, max_pages, cards)
+            finally:
+                for _ in consumers:
+                    await cards.put(_DONE)
+                await asyncio.gather(*consumers)
+                await records.put(_DONE)
+                await writer_task
+
+        logger.info(
+            f"Асинхронний збір {getattr(self.scraper, 'source', '')}: {self.stats['listings']} оголошень "
+            f"за {time.monotonic() - started:.1f} с ({self.stats['detail_pages']} детальних сторінок)"
+        )
+        return results
+
+    async def _fetch(self, session: aiohttp.ClientSession, throttle: AsyncDomainThrottle,
+                     url: str) -> Optional[str]:
+        """Завантажує сторінку з урахуванням обмежень домену"""
+        try:
+            async with throttle.request(url):
+                async with session.get(url) as response:
+                    if response.status != 200:
+                        logger.warning(f"Сторінка {url} повернула {response.status}")
+                        self.stats['failed_requests'] += 1
+                        return None
+                    return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Не вдалося завантажити {url}: {e}")
+            self.stats['failed_requests'] += 1
+            return None
+
+    async def _produce(self, session, throttle, cities: List[str], max_pages: int, cards: asyncio.Queue):
+        """Етап 1: сторінки пошуку -> картки оголошень"""
+        for city in cities:
+            for page in range(1, max_pages + 1):
+                try:
+                    url = self.scraper.get_search_url(city, page)
+                except ValueError as e:
+                    logger.error(f"Помилка при зборі для міста {city}: {e}")
+                    break
+
+                html = await self._fetch(session, throttle, url)
+                if html is None:
+                    break
+                self.stats['search_pages'] += 1
+
+                page_cards = await asyncio.to_thread(self.scraper.parse_search_page, html)
+                if not page_cards:
+                    logger.info(f"На сторінці {page} для {city} не знайдено оголошень")
+                    break
+
+                for card in page_cards:
+                    # Блокується, якщо воркери не встигають (зворотний тиск)
+                    await cards.put((city, card))
+
+    async def _detail_worker(self, session, throttle, cards: asyncio.Queue, records: asyncio.Queue):
+        """Етап 2: картка -> детальна сторінка -> запис"""
+        while True:
+            item = await cards.get()
+            if item is _DONE:
+                return
+
+            city, card = item
+            try:
+                html = await self._fetch(session, throttle, card['url']) if card.get('url') else None
+                if html is not None:
+                    self.stats['detail_pages'] += 1
+
+                record = await asyncio.to_thread(self.scraper.parse_detail_page, card, html)
+                if record:
+                    await records.put((city, record))
+            except Exception as e:
+                logger.error(f"Помилка обробки оголошення {card.get('external_id')}: {e}")
+
+    async def _writer(self, records: asyncio.Queue, results: Dict[str, List[Dict]],
+                      writer: Optional[Callable[[Dict[str, List[Dict]]], Any]]):
+        """Етап 3: записи -> пачки для запису в БД"""
+        batch: Dict[str, List[Dict]] = {}
+        batch_size = 0
+
+        while True:
+            item = await records.get()
+            if item is not _DONE:
+                city, record = item
+                results[city].append(record)
+                batch.setdefault(city, []).append(record)
+                batch_size += 1
+                self.stats['listings'] += 1
+
+            if batch_size and (item is _DONE or batch_size >= self.write_batch_size):
+                if writer is not None:
+                    try:
+                        await asyncio.to_thread(writer, batch)
+                        self.stats['write_batches'] += 1
+                    except Exception as e:
+                        logger.error(f"Помилка запису пачки з {batch_size} оголошень: {e}")
+                batch, batch_size = {}, 0
+
+            if item is _DONE:
+                return
@@ -10,7 +10,9 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 import json
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
@@ -19,12 +21,17 @@ from apscheduler.events import EVENT_JOB_EXECUTED, EVENT_JOB_ERROR
 # Додаємо кореневу папку до шляху
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scrapers.olx_scraper import OLXScraper
+from scrapers.olx_scraper import OLXScraper, AsyncOLXScraper
 from scrapers.domria_scraper import DomRiaScraper
 from scrapers.realt_scraper import RealtScraper
 from scrapers.address_scraper import AddressScraper
 from models import PropertyListing, City, District
 from database import DatabaseManager
+from ingestion import ListingIngestor
+from gazetteer import load_gazetteer
+from district_assignment import make_district_resolver
+from async_pipeline import AsyncScrapingPipeline
+from analyzers.market_rollup import MarketStatsRollup
 from config import Config
 
 class AutoScrapingManager:
@@ -33,6 +40,10 @@ class AutoScrapingManager:
     def __init__(self):
         self.config = Config()
         self.db = DatabaseManager(self.config.DATABASE_URL)
+        self.ingestor = ListingIngestor(self.db, chunk_size=self.config.INGEST_CHUNK_SIZE,
+                                        gazetteer=load_gazetteer(self.config.GAZETTEER_PATH),
+                                        district_resolver=make_district_resolver(self.db, self.config.DISTRICT_POLYGONS_PATH))
+        self.stats_rollup = MarketStatsRollup(self.db)
         self.scheduler = BackgroundScheduler()
 
         # Ініціалізуємо скрапери з покращеною конфігурацією
@@ -43,15 +54,32 @@ class AutoScrapingManager:
             'address': AddressScraper(),
         }
 
+        # Асинхронні парсери (використовуються при Config.ASYNC_SCRAPING)
+        self.async_scrapers = {
+            'olx': AsyncOLXScraper(),
+        }
+
         # Статистика для моніторингу
         self.stats = {
             'total_runs': 0,
             'successful_runs': 0,
             'failed_runs': 0,
             'total_listings_collected': 0,
+            'listings_inserted': 0,
+            'listings_updated': 0,
+            'listings_unchanged': 0,
+            'listings_skipped': 0,
             'last_run_time': None,
+            'last_cycle_seconds': None,
+            'last_stats_rollup': None,
+            'sources': {},
             'errors': []
         }
+        self._stats_lock = threading.Lock()
+
+        # Єдиний потік запису в БД: джерела, що збираються паралельно,
+        # не конкурують за блокування бази
+        self.db_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
 
         self._setup_logging()
         self._setup_scrapers()
@@ -107,19 +135,25 @@ class AutoScrapingManager:
 
         scraper = self.scrapers[source]
         self.logger.info(f"Починаю збір даних з {source} для міст: {cities}")
+        started = time.monotonic()
 
         try:
-            # Збираємо дані з одного джерела для всіх міст
-            source_data = scraper.scrape_multiple_cities(
-                cities,
-                self.config.MAX_PAGES_PER_CITY
-            )
+            if self.config.ASYNC_SCRAPING and source in self.async_scrapers:
+                # Асинхронний пайплайн зберігає дані пачками по мірі збору
+                source_data = self._collect_data_async(source, cities)
+            else:
+                # Збираємо дані з одного джерела для всіх міст
+                source_data = scraper.scrape_multiple_cities(
+                    cities,
+                    self.config.MAX_PAGES_PER_CITY
+                )
 
-            # Зберігаємо дані в базу
-            self._save_listings_to_db(source_data, source)
+                # Зберігаємо дані в базу
+                self._save_listings_to_db(source_data, source)
 
             listings_count = sum(len(listings) for listings in source_data.values())
             self.logger.info(f"Завершено збір з {source}: {listings_count} оголошень")
+            self._record_source_run(source, listings_count, time.monotonic() - started)
 
             return source_data
 
@@ -130,37 +164,44 @@ class AutoScrapingManager:
                 'error': str(e),
                 'timestamp': datetime.utcnow().isoformat()
             })
+            self._record_source_run(source, 0, time.monotonic() - started, error=str(e))
             return {}
 
-    def _save_listings_to_db(self, source_data: Dict[str, List[Dict]], source: str):
-        """Зберігає оголошення в базу даних з дедуплікацією"""
-        with self.db.get_session() as session:
-            for city_name, listings in source_data.items():
-                self.logger.info(f"Зберігаю {len(listings)} оголошень для {city_name}")
-
-                for listing_data in listings:
-                    try:
-                        # Створюємо або оновлюємо оголошення
-                        listing = session.query(PropertyListing).filter_by(
-                            external_id=listing_data['external_id'],
-                            source=source
-                        ).first()
-
-                        if listing:
-                            # Оновлюємо існуюче оголошення
-                            for key, value in listing_data.items():
-                                if hasattr(listing, key):
-                                    setattr(listing, key, value)
-                            listing.last_seen_at = datetime.utcnow()
-                        else:
-                            # Створюємо нове оголошення
-                            listing = PropertyListing(**listing_data)
-                            session.add(listing)
-
-                    except Exception as e:
-                        self.logger.error(f"Помилка при збереженні оголошення {listing_data.get('external_id')}: {e}")
-
-            session.commit()
+    def _record_source_run(self, source: str, listings_count: int, wall_time: float, error: str = None):
+        """Зберігає час і пропускну здатність останнього збору з джерела"""
+        with self._stats_lock:
+            self.stats['sources'][source] = {
+                'wall_time_seconds': round(wall_time, 2),
+                'listings': listings_count,
+                'listings_per_second': round(listings_count / wall_time, 2) if wall_time > 0 else 0.0,
+                'finished_at': datetime.utcnow().isoformat(),
+                'error': error,
+            }
+
+    def _collect_data_async(self, source: str, cities: List[str]) -> Dict[str, List[Dict]]:
+        """Збирає дані асинхронним пайплайном з ASYNC_WORKERS воркерами"""
+        source_config = self.config.get_source_config()[source]
+        pipeline = AsyncScrapingPipeline(
+            self.async_scrapers[source],
+            workers=self.config.ASYNC_WORKERS,
+            queue_size=self.config.ASYNC_QUEUE_SIZE,
+            write_batch_size=self.config.INGEST_CHUNK_SIZE,
+            max_concurrent_requests=source_config['max_concurrent_requests'],
+            min_request_interval=source_config['min_request_interval'],
+        )
+        return pipeline.run(
+            cities,
+            self.config.MAX_PAGES_PER_CITY,
+            writer=lambda batch: self._save_listings_to_db(batch, source)
+        )
+
+    def _save_listings_to_db(self, source_data: Dict[str, List[Dict]], source: str) -> Dict[str, int]:
+        """Зберігає оголошення в базу даних з дедуплікацією (через єдиний потік запису)"""
+        counts = self.db_writer.submit(self.ingestor.ingest, source_data, source).result()
+        with self._stats_lock:
+            for key, value in counts.items():
+                self.stats[f'listings_{key}'] += value
+        return counts
 
     def run_full_scraping_cycle(self):
         """Запускає повний цикл парсингу всіх джерел"""
@@ -172,15 +213,18 @@ class AutoScrapingManager:
         self.stats['total_runs'] += 1
 
         try:
-            all_data = {}
+            if self.config.CONCURRENT_SOURCES:
+                all_data = self._collect_all_sources_concurrently()
+            else:
+                all_data = {}
 
-            # Проходимо по всіх джерелах
-            for source in self.config.SOURCES:
-                source_data = self.collect_data_from_source(source, self.config.CITIES)
-                all_data[source] = source_data
+                # Проходимо по всіх джерелах
+                for source in self.config.SOURCES:
+                    source_data = self.collect_data_from_source(source, self.config.CITIES)
+                    all_data[source] = source_data
 
-                # Пауза між джерелами
-                time.sleep(5)
+                    # Пауза між джерелами
+                    time.sleep(5)
 
             # Підраховуємо статистику
             total_listings = sum(
@@ -197,6 +241,7 @@ class AutoScrapingManager:
                 self.stats['errors'] = self.stats['errors'][-10:]
 
             execution_time = time.time() - start_time
+            self.stats['last_cycle_seconds'] = round(execution_time, 2)
 
             self.logger.info("=" * 50)
             self.logger.info(f"ЦИКЛ ПАРСИНГУ ЗАВЕРШЕНО УСПІШНО")
@@ -216,6 +261,27 @@ class AutoScrapingManager:
                 'timestamp': datetime.utcnow().isoformat()
             })
 
+    def _collect_all_sources_concurrently(self) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Збирає всі джерела одночасно, кожне у власному потоці.
+        Джерела - різні сайти, тому пауза між ними не потрібна: кожен парсер
+        дотримується власних затримок, а запис у БД іде через db_writer
+        """
+        sources = list(self.config.SOURCES)
+        with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='source') as executor:
+            futures = {
+                source: executor.submit(self.collect_data_from_source, source, self.config.CITIES)
+                for source in sources
+            }
+            return {source: future.result() for source, future in futures.items()}
+
+    def run_stats_rollup(self) -> Dict[str, int]:
+        """Інкрементальний rollup market_stats через єдиний потік запису в БД"""
+        summary = self.db_writer.submit(self.stats_rollup.run).result()
+        with self._stats_lock:
+            self.stats['last_stats_rollup'] = {**summary, 'time': datetime.utcnow().isoformat()}
+        return summary
+
     def _send_telegram_notification(self, listings_count: int, execution_time: float):
         """Надсилає сповіщення в Telegram про результати парсингу"""
         if not (self.config.TELEGRAM_BOT_TOKEN and self.config.TELEGRAM_CHAT_ID):
@@ -263,7 +329,15 @@ class AutoScrapingManager:
             'failed_runs': self.stats['failed_runs'],
             'success_rate': (self.stats['successful_runs'] / max(1, self.stats['total_runs'])) * 100,
             'total_listings_collected': self.stats['total_listings_collected'],
+            'ingestion': {
+                key: self.stats[f'listings_{key}']
+                for key in ('inserted', 'updated', 'unchanged', 'skipped')
+            },
             'last_run_time': self.stats['last_run_time'].isoformat() if self.stats['last_run_time'] else None,
+            'last_cycle_seconds': self.stats['last_cycle_seconds'],
+            'concurrent_sources': self.config.CONCURRENT_SOURCES,
+            'last_stats_rollup': self.stats['last_stats_rollup'],
+            'sources': dict(self.stats['sources']),
             'uptime_seconds': uptime.total_seconds() if uptime else None,
             'recent_errors': self.stats['errors'][-5:],  # Останні 5 помилок
             'next_run_in': self._get_next_run_time(),
@@ -295,6 +369,16 @@ class AutoScrapingManager:
             replace_existing=True
         )
 
+        # Щоденна статистика ринку: перераховуються лише змінені дні
+        self.scheduler.add_job(
+            func=self.run_stats_rollup,
+            trigger=IntervalTrigger(minutes=self.config.STATS_ROLLUP_INTERVAL_MINUTES),
+            id='market_stats_rollup',
+            name='Market Stats Rollup',
+            replace_existing=True,
+            next_run_time=datetime.now()
+        )
+
         # Додаємо обробники подій для моніторингу
         def job_executed_listener(event):
             self.logger.info(f"Завдання {event.job_id} виконано успішно")
@@ -316,6 +400,7 @@ class AutoScrapingManager:
         """Зупиняє планувальник"""
         self.logger.info("Зупиняю планувальник...")
         self.scheduler.shutdown()
+        self.db_writer.shutdown(wait=True)
         self.logger.info("Планувальник зупинено")
 
     def run_once(self):
@@ -13,12 +13,19 @@ class Config:
     SOURCES = ['olx', 'dom_ria', 'realt', 'address']
     MAX_PAGES_PER_CITY = 3
     REQUEST_DELAY = 2  # секунди між запитами
+    MAX_CONCURRENT_REQUESTS = 2  # одночасних запитів до одного джерела
+    MIN_REQUEST_INTERVAL = 0.5  # секунди між початком запитів до одного джерела
 
     # Налаштування бази даних
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///real_estate.db')
+    INGEST_CHUNK_SIZE = int(os.getenv('INGEST_CHUNK_SIZE', 500))  # оголошень в одному upsert
+    GAZETTEER_PATH = os.getenv('GAZETTEER_PATH')  # CSV газетир адрес для офлайн геокодування
+    DISTRICT_POLYGONS_PATH = os.getenv('DISTRICT_POLYGONS_PATH')  # GeoJSON межі районів (інакше - найближчий центр)
 
     # Налаштування планувальника
     SCRAPING_INTERVAL_HOURS = 1  # інтервал між запусками парсингу
+    CONCURRENT_SOURCES = os.getenv('CONCURRENT_SOURCES', 'false').lower() == 'true'  # джерела паралельно
+    STATS_ROLLUP_INTERVAL_MINUTES = int(os.getenv('STATS_ROLLUP_INTERVAL_MINUTES', 30))  # інкрементальний rollup market_stats
 
     # Налаштування логування
     LOG_LEVEL = 'INFO'
@@ -44,6 +51,8 @@ class Config:
 
     # Черга завдань для асинхронного парсингу
     ASYNC_WORKERS = 4
+    ASYNC_SCRAPING = os.getenv('ASYNC_SCRAPING', 'false').lower() == 'true'
+    ASYNC_QUEUE_SIZE = 100  # розмір черг між етапами пайплайна
 
     @classmethod
     def get_source_config(cls) -> Dict[str, Any]:
@@ -54,23 +63,31 @@ class Config:
                 'search_path': '/neruhomist/kvartyry/prodazha-kvartyr',
                 'encoding': 'utf-8',
                 'request_delay': cls.REQUEST_DELAY,
+                'max_concurrent_requests': cls.MAX_CONCURRENT_REQUESTS,
+                'min_request_interval': cls.MIN_REQUEST_INTERVAL,
             },
             'dom_ria': {
                 'base_url': 'https://dom.ria.com',
                 'search_path': '/uk/prodazha-kvartir',
                 'encoding': 'utf-8',
                 'request_delay': cls.REQUEST_DELAY,
+                'max_concurrent_requests': cls.MAX_CONCURRENT_REQUESTS,
+                'min_request_interval': cls.MIN_REQUEST_INTERVAL,
             },
             'realt': {
                 'base_url': 'https://realt.ua',
                 'search_path': '/arenda-kvartir',
                 'encoding': 'utf-8',
                 'request_delay': cls.REQUEST_DELAY,
+                'max_concurrent_requests': cls.MAX_CONCURRENT_REQUESTS,
+                'min_request_interval': cls.MIN_REQUEST_INTERVAL,
             },
             'address': {
                 'base_url': 'https://address.ua',
                 'search_path': '/prodazha-kvartir',
                 'encoding': 'utf-8',
                 'request_delay': cls.REQUEST_DELAY,
+                'max_concurrent_requests': cls.MAX_CONCURRENT_REQUESTS,
+                'min_request_interval': cls.MIN_REQUEST_INTERVAL,
             }
         }
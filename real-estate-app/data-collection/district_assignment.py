@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Визначення району оголошення за координатами
+Райони міста беруться з таблиці districts (центроїди latitude/longitude,
+для Харкова - з KHARKIV_CITY.districts). Пачка оголошень обробляється
+однією матричною операцією: відстані всіх точок до всіх центроїдів міста
+і argmin. Якщо задано межі районів (GeoJSON), спершу перевіряється
+належність точок полігонам, центроїди - для точок поза всіма полігонами.
+Запуск як скрипта - заповнення district_id для існуючих оголошень
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import update
+
+from database import DatabaseManager
+from models import District, PropertyListing
+
+logger = logging.getLogger(__name__)
+
+# Кілометрів в одному градусі широти
+KM_PER_DEGREE = 111.195
+
+# Точки, далі за цю відстань від найближчого центроїда, район не отримують
+DEFAULT_MAX_DISTANCE_KM = 15.0
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Полігон - кільце вершин (широта, довгота); район може мати кілька полігонів
+Ring = Sequence[Tuple[float, float]]
+
+
+class _CityDistricts(NamedTuple):
+    """Райони одного міста у вигляді масивів"""
+    ids: np.ndarray  # object, останній елемент - None для точок без району
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    polygons: List[Tuple[int, np.ndarray, np.ndarray]]  # (індекс району, широти, довготи)
+
+
+def points_in_ring(latitudes: np.ndarray, longitudes: np.ndarray,
+                   ring_latitudes: np.ndarray, ring_longitudes: np.ndarray) -> np.ndarray:
+    """Маска точок всередині кільця (правило парності перетинів, цикл по вершинах)"""
+    inside = np.zeros(len(latitudes), dtype=bool)
+    j = len(ring_latitudes) - 1
+    for i in range(len(ring_latitudes)):
+        lat_i, lon_i = ring_latitudes[i], ring_longitudes[i]
+        lat_j, lon_j = ring_latitudes[j], ring_longitudes[j]
+        if lat_i != lat_j:
+            crosses = (lat_i > latitudes) != (lat_j > latitudes)
+            crossing_lon = lon_i + (lon_j - lon_i) * (latitudes - lat_i) / (lat_j - lat_i)
+            inside ^= crosses & (longitudes < crossing_lon)
+        j = i
+    return inside
+
+
+def load_polygons(path: str) -> Dict[str, List[Ring]]:
+    """
+    Межі районів з GeoJSON (FeatureCollection з properties.district_id,
+    геометрія Polygon або MultiPolygon). Береться зовнішнє кільце полігона
+    """
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    polygons: Dict[str, List[Ring]] = {}
+    for feature in collection.get('features', []):
+        properties = feature.get('properties') or {}
+        district_id = properties.get('district_id') or feature.get('id')
+        geometry = feature.get('geometry') or {}
+        if not district_id or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+            continue
+
+        parts = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        for part in parts:
+            # GeoJSON зберігає вершини як [довгота, широта]
+            polygons.setdefault(str(district_id), []).append([(lat, lon) for lon, lat in part[0]])
+    return polygons
+
+
+class DistrictResolver:
+    """
+    Призначає district_id за координатами. Райони завантажуються з БД при
+    першому зверненні (refresh - перечитати), polygons - межі районів
+    {district_id: [кільце, ...]}
+    """
+
+    def __init__(self, db: Optional[DatabaseManager] = None, polygons: Optional[Dict[str, List[Ring]]] = None,
+                 max_distance_km: float = DEFAULT_MAX_DISTANCE_KM):
+        self.db = db
+        self.polygons = polygons or {}
+        self.max_distance_km = max_distance_km
+        self._cities: Optional[Dict[str, _CityDistricts]] = None
+
+    def refresh(self):
+        """Перечитує райони з БД"""
+        with self.db.get_session() as session:
+            districts = session.query(District.id, District.city_id, District.latitude, District.longitude).filter(
+                District.latitude.isnot(None), District.longitude.isnot(None)
+            ).all()
+        self.load(districts)
+
+    def load(self, districts: Iterable[Tuple[str, str, float, float]]):
+        """Будує масиви з записів (id, city_id, широта, довгота)"""
+        by_city: Dict[str, List[Tuple[str, float, float]]] = {}
+        for district_id, city_id, latitude, longitude in districts:
+            by_city.setdefault(city_id, []).append((district_id, latitude, longitude))
+
+        self.load_arrays({
+            city_id: (
+                [item[0] for item in items],
+                np.array([item[1] for item in items], dtype=np.float64),
+                np.array([item[2] for item in items], dtype=np.float64),
+            )
+            for city_id, items in by_city.items()
+        })
+
+    def load_arrays(self, cities: Dict[str, Tuple[Sequence[str], np.ndarray, np.ndarray]]):
+        """
+        Райони з готових масивів {city_id: (ids, широти, довготи)}, напр.
+        LOCATIONS.district_arrays(...) з location_types бекенду
+        """
+        self._cities = {}
+        known = set()
+        for city_id, (ids, latitudes, longitudes) in cities.items():
+            ids = list(ids)
+            polygons = []
+            for index, district_id in enumerate(ids):
+                for ring in self.polygons.get(district_id, []):
+                    ring = np.asarray(ring, dtype=np.float64)
+                    polygons.append((index, ring[:, 0], ring[:, 1]))
+                known.add(district_id)
+            self._cities[city_id] = _CityDistricts(
+                np.array(ids + [None], dtype=object),
+                np.asarray(latitudes, dtype=np.float64),
+                np.asarray(longitudes, dtype=np.float64),
+                polygons,
+            )
+
+        unknown = set(self.polygons) - known
+        if unknown:
+            logger.warning(f"Межі для невідомих районів пропущено: {sorted(unknown)}")
+        logger.info(f"Завантажено райони {len(self._cities)} міст, меж районів: {len(self.polygons) - len(unknown)}")
+
+    def resolve(self, city_ids: Sequence[str], latitudes: Sequence[float],
+                longitudes: Sequence[float]) -> np.ndarray:
+        """district_id для кожної точки (None - район не визначено); одна операція на місто"""
+        if self._cities is None:
+            self.refresh()
+
+        city_ids = np.asarray(city_ids, dtype=object)
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        result = np.full(len(city_ids), None, dtype=object)
+
+        for city_id in set(city_ids.tolist()):
+            districts = self._cities.get(city_id)
+            if districts is None:
+                continue
+            mask = city_ids == city_id
+            result[mask] = districts.ids[self._nearest(districts, latitudes[mask], longitudes[mask])]
+        return result
+
+    def _nearest(self, districts: _CityDistricts, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """Індекси в districts.ids; точки без району отримують індекс останнього (None)"""
+        # Відстані (точки x центроїди) у наближенні рівнокутної проекції
+        scale = math.cos(math.radians(float(np.mean(districts.latitudes))))
+        d_lat = latitudes[:, None] - districts.latitudes[None, :]
+        d_lon = (longitudes[:, None] - districts.longitudes[None, :]) * scale
+        distances = np.hypot(d_lat, d_lon) * KM_PER_DEGREE
+
+        nearest = np.argmin(distances, axis=1)
+        nearest[distances[np.arange(len(nearest)), nearest] > self.max_distance_km] = -1
+        nearest[~(np.isfinite(latitudes) & np.isfinite(longitudes))] = -1
+
+        # Полігони мають перевагу над центроїдами
+        for index, ring_latitudes, ring_longitudes in districts.polygons:
+            nearest[points_in_ring(latitudes, longitudes, ring_latitudes, ring_longitudes)] = index
+
+        return np.where(nearest >= 0, nearest, len(districts.ids) - 1)
+
+    def assign(self, rows: List[Dict[str, Any]]) -> int:
+        """Заповнює district_id рядків з координатами та без району; повертає кількість"""
+        pending = [
+            row for row in rows
+            if not row.get('district_id') and row.get('city_id')
+            and row.get('latitude') is not None and row.get('longitude') is not None
+        ]
+        if not pending:
+            return 0
+
+        district_ids = self.resolve(
+            [row['city_id'] for row in pending],
+            [row['latitude'] for row in pending],
+            [row['longitude'] for row in pending],
+        )
+        assigned = 0
+        for row, district_id in zip(pending, district_ids):
+            if district_id is not None:
+                row['district_id'] = district_id
+                assigned += 1
+        return assigned
+
+    def backfill(self, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+        """
+        district_id для існуючих оголошень з координатами без району.
+        Кожна порція фіксується окремо, повторний запуск продовжує роботу
+        """
+        self.refresh()
+        updated = 0
+        after = None
+
+        while True:
+            with self.db.get_session() as session:
+                query = session.query(
+                    PropertyListing.id, PropertyListing.city_id, PropertyListing.latitude, PropertyListing.longitude
+                ).filter(
+                    PropertyListing.district_id.is_(None),
+                    PropertyListing.latitude.isnot(None),
+                    PropertyListing.longitude.isnot(None),
+                )
+                if after is not None:
+                    query = query.filter(PropertyListing.id > after)
+                rows = query.order_by(PropertyListing.id).limit(batch_size).all()
+                if not rows:
+                    break
+                after = rows[-1].id
+
+                district_ids = self.resolve(
+                    [row.city_id for row in rows], [row.latitude for row in rows], [row.longitude for row in rows]
+                )
+                values = [
+                    {'id': row.id, 'district_id': district_id}
+                    for row, district_id in zip(rows, district_ids) if district_id is not None
+                ]
+                if values:
+                    # Оновлення за первинним ключем одним executemany
+                    session.execute(update(PropertyListing), values)
+                updated += len(values)
+                logger.info(f"Оброблено оголошень до {after}, призначено районів: {updated}")
+
+        logger.info(f"Заповнення районів завершено: {updated} оголошень")
+        return updated
+
+
+def make_district_resolver(db: DatabaseManager, polygons_path: Optional[str] = None,
+                           max_distance_km: float = DEFAULT_MAX_DISTANCE_KM) -> DistrictResolver:
+    """Визначник районів з межами з GeoJSON (якщо шлях задано)"""
+    polygons = load_polygons(polygons_path) if polygons_path else None
+    return DistrictResolver(db, polygons=polygons, max_distance_km=max_distance_km)
+
+
+def main():
+    """Заповнення district_id для існуючих оголошень"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Визначення районів оголошень за координатами')
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE, help='Оголошень в одній транзакції')
+    parser.add_argument('--polygons', default=os.getenv('DISTRICT_POLYGONS_PATH'), help='GeoJSON з межами районів')
+    parser.add_argument('--max-distance', type=float, default=DEFAULT_MAX_DISTANCE_KM,
+                        help='Максимальна відстань до центроїда району, км')
+    args = parser.parse_args()
+
+    db = DatabaseManager(os.getenv('DATABASE_URL', 'sqlite:///real_estate.db'))
+    make_district_resolver(db, args.polygons, args.max_distance).backfill(args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
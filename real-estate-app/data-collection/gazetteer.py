@@ -0,0 +1,205 @@
+"""
+Офлайн геокодування за локальним газетиром адрес
+Газетир - CSV з колонками city, street, house_number, latitude, longitude
+(одна адресна точка на рядок; рядок без номера - центр вулиці). Точки
+кожної вулиці зберігаються компактно (array) окремо для парних і непарних
+номерів: відомий номер повертається точно, невідомий - інтерполюється між
+сусідніми номерами тієї ж сторони вулиці. Пошук - нормалізація адреси та
+звернення до словника (місто, вулиця), тобто мікросекунди без мережі
+"""
+
+import csv
+import logging
+import re
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from geocoding import STREET_TYPE_WORDS, Coordinates, cache_key, normalize_address
+
+logger = logging.getLogger(__name__)
+
+# Слова, які не є частиною назви вулиці
+_SKIP_WORDS = frozenset({'м', 'місто', 'україна', 'буд', 'будинок', 'д'})
+
+_HOUSE_RE = re.compile(r'^(\d+)-?(\S*)$')
+
+
+class _Side(NamedTuple):
+    """Точки однієї сторони вулиці, відсортовані за номером"""
+    numbers: array
+    latitudes: array
+    longitudes: array
+
+
+class _Street(NamedTuple):
+    sides: Tuple[_Side, _Side]  # парні, непарні
+    suffixed: Dict[str, Tuple[float, float]]  # номери з літерою/дробом: '25а', '7/2'
+    center: Tuple[float, float]
+
+
+def split_address(address: Optional[str], city: Optional[str] = None) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    (ключ вулиці, номер будинку) з адреси. Тип вулиці, назва міста та
+    службові слова відкидаються; номером вважається перше число після назви
+    """
+    city_words = set(cache_key(None, city)[1].split())
+    street: List[str] = []
+    for word in normalize_address(address).split():
+        if street and _HOUSE_RE.match(word):
+            return ' '.join(street), word.replace('-', '')
+        if word in STREET_TYPE_WORDS or word in _SKIP_WORDS or word in city_words:
+            continue
+        street.append(word)
+    return (' '.join(street), None) if street else None
+
+
+class Gazetteer:
+    """Індекс адресних точок; geocode(address, city) - як у провайдерів geocoding"""
+
+    name = 'gazetteer'
+
+    def __init__(self):
+        self._streets: Dict[Tuple[str, str], _Street] = {}
+        self.points = 0
+        self.counters = {
+            'exact': 0,
+            'interpolated': 0,
+            'street': 0,
+            'misses': 0,
+        }
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'Gazetteer':
+        """Завантажує газетир з CSV файлу"""
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            gazetteer = cls()
+            gazetteer.load(csv.DictReader(f))
+        logger.info(f"Завантажено газетир {path}: {len(gazetteer)} вулиць, {gazetteer.points} точок")
+        return gazetteer
+
+    def load(self, rows):
+        """Будує індекс з рядків (dict з колонками газетира); попередній індекс замінюється"""
+        points: Dict[Tuple[str, str], Dict[str, Tuple[float, float]]] = {}
+        centers: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+        for row in rows:
+            city_key = cache_key(None, row.get('city'))[1]
+            parsed = split_address(f"{row.get('street') or ''} {row.get('house_number') or ''}", row.get('city'))
+            try:
+                point = (float(row['latitude']), float(row['longitude']))
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not city_key or parsed is None:
+                continue
+
+            street_key, house = parsed
+            if house is None:
+                centers[(city_key, street_key)] = point
+            else:
+                points.setdefault((city_key, street_key), {}).setdefault(house, point)
+
+        self._streets = {}
+        self.points = 0
+        for key in points.keys() | centers.keys():
+            self._streets[key] = self._build_street(points.get(key, {}), centers.get(key))
+            self.points += len(points.get(key, {}))
+
+    @staticmethod
+    def _build_street(houses: Dict[str, Tuple[float, float]], center: Optional[Tuple[float, float]]) -> _Street:
+        """Сторони вулиці з точок {номер: (широта, довгота)}"""
+        numbered: Dict[int, Tuple[float, float]] = {}
+        suffixed: Dict[str, Tuple[float, float]] = {}
+        for house, point in houses.items():
+            match = _HOUSE_RE.match(house)
+            number = int(match.group(1))
+            if match.group(2):
+                suffixed[house] = point
+            # Для інтерполяції номер без літери має перевагу над '25а'
+            if not match.group(2) or number not in numbered:
+                numbered[number] = point
+
+        sides = []
+        for parity in (0, 1):
+            numbers = sorted(number for number in numbered if number % 2 == parity)
+            sides.append(_Side(
+                array('i', numbers),
+                array('d', (numbered[number][0] for number in numbers)),
+                array('d', (numbered[number][1] for number in numbers)),
+            ))
+
+        if center is None:
+            # Центр вулиці - середня за номером точка довшої сторони
+            side = max(sides, key=lambda s: len(s.numbers))
+            middle = len(side.numbers) // 2
+            center = (side.latitudes[middle], side.longitudes[middle])
+        return _Street(tuple(sides), suffixed, center)
+
+    def geocode(self, address: Optional[str], city: Optional[str]) -> Optional[Coordinates]:
+        """Координати адреси або None, якщо вулиці немає в газетирі"""
+        parsed = split_address(address, city)
+        street = self._streets.get((cache_key(None, city)[1], parsed[0])) if parsed else None
+        if street is None:
+            self.counters['misses'] += 1
+            return None
+
+        house = parsed[1]
+        if house is None:
+            self.counters['street'] += 1
+            return self._coordinates(street.center)
+        if house in street.suffixed:
+            self.counters['exact'] += 1
+            return self._coordinates(street.suffixed[house])
+
+        number = int(_HOUSE_RE.match(house).group(1))
+        side = street.sides[number % 2]
+        if not side.numbers:
+            side = street.sides[1 - number % 2]
+        if not side.numbers:
+            # Вулиця задана лише центром
+            self.counters['street'] += 1
+            return self._coordinates(street.center)
+
+        i = bisect_left(side.numbers, number)
+        if i < len(side.numbers) and side.numbers[i] == number:
+            self.counters['exact'] += 1
+            return self._coordinates((side.latitudes[i], side.longitudes[i]))
+
+        self.counters['interpolated'] += 1
+        if i == 0 or i == len(side.numbers):
+            # За межами відомих номерів - найближчий крайній будинок
+            i = min(i, len(side.numbers) - 1)
+            return self._coordinates((side.latitudes[i], side.longitudes[i]))
+
+        low, high = side.numbers[i - 1], side.numbers[i]
+        t = (number - low) / (high - low)
+        return self._coordinates((
+            side.latitudes[i - 1] + t * (side.latitudes[i] - side.latitudes[i - 1]),
+            side.longitudes[i - 1] + t * (side.longitudes[i] - side.longitudes[i - 1]),
+        ))
+
+    @staticmethod
+    def _coordinates(point: Tuple[float, float]) -> Coordinates:
+        return {'latitude': point[0], 'longitude': point[1]}
+
+    def __len__(self) -> int:
+        return len(self._streets)
+
+
+_loaded: Dict[str, Gazetteer] = {}
+
+
+def load_gazetteer(path: Optional[str]) -> Optional[Gazetteer]:
+    """
+    Газетир з файлу (один екземпляр на шлях у процесі) або None, якщо
+    шлях не задано чи файл не вдалося прочитати
+    """
+    if not path:
+        return None
+    if path not in _loaded:
+        try:
+            _loaded[path] = Gazetteer.from_csv(path)
+        except OSError as e:
+            logger.warning(f"Газетир {path} недоступний, лише онлайн геокодування: {e}")
+            return None
+    return _loaded[path]
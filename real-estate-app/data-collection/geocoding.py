@@ -0,0 +1,250 @@
+"""
+Геокодування адрес з кешем у базі даних
+Адреси нормалізуються (регістр, пробіли, скорочення, номер квартири), тому
+оголошення в одному будинку дають один ключ (адреса, місто). Ключі
+спершу шукаються в таблиці geocode_cache одним запитом на порцію, до
+провайдера йдуть лише промахи: паралельно, але не частіше за відро токенів.
+Провайдер змінний - за замовчуванням Nominatim, у тестах локальний сервер.
+З газетиром (gazetteer.py) адреси спершу шукаються офлайн, кеш та
+провайдер - лише для адрес, яких у газетирі немає
+"""
+
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+from sqlalchemy import update
+
+from database import DatabaseManager
+from models import GeocodeCache
+from scrapers.politeness import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = os.getenv('NOMINATIM_URL', 'https://nominatim.openstreetmap.org')
+
+# Політика Nominatim - не більше 1 запиту на секунду
+GEOCODING_RATE = float(os.getenv('GEOCODING_RATE', 1.0))
+GEOCODING_WORKERS = int(os.getenv('GEOCODING_WORKERS', 4))
+
+# Через скільки днів повторювати запит для не знайдених адрес
+NEGATIVE_TTL_DAYS = 30
+
+# Скільки ключів шукати в кеші одним запитом
+CACHE_LOOKUP_CHUNK = 500
+
+# Повні назви типів вулиць -> скорочення
+_STREET_TYPES = {
+    'вулиця': 'вул',
+    'проспект': 'просп',
+    'провулок': 'пров',
+    'площа': 'пл',
+    'бульвар': 'бул',
+    'шосе': 'шосе',
+    'набережна': 'наб',
+}
+
+# Типи вулиць після нормалізації (не входять у назву вулиці газетира)
+STREET_TYPE_WORDS = frozenset(_STREET_TYPES.values())
+
+_APARTMENT_RE = re.compile(r'\b(кв|квартира)\b\.?\s*\d+\S*')
+_PUNCTUATION_RE = re.compile(r'[.,;"«»()]+')
+
+Coordinates = Dict[str, float]
+CacheKey = Tuple[str, str]
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """Ключ адреси: без регістру, номера квартири, розділових знаків і зайвих пробілів"""
+    if not address:
+        return ''
+    text = _APARTMENT_RE.sub(' ', address.casefold().replace('’', "'"))
+    words = _PUNCTUATION_RE.sub(' ', text).split()
+    return ' '.join(_STREET_TYPES.get(word, word) for word in words)
+
+
+def cache_key(address: Optional[str], city: Optional[str]) -> CacheKey:
+    """Ключ таблиці geocode_cache"""
+    return normalize_address(address), ' '.join((city or '').casefold().split())
+
+
+class NominatimProvider:
+    """Провайдер геокодування Nominatim (OpenStreetMap); base_url - для власного сервера"""
+
+    name = 'nominatim'
+
+    def __init__(self, base_url: str = NOMINATIM_URL, timeout: float = 10,
+                 session: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.setdefault('User-Agent', 'RealEstateMigration/1.0')
+
+    def geocode(self, address: str, city: str) -> Optional[Coordinates]:
+        """
+        Координати адреси або None, якщо її не знайдено. Помилки мережі та
+        сервера піднімаються: такий результат не можна кешувати
+        """
+        response = self.session.get(f"{self.base_url}/search", params={
+            'q': f"{address}, {city}, Україна",
+            'format': 'json',
+            'limit': 1,
+            'countrycodes': 'ua',
+        }, timeout=self.timeout)
+        response.raise_for_status()
+
+        results = response.json()
+        if not results:
+            return None
+        return {
+            'latitude': float(results[0]['lat']),
+            'longitude': float(results[0]['lon']),
+        }
+
+
+class CachedGeocoder:
+    """
+    Геокодер з кешем у БД перед провайдером. max_workers запитів
+    виконуються одночасно, rate - середня кількість запитів на секунду.
+    gazetteer - офлайн геокодер, який питають першим
+    """
+
+    def __init__(self, db: DatabaseManager, provider=None, rate: float = GEOCODING_RATE,
+                 max_workers: int = GEOCODING_WORKERS, negative_ttl_days: int = NEGATIVE_TTL_DAYS,
+                 gazetteer=None):
+        self.db = db
+        self.provider = provider or NominatimProvider()
+        self.gazetteer = gazetteer
+        self.bucket = TokenBucket(rate=rate, capacity=1)
+        self.max_workers = max_workers
+        self.negative_ttl = timedelta(days=negative_ttl_days)
+
+        self.counters = {
+            'offline': 0,
+            'cache_hits': 0,
+            'lookups': 0,
+            'found': 0,
+            'not_found': 0,
+            'errors': 0,
+        }
+
+    def geocode(self, address: str, city: str) -> Optional[Coordinates]:
+        """Координати однієї адреси"""
+        return self.geocode_many([(address, city)]).get(cache_key(address, city))
+
+    def geocode_many(self, addresses: Iterable[Tuple[str, str]]) -> Dict[CacheKey, Optional[Coordinates]]:
+        """
+        Координати пар (адреса, місто) за ключем cache_key. Однакові ключі
+        шукаються один раз; ключі з помилкою провайдера у результат не
+        потрапляють і будуть повторені наступного разу
+        """
+        queries: Dict[CacheKey, Tuple[str, str]] = {}
+        for address, city in addresses:
+            key = cache_key(address, city)
+            if key[0] and key not in queries:
+                queries[key] = (address, city)
+
+        results: Dict[CacheKey, Optional[Coordinates]] = {}
+        if self.gazetteer is not None:
+            for key, (address, city) in queries.items():
+                coordinates = self.gazetteer.geocode(address, city)
+                if coordinates is not None:
+                    results[key] = coordinates
+            self.counters['offline'] += len(results)
+
+        pending = [key for key in queries if key not in results]
+        cached = self._load_cached(pending) if pending else {}
+        self.counters['cache_hits'] += len(cached)
+        results.update(cached)
+
+        misses = [key for key in pending if key not in results]
+        if misses:
+            looked_up = self._lookup(misses, queries)
+            self._store(looked_up, queries)
+            results.update(looked_up)
+        return results
+
+    def _load_cached(self, keys: List[CacheKey]) -> Dict[CacheKey, Optional[Coordinates]]:
+        """Збережені результати; не знайдені адреси - лише молодші за negative_ttl"""
+        cached: Dict[CacheKey, Optional[Coordinates]] = {}
+        retry_before = datetime.utcnow() - self.negative_ttl
+
+        with self.db.get_session() as session:
+            for start in range(0, len(keys), CACHE_LOOKUP_CHUNK):
+                chunk = keys[start:start + CACHE_LOOKUP_CHUNK]
+                rows = session.query(
+                    GeocodeCache.address_key, GeocodeCache.city_key, GeocodeCache.latitude,
+                    GeocodeCache.longitude, GeocodeCache.updated_at,
+                ).filter(GeocodeCache.address_key.in_({address for address, _ in chunk})).all()
+
+                wanted = set(chunk)
+                for row in rows:
+                    key = (row.address_key, row.city_key)
+                    if key not in wanted:
+                        continue
+                    if row.latitude is not None:
+                        cached[key] = {'latitude': row.latitude, 'longitude': row.longitude}
+                    elif row.updated_at and row.updated_at > retry_before:
+                        cached[key] = None
+        return cached
+
+    def _lookup(self, keys: List[CacheKey],
+                queries: Dict[CacheKey, Tuple[str, str]]) -> Dict[CacheKey, Optional[Coordinates]]:
+        """Запити до провайдера для промахів кешу"""
+        def lookup(key):
+            address, city = queries[key]
+            self.bucket.acquire()
+            try:
+                return key, self.provider.geocode(address, city), None
+            except Exception as e:
+                return key, None, e
+
+        results: Dict[CacheKey, Optional[Coordinates]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for key, coordinates, error in executor.map(lookup, keys):
+                self.counters['lookups'] += 1
+                if error is not None:
+                    self.counters['errors'] += 1
+                    logger.error(f"Помилка геокодування адреси '{queries[key][0]}': {error}")
+                    continue
+                results[key] = coordinates
+                self.counters['found' if coordinates else 'not_found'] += 1
+        return results
+
+    def _store(self, results: Dict[CacheKey, Optional[Coordinates]],
+               queries: Dict[CacheKey, Tuple[str, str]]):
+        """Записує результати провайдера в кеш (повторний запис оновлює рядок)"""
+        if not results:
+            return
+
+        now = datetime.utcnow()
+        with self.db.get_session() as session:
+            existing = {
+                (row.address_key, row.city_key)
+                for row in session.query(GeocodeCache.address_key, GeocodeCache.city_key).filter(
+                    GeocodeCache.address_key.in_({address for address, _ in results})
+                )
+            }
+            new_rows = []
+            for key, coordinates in results.items():
+                values = {
+                    'query': queries[key][0],
+                    'latitude': coordinates['latitude'] if coordinates else None,
+                    'longitude': coordinates['longitude'] if coordinates else None,
+                    'provider': self.provider.name,
+                    'updated_at': now,
+                }
+                if key in existing:
+                    session.execute(
+                        update(GeocodeCache)
+                        .where(GeocodeCache.address_key == key[0], GeocodeCache.city_key == key[1])
+                        .values(**values)
+                    )
+                else:
+                    new_rows.append({**values, 'address_key': key[0], 'city_key': key[1], 'created_at': now})
+            if new_rows:
+                session.execute(GeocodeCache.__table__.insert(), new_rows)
@@ -0,0 +1,217 @@
+"""
+Пакетне збереження зібраних оголошень у базу даних
+Спільний етап для DataCollector та AutoScrapingManager: існуючі оголошення
+блоку завантажуються одним запитом, а запис іде через нативний
+INSERT ... ON CONFLICT (PostgreSQL, SQLite) порціями по chunk_size.
+Оголошення без координат геокодуються офлайн газетиром, якщо він заданий,
+а оголошення з координатами без району отримують district_id (DistrictResolver)
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import update
+
+from database import DatabaseManager
+from models import PropertyListing, City, normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Колонки таблиці, які можна заповнити з даних парсера
+LISTING_COLUMNS = {column.name for column in PropertyListing.__table__.columns}
+
+# Колонки, які керуються етапом збереження, а не парсером
+MANAGED_COLUMNS = {'id', 'created_at', 'updated_at', 'last_seen_at'}
+
+# Обов'язкові поля для створення нового оголошення
+REQUIRED_FOR_INSERT = ('title', 'city_id', 'price_uah', 'area_total', 'rooms', 'url')
+
+
+class ListingIngestor:
+    """Зберігає оголошення пачками з підрахунком вставлених/оновлених/незмінних"""
+
+    def __init__(self, db: DatabaseManager, chunk_size: int = 500, gazetteer=None, district_resolver=None):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.gazetteer = gazetteer
+        self.district_resolver = district_resolver
+
+    def ingest(self, source_data: Dict[str, List[Dict]], source: str) -> Dict[str, int]:
+        """
+        Зберігає оголошення одного джерела (місто -> список оголошень).
+        Повертає лічильники inserted, updated, unchanged, skipped
+        """
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+
+        with self.db.get_session() as session:
+            city_ids = self._load_city_ids(session, list(source_data))
+
+            for city_name, listings in source_data.items():
+                logger.info(f"Зберігаю {len(listings)} оголошень для {city_name}")
+
+                rows = self._prepare_rows(listings, source, city_ids.get(city_name), counts)
+                if self.gazetteer is not None:
+                    self._fill_coordinates(rows, city_name)
+                if self.district_resolver is not None:
+                    self.district_resolver.assign(rows)
+                for start in range(0, len(rows), self.chunk_size):
+                    self._ingest_chunk(session, rows[start:start + self.chunk_size], counts)
+
+        logger.info(
+            f"Збережено {source}: нових {counts['inserted']}, оновлених {counts['updated']}, "
+            f"без змін {counts['unchanged']}, пропущено {counts['skipped']}"
+        )
+        return counts
+
+    @staticmethod
+    def _load_city_ids(session, city_names: List[str]) -> Dict[str, str]:
+        """
+        Ідентифікатори міст за назвами парсера одним запитом (за нормалізованою
+        назвою, як і в решті системи: регістр, пробіли та апостроф не важливі)
+        """
+        keys = {name: normalize_name(name) for name in city_names}
+        if not keys:
+            return {}
+        ids = dict(session.query(City.name_normalized, City.id).filter(
+            City.name_normalized.in_(set(keys.values()))
+        ).all())
+        return {name: ids[key] for name, key in keys.items() if key in ids}
+
+    @staticmethod
+    def _prepare_rows(listings: List[Dict], source: str, city_id: Optional[str],
+                      counts: Dict[str, int]) -> List[Dict[str, Any]]:
+        """
+        Залишає лише колонки таблиці та дедуплікує за external_id
+        (в межах пачки перемагає останнє оголошення)
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for listing_data in listings:
+            external_id = listing_data.get('external_id')
+            if not external_id:
+                counts['skipped'] += 1
+                continue
+
+            row = {key: value for key, value in listing_data.items()
+                   if key in LISTING_COLUMNS and key not in MANAGED_COLUMNS}
+            row['source'] = source
+            if city_id and not row.get('city_id'):
+                row['city_id'] = city_id
+            rows[external_id] = row
+
+        return list(rows.values())
+
+    def _fill_coordinates(self, rows: List[Dict[str, Any]], city_name: str):
+        """Координати з газетира для оголошень, де парсер їх не знайшов"""
+        for row in rows:
+            if row.get('latitude') is not None and row.get('longitude') is not None:
+                continue
+            for address in (row.get('full_address'), row.get('address')):
+                coordinates = self.gazetteer.geocode(address, city_name) if address else None
+                if coordinates:
+                    row.update(coordinates)
+                    break
+
+    def _ingest_chunk(self, session, rows: List[Dict[str, Any]], counts: Dict[str, int]):
+        """Зберігає одну порцію оголошень"""
+        now = datetime.utcnow()
+        columns = sorted(LISTING_COLUMNS - MANAGED_COLUMNS)
+
+        # Існуючі оголошення порції - одним запитом
+        existing = {
+            record.external_id: record
+            for record in session.query(*[getattr(PropertyListing, c) for c in columns]).filter(
+                PropertyListing.external_id.in_([row['external_id'] for row in rows])
+            )
+        }
+
+        changed, unchanged = [], []
+        for row in rows:
+            current = existing.get(row['external_id'])
+            if current is None:
+                if all(row.get(field) is not None for field in REQUIRED_FOR_INSERT):
+                    changed.append(row)
+                else:
+                    counts['skipped'] += 1
+            elif all(getattr(current, key) == value for key, value in row.items()):
+                unchanged.append(row['external_id'])
+            else:
+                changed.append(row)
+
+        # Незмінні оголошення лише позначаємо як побачені; updated_at не чіпаємо,
+        # щоб він відображав реальні зміни
+        if unchanged:
+            session.execute(
+                update(PropertyListing)
+                .where(PropertyListing.external_id.in_(unchanged))
+                .values(last_seen_at=now, updated_at=PropertyListing.updated_at)
+            )
+            counts['unchanged'] += len(unchanged)
+
+        # Оголошення з різними наборами полів пишемо окремими upsert, щоб
+        # оновлення не затирало поля, яких парсер не надав
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in changed:
+            groups.setdefault((tuple(sorted(row)), row['external_id'] in existing), []).append(row)
+
+        for (keys, _), group in groups.items():
+            self._upsert(session, keys, group, existing, now)
+
+        for row in changed:
+            counts['updated' if row['external_id'] in existing else 'inserted'] += 1
+
+    def _upsert(self, session, keys: tuple, rows: List[Dict[str, Any]], existing: Dict[str, Any],
+                now: datetime):
+        """INSERT ... ON CONFLICT (external_id) DO UPDATE для групи з однаковими полями"""
+        insert = self._dialect_insert()
+        if insert is None:
+            self._upsert_generic(session, rows, existing, now)
+            return
+
+        # Для існуючих рядків вставна частина доповнюється поточними значеннями,
+        # щоб NOT NULL обмеження не спрацювали до розв'язання конфлікту
+        values = [
+            {**(existing[row['external_id']]._asdict() if row['external_id'] in existing else {}),
+             **row, 'id': f"{row['source']}_{row['external_id']}",
+             'created_at': now, 'updated_at': now, 'last_seen_at': now}
+            for row in rows
+        ]
+
+        statement = insert(PropertyListing.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['external_id'],
+            set_={
+                **{key: statement.excluded[key] for key in keys if key != 'external_id'},
+                'updated_at': now,
+                'last_seen_at': now,
+            }
+        )
+        session.execute(statement, values)
+
+    def _dialect_insert(self):
+        """Конструктор INSERT з підтримкою ON CONFLICT для поточної СУБД"""
+        dialect = self.db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            return insert
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            return insert
+        return None
+
+    @staticmethod
+    def _upsert_generic(session, rows: List[Dict[str, Any]], existing: Dict[str, Any], now: datetime):
+        """Запасний шлях для СУБД без ON CONFLICT: окремі UPDATE та пакетний INSERT"""
+        new_rows = []
+        for row in rows:
+            if row['external_id'] in existing:
+                session.execute(
+                    update(PropertyListing)
+                    .where(PropertyListing.external_id == row['external_id'])
+                    .values(**row, updated_at=now, last_seen_at=now)
+                )
+            else:
+                new_rows.append({**row, 'id': f"{row['source']}_{row['external_id']}",
+                                 'created_at': now, 'updated_at': now, 'last_seen_at': now})
+        if new_rows:
+            session.execute(PropertyListing.__table__.insert(), new_rows)
@@ -0,0 +1,18 @@
+"""
+Нормалізація назв міст і районів для точного пошуку
+Без залежностей: використовується і моделями БД (колонки name_normalized),
+і реєстром location_types бекенду
+"""
+
+import re
+from typing import Optional
+
+# Різні символи апострофа в назвах (Основ'янський, Основ’янський)
+_APOSTROPHES_RE = re.compile("[’ʼ`´‘]")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Назва міста/району для точного пошуку: без регістру, зайвих пробілів, з одним видом апострофа"""
+    if not name:
+        return ''
+    return ' '.join(_APOSTROPHES_RE.sub("'", name).casefold().split())
@@ -22,6 +22,10 @@ from scrapers.realt_scraper import RealtScraper
 from scrapers.address_scraper import AddressScraper
 from models import PropertyListing, City, District, MarketStats
 from database import DatabaseManager
+from ingestion import ListingIngestor
+from gazetteer import load_gazetteer
+from district_assignment import make_district_resolver
+from config import Config
 
 # Налаштування логування
 logging.basicConfig(
@@ -39,6 +43,9 @@ class DataCollector:
 
     def __init__(self, db_url: str = None):
         self.db = DatabaseManager(db_url or os.getenv('DATABASE_URL', 'sqlite:///real_estate.db'))
+        self.ingestor = ListingIngestor(self.db, chunk_size=Config.INGEST_CHUNK_SIZE,
+                                        gazetteer=load_gazetteer(Config.GAZETTEER_PATH),
+                                        district_resolver=make_district_resolver(self.db, Config.DISTRICT_POLYGONS_PATH))
 
         # Ініціалізуємо парсери
         self.scrapers = {
@@ -82,35 +89,9 @@ class DataCollector:
 
         return all_data
 
-    def _save_listings_to_db(self, source_data: Dict[str, List[Dict]], source: str):
+    def _save_listings_to_db(self, source_data: Dict[str, List[Dict]], source: str) -> Dict[str, int]:
         """Зберігає оголошення в базу даних"""
-        with self.db.get_session() as session:
-            for city_name, listings in source_data.items():
-                logger.info(f"Зберігаю {len(listings)} оголошень для {city_name}")
-
-                for listing_data in listings:
-                    try:
-                        # Створюємо або оновлюємо оголошення
-                        listing = session.query(PropertyListing).filter_by(
-                            external_id=listing_data['external_id'],
-                            source=source
-                        ).first()
-
-                        if listing:
-                            # Оновлюємо існуюче оголошення
-                            for key, value in listing_data.items():
-                                if hasattr(listing, key):
-                                    setattr(listing, key, value)
-                            listing.last_seen_at = datetime.utcnow()
-                        else:
-                            # Створюємо нове оголошення
-                            listing = PropertyListing(**listing_data)
-                            session.add(listing)
-
-                    except Exception as e:
-                        logger.error(f"Помилка при збереженні оголошення {listing_data.get('external_id')}: {e}")
-
-            session.commit()
+        return self.ingestor.ingest(source_data, source)
 
     def get_latest_data(self, city: str = None, limit: int = 100) -> List[Dict]:
         """Отримує останні оголошення з бази даних"""
@@ -6,110 +6,117 @@
 import os
 import sys
 import logging
-from typing import Dict, List, Optional
-import time
+from typing import Dict, List, Optional, Tuple
 
 # Додаємо кореневу папку до шляху
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models import PropertyListing, City
+from sqlalchemy import func, tuple_, update
+
+from models import PropertyListing, City, GeocodeCache
 from database import DatabaseManager
-import requests
-
-# Налаштування логування
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('geocoding_migration.log'),
-        logging.StreamHandler()
-    ]
-)
+from geocoding import GEOCODING_RATE, GEOCODING_WORKERS, CachedGeocoder, cache_key
+from gazetteer import load_gazetteer
+
 logger = logging.getLogger(__name__)
 
 class GeocodingMigrator:
     """Мігратор для геокодування адрес"""
 
-    def __init__(self, db_url: str = None):
+    def __init__(self, db_url: str = None, provider=None, rate: float = GEOCODING_RATE,
+                 max_workers: int = GEOCODING_WORKERS, gazetteer=None):
         self.db = DatabaseManager(db_url or os.getenv('DATABASE_URL', 'sqlite:///real_estate.db'))
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'RealEstateMigration/1.0',
-        })
+        # Таблиця кешу могла з'явитися після створення бази
+        GeocodeCache.__table__.create(self.db.engine, checkfirst=True)
+        # Офлайн газетир (GAZETTEER_PATH), HTTP геокодер - лише для решти адрес
+        self.geocoder = CachedGeocoder(
+            self.db, provider=provider, rate=rate, max_workers=max_workers,
+            gazetteer=gazetteer or load_gazetteer(os.getenv('GAZETTEER_PATH')),
+        )
 
     def geocode_address(self, address: str, city: str = 'Харків') -> Optional[Dict[str, float]]:
-        """Геокодує адресу використовуючи Nominatim"""
-        try:
-            query = f"{address}, {city}, Україна"
-            url = "https://nominatim.openstreetmap.org/search"
-
-            response = self.session.get(url, params={
-                'q': query,
-                'format': 'json',
-                'limit': 1,
-                'countrycodes': 'ua',
-            }, timeout=10)
-
-            if response.status_code == 200 and response.json():
-                result = response.json()[0]
-                return {
-                    'latitude': float(result['lat']),
-                    'longitude': float(result['lon'])
-                }
-
-            return None
-
-        except Exception as e:
-            logger.error(f"Помилка геокодування адреси '{address}': {e}")
-            return None
-
-    def migrate_existing_data(self):
-        """Міграція існуючих даних"""
+        """Геокодує адресу (спершу шукає в кеші)"""
+        return self.geocoder.geocode(address, city)
+
+    def migrate_existing_data(self, batch_size: int = 200) -> Dict[str, int]:
+        """
+        Міграція існуючих даних. Унікальні пари (адреса, місто) оголошень
+        без координат читаються порціями по batch_size, кожна порція
+        геокодується разом і фіксується окремою транзакцією - перервану
+        міграцію можна просто запустити знову
+        """
         logger.info("Починаю міграцію геоданих...")
 
         with self.db.get_session() as session:
-            # Отримуємо всі оголошення без координат
-            listings_without_coords = session.query(PropertyListing).filter(
+            city_names = dict(session.query(City.id, City.name))
+
+        counts = {'addresses': 0, 'geocoded': 0, 'listings': 0}
+        after: Optional[Tuple[str, str]] = None
+
+        while True:
+            pairs = self._next_addresses(after, batch_size)
+            if not pairs:
+                break
+            after = pairs[-1]
+
+            results = self.geocoder.geocode_many(
+                (address, city_names.get(city_id, 'Харків')) for city_id, address in pairs
+            )
+            updated = self._apply_coordinates(pairs, results, city_names)
+
+            counts['addresses'] += len(pairs)
+            counts['geocoded'] += sum(
+                1 for city_id, address in pairs
+                if results.get(cache_key(address, city_names.get(city_id, 'Харків')))
+            )
+            counts['listings'] += updated
+            logger.info(
+                f"Оброблено {counts['addresses']} адрес, геокодовано {counts['geocoded']}, "
+                f"оновлено {counts['listings']} оголошень"
+            )
+
+        logger.info(f"Міграцію завершено. Оновлено {counts['listings']} записів, {self.geocoder.counters}")
+        return counts
+
+    def _next_addresses(self, after: Optional[Tuple[str, str]], limit: int) -> List[Tuple[str, str]]:
+        """Наступна порція унікальних пар (city_id, адреса) без координат"""
+        with self.db.get_session() as session:
+            query = session.query(PropertyListing.city_id, PropertyListing.address).filter(
                 PropertyListing.latitude.is_(None),
                 PropertyListing.longitude.is_(None),
                 PropertyListing.address.isnot(None)
-            ).all()
-
-            logger.info(f"Знайдено {len(listings_without_coords)} оголошень без координат")
-
-            updated_count = 0
-
-            for listing in listings_without_coords:
-                try:
-                    # Отримуємо місто
-                    city = session.query(City).filter_by(id=listing.city_id).first()
-                    city_name = city.name if city else 'Харків'
-
-                    # Спробуємо геокодувати адресу
-                    coordinates = self.geocode_address(listing.address, city_name)
-
-                    if coordinates:
-                        listing.latitude = coordinates['latitude']
-                        listing.longitude = coordinates['longitude']
-
+            ).distinct()
+            if after is not None:
+                query = query.filter(tuple_(PropertyListing.city_id, PropertyListing.address) > after)
+            rows = query.order_by(PropertyListing.city_id, PropertyListing.address).limit(limit).all()
+        return [(row.city_id, row.address) for row in rows]
+
+    def _apply_coordinates(self, pairs: List[Tuple[str, str]], results: Dict, city_names: Dict[str, str]) -> int:
+        """Записує координати порції одним UPDATE на адресу; повертає кількість оголошень"""
+        updated = 0
+        with self.db.get_session() as session:
+            for city_id, address in pairs:
+                coordinates = results.get(cache_key(address, city_names.get(city_id, 'Харків')))
+                if not coordinates:
+                    continue
+                result = session.execute(
+                    update(PropertyListing)
+                    .where(
+                        PropertyListing.city_id == city_id,
+                        PropertyListing.address == address,
+                        PropertyListing.latitude.is_(None),
+                        PropertyListing.longitude.is_(None),
+                    )
+                    .values(
+                        latitude=coordinates['latitude'],
+                        longitude=coordinates['longitude'],
                         # Оновлюємо також full_address якщо його немає
-                        if not listing.full_address:
-                            listing.full_address = listing.address
-
-                        updated_count += 1
-                        logger.info(f"Геокодовано: {listing.address} -> {coordinates}")
-
-                        # Пауза між запитами для уникнення блокування
-                        time.sleep(1)
-                    else:
-                        logger.warning(f"Не вдалося геокодувати: {listing.address}")
-
-                except Exception as e:
-                    logger.error(f"Помилка обробки оголошення {listing.id}: {e}")
-
-            # Зберігаємо зміни
-            session.commit()
-            logger.info(f"Міграцію завершено. Оновлено {updated_count} записів")
+                        full_address=func.coalesce(PropertyListing.full_address, PropertyListing.address),
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                updated += result.rowcount
+        return updated
 
     def cleanup_invalid_coordinates(self):
         """Очищає недійсні координати"""
@@ -149,6 +156,16 @@ class GeocodingMigrator:
 
 def main():
     """Основна функція"""
+    # Налаштування логування
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('geocoding_migration.log'),
+            logging.StreamHandler()
+        ]
+    )
+
     migrator = GeocodingMigrator()
 
     try:
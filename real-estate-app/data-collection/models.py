@@ -1,9 +1,11 @@
 from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 import json
 
+from location_names import normalize_name
+
 Base = declarative_base()
 
 class City(Base):
@@ -12,6 +14,7 @@ class City(Base):
 
     id = Column(String, primary_key=True)  # КОАТУУ код
     name = Column(String(100), nullable=False, index=True)
+    name_normalized = Column(String(100), index=True)  # normalize_name(name)
     region = Column(String(100), nullable=False)
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
@@ -24,6 +27,11 @@ class City(Base):
     # Зв'язок з районами
     districts = relationship("District", back_populates="city")
 
+    @validates('name')
+    def _normalize_name(self, key, name):
+        self.name_normalized = normalize_name(name)
+        return name
+
     def __repr__(self):
         return f"<City(id='{self.id}', name='{self.name}')>"
 
@@ -34,6 +42,7 @@ class District(Base):
     id = Column(String, primary_key=True)  # КОАТУУ код
     city_id = Column(String, ForeignKey('cities.id'), nullable=False)
     name = Column(String(100), nullable=False, index=True)
+    name_normalized = Column(String(100))  # normalize_name(name)
     type = Column(String(20), nullable=False)  # 'district', 'microdistrict', 'neighborhood'
     latitude = Column(Float)
     longitude = Column(Float)
@@ -47,9 +56,16 @@ class District(Base):
     # Індекси для швидкого пошуку
     __table_args__ = (
         Index('idx_districts_city_name', 'city_id', 'name'),
+        Index('idx_districts_city_name_normalized', 'city_id', 'name_normalized'),
+        Index('idx_districts_name_normalized', 'name_normalized'),
         Index('idx_districts_coordinates', 'latitude', 'longitude'),
     )
 
+    @validates('name')
+    def _normalize_name(self, key, name):
+        self.name_normalized = normalize_name(name)
+        return name
+
     def __repr__(self):
         return f"<District(id='{self.id}', name='{self.name}', city='{self.city.name}')>"
 
@@ -125,6 +141,8 @@ class PropertyListing(Base):
         Index('idx_listings_developer', 'developer'),
         Index('idx_listings_condition', 'condition'),
         Index('idx_listings_price_per_sqm', 'price_per_sqm'),
+        Index('idx_listings_updated_at', 'updated_at'),
+        Index('idx_listings_last_seen_at', 'last_seen_at'),
     )
 
     def __repr__(self):
@@ -242,3 +260,28 @@ class MarketStats(Base):
     def __repr__(self):
         return f"<MarketStats(city='{self.city.name}', date='{self.date.date()}', avg_price={self.average_price_per_sqm})>"
 
+
+class GeocodeCache(Base):
+    """Кеш результатів геокодування за нормалізованою адресою та містом"""
+    __tablename__ = "geocode_cache"
+
+    id = Column(Integer, primary_key=True)
+    address_key = Column(String(500), nullable=False)  # normalize_address
+    city_key = Column(String(100), nullable=False)
+    query = Column(String(500))  # адреса, за якою виконано запит
+
+    # NULL - провайдер адресу не знайшов (негативний кеш)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    provider = Column(String(50))
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Індекси
+    __table_args__ = (
+        Index('idx_geocode_cache_key', 'address_key', 'city_key', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<GeocodeCache(address='{self.address_key}', city='{self.city_key}', lat={self.latitude}, lng={self.longitude})>"
@@ -9,6 +9,9 @@ import logging
 from typing import List, Dict, Optional, Tuple
 import asyncio
 import aiohttp
+from concurrent.futures import ThreadPoolExecutor
+
+from scrapers.politeness import DomainThrottle
 
 # Налаштування логування
 logging.basicConfig(level=logging.INFO)
@@ -17,11 +20,17 @@ logger = logging.getLogger(__name__)
 class OLXScraper:
     """Парсер оголошень нерухомості з OLX.ua"""
 
-    def __init__(self):
+    def __init__(self, detail_workers: int = 4, max_requests_per_domain: int = 2,
+                 min_request_interval: float = 0.5):
         self.base_url = "https://www.olx.ua"
         self.ua = UserAgent()
         self.session = requests.Session()
 
+        # Детальні сторінки завантажуються паралельно (detail_workers=1 - послідовно),
+        # але не більше max_requests_per_domain одночасно на домен
+        self.detail_workers = detail_workers
+        self.throttle = DomainThrottle(max_requests_per_domain, min_request_interval)
+
         # Заголовки для обходу блокувань
         self.session.headers.update({
             'User-Agent': self.ua.random,
@@ -83,7 +92,16 @@ class OLXScraper:
         return city_codes.get(city_name.lower())
 
     def parse_listing(self, listing_html) -> Optional[Dict]:
-        """Парсить одне оголошення"""
+        """Парсить одне оголошення (з завантаженням детальної сторінки)"""
+        card = self._parse_card(listing_html)
+        if not card:
+            return None
+
+        detail_page = self._fetch_detail_page(card['url']) if card['url'] else None
+        return self._complete_listing(card, detail_page)
+
+    def _parse_card(self, listing_html) -> Optional[Dict]:
+        """Парсить картку оголошення зі сторінки пошуку"""
         try:
             # ID оголошення
             data_id = listing_html.get('data-id')
@@ -122,26 +140,35 @@ class OLXScraper:
             img_elem = listing_html.find('img')
             images = [img_elem['src']] if img_elem and img_elem.get('src') else []
 
-            # Опис (з детальної сторінки)
-            description = self._get_description(url) if url else ''
-
-            # Парсимо деталі з заголовка та опису
-            details = self._parse_details(title + ' ' + description + ' ' + location)
-
-            # Спробуємо витягти координати з карти (якщо є)
-            coordinates = self._extract_coordinates(url)
-
             return {
                 'external_id': data_id,
                 'source': 'olx',
                 'title': title,
-                'description': description,
                 'price_uah': price_uah,
                 'url': url,
                 'location': location,
                 'address': address,  # Детальніша адреса
                 'date_text': date_text,
                 'images': json.dumps(images),
+            }
+
+        except Exception as e:
+            logger.error(f"Помилка парсингу оголошення: {e}")
+            return None
+
+    def _complete_listing(self, card: Dict, detail_page: Optional[BeautifulSoup]) -> Optional[Dict]:
+        """Доповнює картку описом, деталями та координатами з детальної сторінки"""
+        try:
+            # Опис та координати - з однієї завантаженої сторінки
+            description = self._parse_description(detail_page) if detail_page else ''
+            coordinates = self._parse_coordinates(detail_page) if detail_page else None
+
+            # Парсимо деталі з заголовка та опису
+            details = self._parse_details(card['title'] + ' ' + description + ' ' + card['location'])
+
+            return {
+                **card,
+                'description': description,
                 'latitude': coordinates.get('latitude') if coordinates else None,
                 'longitude': coordinates.get('longitude') if coordinates else None,
                 **details
@@ -179,15 +206,36 @@ class OLXScraper:
             logger.warning(f"Не вдалося витягти адресу: {e}")
             return ''
 
-    def _extract_coordinates(self, url: str) -> Optional[Dict[str, float]]:
-        """Спробуємо витягти координати з карти на сторінці оголошення"""
+    def _fetch_detail_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Завантажує та розбирає детальну сторінку оголошення (один запит)"""
         try:
-            response = self.session.get(url, timeout=10)
+            with self.throttle.request(url):
+                response = self.session.get(url, timeout=10)
             if response.status_code != 200:
                 return None
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            return BeautifulSoup(response.text, 'html.parser')
+
+        except Exception as e:
+            logger.warning(f"Не вдалося завантажити сторінку {url}: {e}")
+            return None
+
+    def _fetch_detail_pages(self, urls: List[str]) -> List[Optional[BeautifulSoup]]:
+        """Завантажує детальні сторінки паралельно, зберігаючи порядок"""
+        if self.detail_workers <= 1 or len(urls) <= 1:
+            return [self._fetch_detail_page(url) if url else None for url in urls]
+
+        with ThreadPoolExecutor(max_workers=self.detail_workers) as executor:
+            return list(executor.map(lambda url: self._fetch_detail_page(url) if url else None, urls))
 
+    def _extract_coordinates(self, url: str) -> Optional[Dict[str, float]]:
+        """Спробуємо витягти координати з карти на сторінці оголошення"""
+        page = self._fetch_detail_page(url)
+        return self._parse_coordinates(page) if page else None
+
+    def _parse_coordinates(self, soup: BeautifulSoup) -> Optional[Dict[str, float]]:
+        """Витягує координати з розібраної детальної сторінки"""
+        try:
             # Шукаємо карту або координати в мета-тегах
             map_script = soup.find('script', string=re.compile('latitude|longitude|lat|lng'))
             if map_script:
@@ -216,33 +264,27 @@ class OLXScraper:
             return None
 
         except Exception as e:
-            logger.warning(f"Не вдалося витягти координати для {url}: {e}")
+            logger.warning(f"Не вдалося витягти координати: {e}")
             return None
 
     def _get_description(self, url: str) -> str:
         """Отримує опис з детальної сторінки оголошення"""
-        try:
-            response = self.session.get(url, timeout=10)
-            if response.status_code != 200:
-                return ''
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Шукаємо опис
-            desc_elem = soup.find('div', class_='css-g5mtbi')
-            if desc_elem:
-                return desc_elem.get_text(strip=True)
+        page = self._fetch_detail_page(url)
+        return self._parse_description(page) if page else ''
 
-            # Альтернативний селектор
-            desc_elem = soup.find('div', class_='css-1t507yq')
-            if desc_elem:
-                return desc_elem.get_text(strip=True)
+    def _parse_description(self, soup: BeautifulSoup) -> str:
+        """Витягує опис з розібраної детальної сторінки"""
+        # Шукаємо опис
+        desc_elem = soup.find('div', class_='css-g5mtbi')
+        if desc_elem:
+            return desc_elem.get_text(strip=True)
 
-            return ''
+        # Альтернативний селектор
+        desc_elem = soup.find('div', class_='css-1t507yq')
+        if desc_elem:
+            return desc_elem.get_text(strip=True)
 
-        except Exception as e:
-            logger.warning(f"Не вдалося отримати опис для {url}: {e}")
-            return ''
+        return ''
 
     def _parse_details(self, text: str) -> Dict:
         """Парсить деталі квартири з тексту"""
@@ -375,8 +417,12 @@ class OLXScraper:
                     logger.info(f"На сторінці {page} не знайдено оголошень")
                     break
 
-                for listing in listings:
-                    listing_data = self.parse_listing(listing)
+                # Картки парсимо одразу, детальні сторінки завантажуємо паралельно
+                cards = [card for card in (self._parse_card(listing) for listing in listings) if card]
+                detail_pages = self._fetch_detail_pages([card['url'] for card in cards])
+
+                for card, detail_page in zip(cards, detail_pages):
+                    listing_data = self._complete_listing(card, detail_page)
                     if listing_data:
                         all_listings.append(listing_data)
 
@@ -411,11 +457,34 @@ class OLXScraper:
 
 # Асинхронна версія для кращої продуктивності
 class AsyncOLXScraper:
-    """Асинхронний парсер OLX"""
+    """
+    Асинхронний парсер OLX: етапи для AsyncScrapingPipeline.
+    Розбір HTML повторно використовує методи синхронного OLXScraper,
+    мережа - спільна aiohttp сесія пайплайна
+    """
 
-    def __init__(self):
-        self.base_url = "https://www.olx.ua"
+    source = 'olx'
+
+    def __init__(self, base_url: str = "https://www.olx.ua"):
+        self.base_url = base_url
         self.ua = UserAgent()
+        self.parser = OLXScraper(detail_workers=1)
+        self.parser.base_url = base_url
+
+    def get_search_url(self, city: str, page: int = 1) -> str:
+        """URL сторінки пошуку"""
+        return self.parser.get_search_url(city, page)
+
+    def parse_search_page(self, html: str) -> List[Dict]:
+        """Картки оголошень зі сторінки пошуку"""
+        soup = BeautifulSoup(html, 'html.parser')
+        listings = soup.find_all('div', {'data-testid': 'listing-ad'})
+        return [card for card in (self.parser._parse_card(listing) for listing in listings) if card]
+
+    def parse_detail_page(self, card: Dict, html: Optional[str]) -> Optional[Dict]:
+        """Повний запис оголошення з картки та детальної сторінки"""
+        detail_page = BeautifulSoup(html, 'html.parser') if html else None
+        return self.parser._complete_listing(card, detail_page)
 
     async def scrape_listing_async(self, session: aiohttp.ClientSession, listing_html: str) -> Optional[Dict]:
         """Асинхронний парсинг одного оголошення"""
@@ -0,0 +1,103 @@
+"""
+Обмеження навантаження на сайти-джерела
+Для кожного домену обмежує кількість одночасних запитів та мінімальний
+інтервал між їх початком, щоб паралельне завантаження не перетворювалось
+на сплеск запитів до одного сайту
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class DomainThrottle:
+    """Потокобезпечний обмежувач запитів по доменах"""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.5):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+
+        self._lock = threading.Lock()
+        self._semaphores: Dict[str, threading.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def request(self, url: str):
+        """Контекст одного запиту до домену url"""
+        domain = urlparse(url).netloc
+
+        with self._lock:
+            semaphore = self._semaphores.setdefault(domain, threading.Semaphore(self.max_concurrent))
+
+        with semaphore:
+            # Резервуємо слот часу під локом, чекаємо вже без нього
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(domain, now))
+                self._next_start[domain] = start + self.min_interval
+
+            delay = start - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+            yield
+
+
+class TokenBucket:
+    """
+    Потокобезпечне відро токенів: в середньому rate запитів на секунду,
+    до capacity поспіль після простою. Потоки резервують час свого токена
+    під локом і чекають вже без нього
+    """
+
+    def __init__(self, rate: float = 1.0, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._lock = threading.Lock()
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def acquire(self):
+        """Чекає на наступний токен"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Баланс може бути від'ємним: це черга вже зарезервованих токенів
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AsyncDomainThrottle:
+    """Обмежувач запитів по доменах для asyncio (один event loop)"""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.5):
+        self.max_concurrent = max_concurrent
+        self.min_interval = min_interval
+
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @asynccontextmanager
+    async def request(self, url: str):
+        """Контекст одного запиту до домену url"""
+        domain = urlparse(url).netloc
+        semaphore = self._semaphores.setdefault(domain, asyncio.Semaphore(self.max_concurrent))
+
+        async with semaphore:
+            # В межах одного loop резервування слоту атомарне (без await)
+            now = time.monotonic()
+            start = max(now, self._next_start.get(domain, now))
+            self._next_start[domain] = start + self.min_interval
+
+            if start > now:
+                await asyncio.sleep(start - now)
+
+            yield
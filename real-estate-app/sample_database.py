@@ -0,0 +1,36 @@
+"""
+Тестова база для тестів верхнього рівня: Харків з районами з location_types
+(як при запуску системи), Київ без районів та задані оголошення
+"""
+
+import os
+import sys
+from typing import Dict, Iterable
+
+# Додаємо папки збору даних та бекенду (location_types) до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from database import DatabaseManager
+from location_types.location import KHARKIV_CITY
+from models import City, PropertyListing
+
+CITY_ID = KHARKIV_CITY.id
+
+
+def make_database(listings: Iterable[Dict] = ()) -> DatabaseManager:
+    """Створює базу в пам'яті; оголошенням без id/url підставляються значення за номером"""
+    db = DatabaseManager('sqlite://')
+    db.create_tables()
+    db.initialize_cities_and_districts()
+
+    with db.get_session() as session:
+        session.add(City(id='kyiv', name='Київ', region='Київська', latitude=50.45, longitude=30.52))
+        session.flush()
+        for i, values in enumerate(listings):
+            session.add(PropertyListing(**{
+                'id': f'listing_{i}', 'external_id': str(i), 'source': 'olx', 'title': 'Квартира',
+                'url': f'https://olx.ua/{i}', **values,
+            }))
+
+    return db
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Тест асинхронного пайплайна парсингу на локальному aiohttp сервері
+"""
+
+import asyncio
+import os
+import sys
+from collections import Counter
+
+# Додаємо папку збору даних до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+
+from aiohttp import web
+
+from async_pipeline import AsyncScrapingPipeline
+from scrapers.olx_scraper import AsyncOLXScraper
+
+PAGES = 2
+PER_PAGE = 6
+
+
+def search_page(page: int) -> str:
+    if page > PAGES:
+        return '<html><body></body></html>'
+    return '<html><body>{}</body></html>'.format(''.join(
+        f'<div data-testid="listing-ad" data-id="{page}{i}">'
+        f'<h6 class="css-16v5mdi">3-кімнатна квартира, 7{i} м²</h6>'
+        f'<p class="css-10b0gli">2 10{i} 000 грн.</p>'
+        f'<a class="css-rc5s2u" href="/d/obyavlenie/{page}{i}.html"></a>'
+        f'<p class="css-veheph">Харків</p>'
+        f'</div>'
+        for i in range(PER_PAGE)
+    ))
+
+
+class FakeOLX:
+    """Локальний сервер зі сторінками пошуку та детальними сторінками"""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.active = 0
+        self.max_active = 0
+
+    async def handle(self, request):
+        self.requests[request.path_qs] += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if request.path.startswith('/d/obyavlenie/'):
+                listing_id = request.path.rsplit('/', 1)[-1].split('.')[0]
+                if listing_id == '13':
+                    return web.Response(status=404)
+                return web.Response(
+                    text=f'<html><body><div class="css-g5mtbi">Опис {listing_id}, панельний будинок</div>'
+                         f'<meta property="og:latitude" content="49.9{listing_id}">'
+                         f'<meta property="og:longitude" content="36.2{listing_id}"></body></html>',
+                    content_type='text/html'
+                )
+            return web.Response(text=search_page(int(request.query.get('page', 1))), content_type='text/html')
+        finally:
+            self.active -= 1
+
+
+async def run_pipeline():
+    fake = FakeOLX()
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    written = []
+    try:
+        pipeline = AsyncScrapingPipeline(
+            AsyncOLXScraper(base_url=f'http://127.0.0.1:{port}'),
+            workers=4, queue_size=2, write_batch_size=5,
+            max_concurrent_requests=2, min_request_interval=0.0
+        )
+        results = await pipeline.run_async(['Харків'], max_pages=5, writer=written.append)
+    finally:
+        await runner.cleanup()
+
+    return fake, pipeline, results, written
+
+
+def test_pipeline_collects_and_writes_in_batches():
+    """Всі оголошення зібрані, детальні сторінки - по одному запиту, пачки <= 5"""
+    fake, pipeline, results, written = asyncio.run(run_pipeline())
+
+    records = results['Харків']
+    assert sorted(r['external_id'] for r in records) == sorted(
+        f'{page}{i}' for page in range(1, PAGES + 1) for i in range(PER_PAGE)
+    )
+    by_id = {r['external_id']: r for r in records}
+    assert by_id['21']['description'].startswith('Опис 21')
+    assert by_id['21']['latitude'] == 49.921
+    assert by_id['21']['building_type'] == 'panel'
+    # Детальна сторінка недоступна - запис лише з даних картки
+    assert by_id['13']['description'] == '' and by_id['13']['latitude'] is None
+
+    detail_requests = [n for path, n in fake.requests.items() if path.startswith('/d/')]
+    assert len(detail_requests) == PAGES * PER_PAGE and set(detail_requests) == {1}
+    assert fake.max_active <= 2
+
+    assert sum(len(batch['Харків']) for batch in written) == len(records)
+    assert all(len(batch['Харків']) <= 5 for batch in written)
+    assert pipeline.stats['search_pages'] == PAGES + 1
+    assert pipeline.stats['failed_requests'] == 1
+
+
+if __name__ == "__main__":
+    print("=== Тест асинхронного пайплайна ===")
+    test_pipeline_collects_and_writes_in_batches()
+    print("✅ Пайплайн зібрав і записав оголошення пачками")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Тест паралельного циклу парсингу: джерела збираються одночасно,
+запис у БД іде через один потік, статистика по джерелах у звіті
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Додаємо папку збору даних до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from auto_scraper import AutoScrapingManager
+from config import Config
+from models import City, PropertyListing
+
+
+class SlowScraper:
+    """Джерело, яке "парсить" 0.3 с і повертає кілька оголошень"""
+
+    def __init__(self, source: str, count: int):
+        self.source = source
+        self.count = count
+
+    def scrape_multiple_cities(self, cities, max_pages_per_city):
+        time.sleep(0.3)
+        return {
+            cities[0]: [
+                {
+                    'external_id': f'{self.source}_{i}', 'title': f'Квартира {i}', 'price_uah': 1_000_000,
+                    'area_total': 50.0, 'rooms': 2, 'url': f'https://{self.source}.example/{i}',
+                }
+                for i in range(self.count)
+            ]
+        }
+
+
+def test_concurrent_cycle_with_single_writer():
+    """Цикл триває як найдовше джерело, а не як їх сума"""
+    overrides = {
+        'LOG_FILE': os.path.join(tempfile.mkdtemp(), 'auto_scraping.log'),
+        'CONCURRENT_SOURCES': True,
+        'CITIES': ['Харків'],
+    }
+    original = {name: getattr(Config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(Config, name, value)
+    try:
+        run_cycle_and_check()
+    finally:
+        for name, value in original.items():
+            setattr(Config, name, value)
+
+
+def run_cycle_and_check():
+    manager = AutoScrapingManager()
+    manager.db.create_tables()
+    with manager.db.get_session() as session:
+        session.add(City(id='kharkiv', name='Харків', region='Харківська', latitude=49.99, longitude=36.23))
+
+    manager.scrapers = {source: SlowScraper(source, 3 + i) for i, source in enumerate(Config.SOURCES)}
+
+    writer_threads = set()
+    ingest = manager.ingestor.ingest
+
+    def recording_ingest(source_data, source):
+        writer_threads.add(threading.current_thread().name)
+        return ingest(source_data, source)
+
+    manager.ingestor.ingest = recording_ingest
+
+    started = time.monotonic()
+    manager.run_full_scraping_cycle()
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 0.3 * len(Config.SOURCES)
+    assert len(writer_threads) == 1 and next(iter(writer_threads)).startswith('db-writer')
+
+    report = manager.get_status_report()
+    assert report['concurrent_sources'] is True
+    assert report['successful_runs'] == 1
+    assert set(report['sources']) == set(Config.SOURCES)
+    for i, source in enumerate(Config.SOURCES):
+        assert report['sources'][source]['listings'] == 3 + i
+        assert report['sources'][source]['wall_time_seconds'] >= 0.3
+        assert report['sources'][source]['listings_per_second'] > 0
+
+    expected = sum(3 + i for i in range(len(Config.SOURCES)))
+    assert report['ingestion']['inserted'] == expected
+    with manager.db.get_session() as session:
+        assert session.query(PropertyListing).count() == expected
+
+    manager.db_writer.shutdown()
+
+
+if __name__ == "__main__":
+    print("=== Тест паралельного циклу парсингу ===")
+    test_concurrent_cycle_with_single_writer()
+    print("✅ Джерела зібрано паралельно з єдиним потоком запису")
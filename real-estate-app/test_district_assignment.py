@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Тест визначення районів за координатами: найближчий центр району серед
+KHARKIV_CITY.districts, межі районів з GeoJSON, призначення при
+збереженні оголошень та заповнення існуючих записів
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# sample_database додає папки збору даних та бекенду (location_types) до шляху
+from sample_database import CITY_ID, make_database
+from analyzers.market_analyzer import MarketAnalyzer
+from district_assignment import DistrictResolver, load_polygons, make_district_resolver
+from ingestion import ListingIngestor
+from location_types.location import KHARKIV_CITY
+from models import PropertyListing
+from test_ingestion import make_listing
+
+
+def brute_force(latitude, longitude, max_distance_km=15.0):
+    """Найближчий центр району звичайним циклом"""
+    best, best_distance = None, max_distance_km
+    scale = np.cos(np.radians(np.mean([d.coordinates['latitude'] for d in KHARKIV_CITY.districts])))
+    for district in KHARKIV_CITY.districts:
+        distance = np.hypot(latitude - district.coordinates['latitude'],
+                            (longitude - district.coordinates['longitude']) * scale) * 111.195
+        if distance < best_distance:
+            best, best_distance = district.id, distance
+    return best
+
+
+def test_nearest_centroid_matches_loop():
+    resolver = DistrictResolver(make_database())
+    for district in KHARKIV_CITY.districts:
+        point = district.coordinates
+        assert resolver.resolve([CITY_ID], [point['latitude']], [point['longitude']])[0] == district.id
+
+    rng = np.random.default_rng(7)
+    latitudes = rng.uniform(49.85, 50.15, 2000)
+    longitudes = rng.uniform(36.0, 36.5, 2000)
+    resolved = resolver.resolve([CITY_ID] * 2000, latitudes, longitudes)
+    assert list(resolved) == [brute_force(lat, lon) for lat, lon in zip(latitudes, longitudes)]
+
+    # Київ, відсутні координати та місто без районів
+    assert list(resolver.resolve([CITY_ID, CITY_ID, 'kyiv'], [50.45, np.nan, 50.0], [30.52, 36.2, 36.2])) == [
+        None, None, None,
+    ]
+
+
+def test_polygons_take_precedence():
+    """Точка всередині меж району отримує його, навіть якщо ближчий центр іншого"""
+    # Квадрат навколо центру Держпрому, віднесений до Шевченківського
+    square = [[36.225, 49.985], [36.245, 49.985], [36.245, 49.995], [36.225, 49.995], [36.225, 49.985]]
+    path = os.path.join(tempfile.mkdtemp(), 'districts.geojson')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'type': 'FeatureCollection', 'features': [{
+            'type': 'Feature',
+            'properties': {'district_id': '6310520000'},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': [[square]]},
+        }]}, f)
+    assert load_polygons(path) == {'6310520000': [[(lat, lon) for lon, lat in square]]}
+
+    resolver = make_district_resolver(make_database(), path)
+    resolved = resolver.resolve([CITY_ID] * 3, [49.9900, 49.9896, 49.9845], [36.2350, 36.2460, 36.2428])
+    assert list(resolved) == ['6310520000', 'micro_kharkiv_levada', '6310430000']
+
+
+def test_ingestion_and_backfill():
+    """Нові оголошення отримують район при збереженні, існуючі - командою заповнення"""
+    db = make_database()
+    coordinates = [(district.coordinates['latitude'] + 0.001, district.coordinates['longitude'])
+                   for district in KHARKIV_CITY.districts]
+
+    existing = [make_listing(i, latitude=lat, longitude=lon) for i, (lat, lon) in enumerate(coordinates)]
+    ListingIngestor(db).ingest({'Харків': existing}, 'olx')
+    with db.get_session() as session:
+        assert session.query(PropertyListing).filter(PropertyListing.district_id.isnot(None)).count() == 0
+
+    resolver = DistrictResolver(db)
+    assert resolver.backfill(batch_size=3) == len(KHARKIV_CITY.districts)
+    assert resolver.backfill(batch_size=3) == 0
+
+    ingestor = ListingIngestor(db, district_resolver=DistrictResolver(db))
+    ingestor.ingest({'Харків': [
+        make_listing(100, latitude=coordinates[3][0], longitude=coordinates[3][1]),
+        make_listing(101, latitude=coordinates[3][0], longitude=coordinates[3][1], district_id='6310430000'),
+        make_listing(102),
+    ]}, 'olx')
+
+    with db.get_session() as session:
+        districts = dict(session.query(PropertyListing.external_id, PropertyListing.district_id))
+    assert districts == {
+        **{f'olx_{i}': district.id for i, district in enumerate(KHARKIV_CITY.districts)},
+        'olx_100': KHARKIV_CITY.districts[3].id,
+        'olx_101': '6310430000',
+        'olx_102': None,
+    }
+
+    top = MarketAnalyzer(db).get_top_districts_by_price('Харків', limit=20)
+    assert sum(item['listings_count'] for item in top) == len(KHARKIV_CITY.districts) + 2
+
+
+if __name__ == "__main__":
+    print("=== Тест визначення районів ===")
+    test_nearest_centroid_matches_loop()
+    print("✅ Найближчий центр району")
+    test_polygons_take_precedence()
+    print("✅ Межі районів")
+    test_ingestion_and_backfill()
+    print("✅ Призначення при збереженні та заповнення існуючих")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Тест офлайн газетира: точні номери, інтерполяція по стороні вулиці,
+мікросекундний пошук, газетир перед HTTP геокодером та при збереженні
+оголошень
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Додаємо папку збору даних до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+
+from gazetteer import Gazetteer, load_gazetteer, split_address
+from geocoding import CachedGeocoder
+from test_ingestion import make_ingestor, make_listing
+from models import PropertyListing
+
+GAZETTEER_CSV = """city,street,house_number,latitude,longitude
+Харків,вулиця Сумська,10,50.0000,36.2000
+Харків,вулиця Сумська,20,50.0100,36.2100
+Харків,вулиця Сумська,11,50.0000,36.2300
+Харків,вулиця Сумська,21,50.0200,36.2300
+Харків,вулиця Сумська,25а,50.0300,36.2400
+Харків,проспект Науки,,50.0270,36.2270
+Київ,вулиця Сумська,1,50.4500,30.5200
+"""
+
+
+def make_gazetteer() -> Gazetteer:
+    path = os.path.join(tempfile.mkdtemp(), 'gazetteer.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(GAZETTEER_CSV)
+    return load_gazetteer(path)
+
+
+class FailingProvider:
+    """HTTP провайдер, до якого не повинно дійти"""
+
+    name = 'failing'
+
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, address, city):
+        self.calls.append(address)
+        return None
+
+
+def test_split_address():
+    assert split_address('вул. Сумська, 25-А, кв. 3', 'Харків') == ('сумська', '25а')
+    assert split_address('м. Харків, Сумська вулиця 10', 'Харків') == ('сумська', '10')
+    assert split_address('вулиця 23 Серпня 5', 'Харків') == ('23 серпня', '5')
+    assert split_address('просп. Науки', 'Харків') == ('науки', None)
+    assert split_address(None) is None
+
+
+def test_exact_interpolated_and_street():
+    gazetteer = make_gazetteer()
+    assert len(gazetteer) == 3 and gazetteer.points == 6
+
+    assert gazetteer.geocode('вул. Сумська 10', 'Харків') == {'latitude': 50.0, 'longitude': 36.2}
+    assert gazetteer.geocode('Сумська 25А, кв. 7', 'Харків') == {'latitude': 50.03, 'longitude': 36.24}
+    # 14 - між парними 10 та 20, непарні будинки не враховуються
+    point = gazetteer.geocode('вулиця Сумська, 14', 'Харків')
+    assert abs(point['latitude'] - 50.004) < 1e-9 and abs(point['longitude'] - 36.204) < 1e-9
+    # За межами відомих номерів - крайній будинок своєї сторони (25а замість 25)
+    assert gazetteer.geocode('вул. Сумська 99', 'Харків') == {'latitude': 50.03, 'longitude': 36.24}
+    # Без номера - центр вулиці; вулиця лише з центром - центр і для будь-якого номера
+    assert gazetteer.geocode('просп. Науки', 'Харків') == {'latitude': 50.027, 'longitude': 36.227}
+    assert gazetteer.geocode('просп. Науки, 10', 'Харків') == {'latitude': 50.027, 'longitude': 36.227}
+    assert gazetteer.geocode('вул. Сумська 1', 'Київ') == {'latitude': 50.45, 'longitude': 30.52}
+
+    assert gazetteer.geocode('вул. Невідома 1', 'Харків') is None
+    assert gazetteer.geocode('вул. Сумська 10', 'Одеса') is None
+    assert gazetteer.counters == {'exact': 3, 'interpolated': 2, 'street': 2, 'misses': 2}
+
+    started = time.perf_counter()
+    for _ in range(10_000):
+        gazetteer.geocode('вул. Сумська, 14, кв. 5', 'Харків')
+    assert (time.perf_counter() - started) / 10_000 < 100e-6
+
+
+def test_gazetteer_before_http_geocoder():
+    """Адреси з газетира не йдуть ні в кеш, ні до HTTP провайдера"""
+    db, _ = make_ingestor()
+    provider = FailingProvider()
+    geocoder = CachedGeocoder(db, provider=provider, rate=1000, gazetteer=make_gazetteer())
+
+    results = geocoder.geocode_many([('вул. Сумська 20', 'Харків'), ('вул. Невідома 1', 'Харків')])
+    assert results[('вул сумська 20', 'харків')] == {'latitude': 50.01, 'longitude': 36.21}
+    assert provider.calls == ['вул. Невідома 1']
+    assert geocoder.counters['offline'] == 1 and geocoder.counters['lookups'] == 1
+
+
+def test_ingestion_fills_coordinates():
+    """Оголошення без координат отримують їх з газетира, координати парсера не змінюються"""
+    db, ingestor = make_ingestor()
+    ingestor.gazetteer = make_gazetteer()
+    ingestor.ingest({'Харків': [
+        make_listing(1, address='вул. Сумська 20'),
+        make_listing(2, address='Харків', full_address='вул. Сумська 10, кв. 4'),
+        make_listing(3, address='вул. Сумська 20', latitude=49.9, longitude=36.1),
+        make_listing(4, address='вул. Невідома 1'),
+    ]}, 'olx')
+
+    with db.get_session() as session:
+        coordinates = {row.external_id: (row.latitude, row.longitude) for row in session.query(PropertyListing)}
+    assert coordinates == {
+        'olx_1': (50.01, 36.21),
+        'olx_2': (50.0, 36.2),
+        'olx_3': (49.9, 36.1),
+        'olx_4': (None, None),
+    }
+
+
+if __name__ == "__main__":
+    print("=== Тест офлайн газетира ===")
+    test_split_address()
+    print("✅ Розбір адреси на вулицю та номер")
+    test_exact_interpolated_and_street()
+    print("✅ Точні, інтерпольовані та центральні точки")
+    test_gazetteer_before_http_geocoder()
+    print("✅ Газетир перед HTTP геокодером")
+    test_ingestion_fills_coordinates()
+    print("✅ Координати при збереженні оголошень")
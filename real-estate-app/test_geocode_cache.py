@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Тест кешу геокодування: однакові адреси шукаються один раз, результати
+зберігаються в geocode_cache, міграція фіксується порціями та
+продовжується після перерви. Замість Nominatim - локальний HTTP сервер
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Додаємо папку збору даних до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+
+from geocoding import CachedGeocoder, NominatimProvider, cache_key, normalize_address
+from migration_geocoding import GeocodingMigrator
+from models import City, GeocodeCache, PropertyListing
+from scrapers.politeness import TokenBucket
+
+# Адреса -> координати (за нормалізованим ключем); решта "не знайдені"
+KNOWN = {
+    'вул сумська 25': (50.0051, 36.2343),
+    'просп науки 15': (50.0270, 36.2270),
+    'вул пушкінська 10': (49.9990, 36.2420),
+}
+
+
+class StandInNominatim(BaseHTTPRequestHandler):
+    """Відповідає як /search Nominatim і рахує запити"""
+
+    queries = []
+    fail = set()
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)['q'][0]
+        address = query.rsplit(',', 2)[0]
+        type(self).queries.append(address)
+
+        key = normalize_address(address)
+        if key in self.fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        coordinates = KNOWN.get(key)
+        body = json.dumps([{'lat': str(coordinates[0]), 'lon': str(coordinates[1])}] if coordinates else [])
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    StandInNominatim.queries = []
+    StandInNominatim.fail = set()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInNominatim)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, NominatimProvider(base_url=f'http://127.0.0.1:{server.server_port}')
+
+
+def make_migrator(provider):
+    migrator = GeocodingMigrator('sqlite://', provider=provider, rate=1000, max_workers=4)
+    migrator.db.create_tables()
+
+    addresses = [
+        'вул. Сумська 25, кв. 5', 'вулиця Сумська, 25', 'Вул. Сумська 25 кв. 12',
+        'просп. Науки 15', 'Проспект  Науки, 15',
+        'вул. Пушкінська 10', 'вул. Невідома 1',
+    ]
+    with migrator.db.get_session() as session:
+        session.add(City(id='kharkiv', name='Харків', region='Харківська', latitude=49.99, longitude=36.23))
+        session.flush()
+        for i in range(35):
+            session.add(PropertyListing(
+                id=f'listing_{i}', external_id=str(i), source='olx', title='Квартира', url='https://olx.ua',
+                city_id='kharkiv', address=addresses[i % len(addresses)],
+                price_uah=1_000_000, area_total=50.0, rooms=2,
+            ))
+    return migrator
+
+
+def test_normalized_keys():
+    """Регістр, скорочення, розділові знаки та квартира не змінюють ключ"""
+    assert normalize_address('Вулиця  Сумська, 25, кв. 7') == 'вул сумська 25'
+    assert normalize_address('вул. Сумська 25') == 'вул сумська 25'
+    assert normalize_address('Проспект Науки, 15') == 'просп науки 15'
+    assert cache_key('вул. Сумська 25', ' Харків ') == ('вул сумська 25', 'харків')
+    assert normalize_address(None) == ''
+
+
+def test_token_bucket_rate():
+    """Після першого токена потоки отримують наступні не частіше за rate"""
+    bucket = TokenBucket(rate=50, capacity=1)
+    started = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+def test_migration_deduplicates_and_resumes():
+    """Кожен ключ запитується один раз, помилки провайдера повторюються при наступному запуску"""
+    server, provider = start_server()
+    try:
+        migrator = make_migrator(provider)
+        StandInNominatim.fail = {'вул пушкінська 10'}
+
+        counts = migrator.migrate_existing_data(batch_size=2)
+        # 7 різних рядків адрес -> 4 ключі, по одному запиту на ключ
+        assert counts['addresses'] == 7
+        assert sorted(map(normalize_address, StandInNominatim.queries)) == [
+            'вул невідома 1', 'вул пушкінська 10', 'вул сумська 25', 'просп науки 15',
+        ]
+        assert counts['listings'] == 25
+        assert migrator.geocoder.counters['errors'] == 1
+
+        with migrator.db.get_session() as session:
+            listing = session.query(PropertyListing).filter_by(address='Вул. Сумська 25 кв. 12').first()
+            assert (listing.latitude, listing.longitude) == KNOWN['вул сумська 25']
+            assert listing.full_address == 'Вул. Сумська 25 кв. 12'
+            # Не знайдена адреса закешована, помилка - ні
+            cached = {row.address_key: row.latitude for row in session.query(GeocodeCache)}
+            assert cached == {'вул сумська 25': 50.0051, 'просп науки 15': 50.0270, 'вул невідома 1': None}
+
+        # Повторний запуск: до сервера йде лише адреса з помилкою
+        StandInNominatim.fail = set()
+        StandInNominatim.queries = []
+        counts = migrator.migrate_existing_data(batch_size=2)
+        assert StandInNominatim.queries == ['вул. Пушкінська 10']
+        assert counts['addresses'] == 2 and counts['listings'] == 5
+
+        with migrator.db.get_session() as session:
+            missing = session.query(PropertyListing).filter(PropertyListing.latitude.is_(None)).count()
+            assert missing == 5
+
+        # Окремий геокодер бере результат з кешу без запиту
+        geocoder = CachedGeocoder(migrator.db, provider=provider)
+        assert geocoder.geocode('Вулиця Сумська 25', 'Харків') == {'latitude': 50.0051, 'longitude': 36.2343}
+        assert geocoder.counters['cache_hits'] == 1 and geocoder.counters['lookups'] == 0
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    print("=== Тест кешу геокодування ===")
+    test_normalized_keys()
+    print("✅ Нормалізовані ключі адрес")
+    test_token_bucket_rate()
+    print("✅ Відро токенів обмежує частоту")
+    test_migration_deduplicates_and_resumes()
+    print("✅ Міграція без повторних запитів та з продовженням")
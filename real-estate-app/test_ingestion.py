@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Тест пакетного збереження оголошень (ListingIngestor)
+"""
+
+import os
+import sys
+import time
+
+# Додаємо папку збору даних до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+
+from sqlalchemy import event
+
+from database import DatabaseManager
+from ingestion import ListingIngestor
+from models import PropertyListing, City
+
+
+def make_listing(i: int, **overrides):
+    """Оголошення у форматі парсера (з полями, яких немає в таблиці)"""
+    listing = {
+        'external_id': f'olx_{i}',
+        'source': 'olx',
+        'title': f'Квартира {i}',
+        'price_uah': 1_000_000 + i,
+        'area_total': 50.0 + i,
+        'rooms': 2,
+        'url': f'https://www.olx.ua/{i}',
+        'location': 'Харків, Центр',
+        'date_text': 'Сьогодні',
+    }
+    listing.update(overrides)
+    return listing
+
+
+def make_ingestor(chunk_size: int = 3):
+    db = DatabaseManager('sqlite://')
+    db.create_tables()
+    with db.get_session() as session:
+        session.add(City(id='kharkiv', name='Харків', region='Харківська', latitude=49.99, longitude=36.23))
+    return db, ListingIngestor(db, chunk_size=chunk_size)
+
+
+def test_insert_update_unchanged_counts():
+    """Нові, змінені та незмінні оголошення рахуються окремо"""
+    db, ingestor = make_ingestor()
+
+    listings = [make_listing(i) for i in range(7)] + [make_listing(99, rooms=None)]
+    counts = ingestor.ingest({'Харків': listings}, 'olx')
+    assert counts == {'inserted': 7, 'updated': 0, 'unchanged': 0, 'skipped': 1}
+
+    with db.get_session() as session:
+        before = dict(session.query(PropertyListing.external_id, PropertyListing.updated_at))
+        row = session.query(PropertyListing).filter_by(external_id='olx_0').one()
+        assert (row.city_id, row.source, row.is_active) == ('kharkiv', 'olx', True)
+
+    time.sleep(0.01)
+    changed = [make_listing(i) for i in range(7)]
+    changed[2]['price_uah'] = 5
+    # Часткові дані не затирають поля, яких парсер не надав
+    changed[3] = {'external_id': 'olx_3', 'description': 'Оновлений опис'}
+
+    counts = ingestor.ingest({'Харків': changed}, 'olx')
+    assert counts == {'inserted': 0, 'updated': 2, 'unchanged': 5, 'skipped': 0}
+
+    with db.get_session() as session:
+        rows = {row.external_id: row for row in session.query(PropertyListing)}
+        assert rows['olx_2'].price_uah == 5
+        assert rows['olx_3'].description == 'Оновлений опис'
+        assert rows['olx_3'].title == 'Квартира 3'
+
+        # last_seen_at оновлюється для всіх побачених, updated_at - лише для змінених
+        for external_id, row in rows.items():
+            assert row.last_seen_at > before[external_id]
+            if external_id in ('olx_2', 'olx_3'):
+                assert row.updated_at > before[external_id]
+            else:
+                assert row.updated_at == before[external_id]
+
+
+def test_one_lookup_per_chunk():
+    """Існуючі оголошення завантажуються одним запитом на порцію"""
+    db, ingestor = make_ingestor(chunk_size=50)
+    ingestor.ingest({'Харків': [make_listing(i) for i in range(100)]}, 'olx')
+
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    listings = [make_listing(i, price_uah=i) for i in range(100)] + [make_listing(i) for i in range(100, 150)]
+    counts = ingestor.ingest({'Харків': listings}, 'olx')
+    assert counts == {'inserted': 50, 'updated': 100, 'unchanged': 0, 'skipped': 0}
+
+    selects = [s for s in statements if s.lstrip().upper().startswith('SELECT')]
+    # Міста + по одному запиту на кожну з трьох порцій
+    assert len(selects) == 4, selects
+
+
+def test_city_matched_by_normalized_name():
+    """Назва міста з парсера відрізняється регістром та пробілами - оголошення не пропускаються"""
+    db, ingestor = make_ingestor()
+    counts = ingestor.ingest({' ХАРКІВ ': [make_listing(1)], 'Атлантида': [make_listing(2)]}, 'olx')
+    assert counts == {'inserted': 1, 'updated': 0, 'unchanged': 0, 'skipped': 1}
+
+    with db.get_session() as session:
+        assert session.query(PropertyListing.city_id).filter_by(external_id='olx_1').scalar() == 'kharkiv'
+
+
+if __name__ == "__main__":
+    print("=== Тест пакетного збереження оголошень ===")
+    test_insert_update_unchanged_counts()
+    print("✅ Лічильники та last_seen_at коректні")
+    test_one_lookup_per_chunk()
+    print("✅ Один запит існуючих оголошень на порцію")
+    test_city_matched_by_normalized_name()
+    print("✅ Місто за нормалізованою назвою")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Тест агрегації статистики міста в БД: результати мають збігатися
+з розрахунком у pandas по всіх оголошеннях
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+# sample_database додає папку збору даних до шляху
+from sample_database import CITY_ID, make_database
+from analyzers.market_analyzer import MarketAnalyzer
+from models import PropertyListing
+
+
+NOW = datetime(2026, 5, 31)
+
+
+def make_listings(size: int, seed: int = 3):
+    rng = random.Random(seed)
+    return [dict(
+        city_id=rng.choice([CITY_ID, CITY_ID, 'kyiv']),
+        price_uah=rng.choice([0, rng.randint(400_000, 6_000_000)]) if i % 17 == 0 else rng.randint(400_000, 6_000_000),
+        area_total=rng.choice([0.0, round(rng.uniform(18, 160), 1)]) if i % 19 == 0 else round(rng.uniform(18, 160), 1),
+        rooms=rng.choice([1, 2, 3, 4, 5]),
+        is_active=rng.random() > 0.1,
+        created_at=NOW - timedelta(days=rng.randint(0, 60)),
+    ) for i in range(size)]
+
+
+def reference_stats(db, city_id, start_date, end_date):
+    """Еталон: попередня реалізація через DataFrame"""
+    with db.get_session() as session:
+        rows = session.query(PropertyListing.price_uah, PropertyListing.area_total, PropertyListing.rooms).filter(
+            PropertyListing.city_id == city_id,
+            PropertyListing.is_active == True,
+            PropertyListing.created_at.between(start_date, end_date)
+        ).all()
+
+    df = pd.DataFrame([r._asdict() for r in rows if r.price_uah > 0 and r.area_total > 0])
+    stats = {
+        'total_listings': len(df),
+        'average_price_per_sqm': float(df['price_uah'].sum() / df['area_total'].sum()),
+        'median_price_per_sqm': float(df['price_uah'].divide(df['area_total']).median()),
+        'average_area': float(df['area_total'].mean()),
+    }
+    for rooms in [1, 2, 3, 4]:
+        room_df = df[df['rooms'] == rooms]
+        if not room_df.empty:
+            stats[f'avg_price_{rooms}_room'] = float(room_df['price_uah'].divide(room_df['area_total']).mean())
+    return stats
+
+
+def test_city_stats_match_pandas():
+    """SQL агрегати збігаються з pandas для парної та непарної кількості рядків"""
+    for size in (400, 401):
+        db = make_database(make_listings(size, seed=size))
+        analyzer = MarketAnalyzer(db)
+        start_date = NOW - timedelta(days=30)
+
+        stats = analyzer.calculate_city_stats('Харків', start_date, NOW)
+        expected = reference_stats(db, CITY_ID, start_date, NOW)
+
+        for key, value in expected.items():
+            assert abs(stats[key] - value) <= 1e-9 * max(1.0, abs(value)), (key, stats[key], value)
+        assert stats['demand_level'] in ('low', 'medium', 'high')
+
+    assert analyzer.calculate_city_stats('Львів', start_date, NOW) is None
+
+
+def test_only_aggregate_rows_cross_the_wire():
+    """Кількість повернутих рядків не залежить від кількості оголошень"""
+    db = make_database(make_listings(2000))
+    fetched = []
+    event.listen(db.engine, 'after_cursor_execute',
+                 lambda conn, cursor, statement, *args: fetched.append(statement))
+
+    MarketAnalyzer(db).calculate_city_stats('Харків', NOW - timedelta(days=30), NOW)
+    assert not any('property_listings.description' in statement for statement in fetched)
+    # Місто, підсумки, медіана, кімнати, дві статистики MarketStats
+    assert len(fetched) == 6, fetched
+
+
+def test_postgresql_median_uses_percentile_cont():
+    """На PostgreSQL медіана рахується через percentile_cont"""
+    from sqlalchemy import func
+    price_per_sqm = PropertyListing.price_uah * 1.0 / PropertyListing.area_total
+    sql = str(func.percentile_cont(0.5).within_group(price_per_sqm).compile(dialect=postgresql.dialect()))
+    assert 'percentile_cont' in sql and 'WITHIN GROUP' in sql
+
+
+if __name__ == "__main__":
+    print("=== Тест агрегації статистики міста ===")
+    test_city_stats_match_pandas()
+    print("✅ Статистика збігається з розрахунком у pandas")
+    test_only_aggregate_rows_cross_the_wire()
+    print("✅ З бази повертаються лише агрегати")
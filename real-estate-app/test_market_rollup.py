@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Тест інкрементального rollup market_stats: повний перший запуск,
+повторний запуск перераховує лише змінені дні
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import update
+
+# sample_database додає папку збору даних до шляху
+from sample_database import CITY_ID, make_database
+from analyzers.market_analyzer import MarketAnalyzer
+from analyzers.market_rollup import MarketStatsRollup
+from models import MarketStats, PropertyListing
+
+
+DISTRICT_ID = 'micro_kharkiv_saltivka'
+
+
+def make_listings(today):
+    listings = []
+    for i in range(120):
+        created = today - timedelta(days=i % 40)
+        listings.append(dict(
+            city_id=CITY_ID if i % 3 else 'kyiv', district_id=DISTRICT_ID if i % 3 == 1 else None,
+            price_uah=1_000_000 + 10_000 * i, area_total=40.0 + i % 7, rooms=1 + i % 5,
+            is_active=i % 11 != 0, created_at=created, updated_at=created,
+        ))
+    return listings
+
+
+def day_listings(db, city_id, day, district_id=None):
+    with db.get_session() as session:
+        query = session.query(PropertyListing.price_uah, PropertyListing.area_total).filter(
+            PropertyListing.city_id == city_id,
+            PropertyListing.is_active == True,
+            PropertyListing.created_at >= day,
+            PropertyListing.created_at < day + timedelta(days=1)
+        )
+        if district_id:
+            query = query.filter(PropertyListing.district_id == district_id)
+        return query.all()
+
+
+def test_full_then_incremental_rollup():
+    # Полудень вчорашнього дня: жодне оголошення не створене "в майбутньому"
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(hours=12)
+    db = make_database(make_listings(today))
+    rollup = MarketStatsRollup(db, chunk_size=7)
+
+    first = rollup.run()
+    assert first['days'] == 80  # 40 днів x 2 міста
+
+    with db.get_session() as session:
+        city_rows = session.query(MarketStats).filter(MarketStats.district_id.is_(None)).all()
+        district_rows = session.query(MarketStats).filter(MarketStats.district_id == DISTRICT_ID).all()
+        assert district_rows
+        for row in city_rows + district_rows:
+            listings = day_listings(db, row.city_id, row.date, row.district_id)
+            price = np.array([listing.price_uah for listing in listings], dtype=float)
+            area = np.array([listing.area_total for listing in listings])
+            assert row.total_listings == len(listings)
+            assert abs(row.average_price_per_sqm - price.sum() / area.sum()) < 1e-6
+            assert abs(row.median_price_per_sqm - np.median(price / area)) < 1e-6
+        computed_at = {row.id: row.created_at for row in city_rows}
+
+    # Без змін - нічого не перераховується
+    assert rollup.run() == {'days': 0, 'rows': 0}
+
+    # Змінюємо ціну одного оголошення - перераховується лише його день
+    with db.get_session() as session:
+        session.execute(update(PropertyListing).where(PropertyListing.id == 'listing_4')
+                        .values(price_uah=9_000_000, updated_at=datetime.utcnow() + timedelta(seconds=1)))
+
+    second = rollup.run()
+    assert second['days'] == 1
+
+    with db.get_session() as session:
+        day = (today - timedelta(days=4)).replace(hour=0)
+        row = session.query(MarketStats).filter_by(city_id=CITY_ID, date=day, district_id=None).one()
+        listings = day_listings(db, CITY_ID, day)
+        assert row.total_listings == len(listings)
+        assert abs(row.average_price_per_sqm - sum(l.price_uah for l in listings) / sum(l.area_total for l in listings)) < 1e-6
+
+        untouched = session.query(MarketStats).filter(
+            MarketStats.district_id.is_(None), MarketStats.date != day).all()
+        assert all(r.created_at == computed_at[r.id] for r in untouched)
+
+    # Тренди та зміна ціни читають денні рядки міста
+    analyzer = MarketAnalyzer(db)
+    trends = analyzer.get_price_trends('Харків', months=3)
+    assert len(trends) == 40
+    with db.get_session() as session:
+        change = analyzer._calculate_price_change(CITY_ID, today - timedelta(days=20), today + timedelta(days=1),
+                                                  session)
+    assert change != 0.0
+
+
+if __name__ == "__main__":
+    print("=== Тест rollup market_stats ===")
+    test_full_then_incremental_rollup()
+    print("✅ Rollup перераховує лише змінені дні")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Тест завантаження детальних сторінок OLX: кожна сторінка завантажується
+один раз, паралельно, з обмеженням одночасних запитів на домен
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Додаємо папку збору даних до шляху
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
+
+from scrapers.olx_scraper import OLXScraper
+
+# Справжня пауза для імітації мережі (time.sleep парсера підміняється в тесті)
+network_delay = time.sleep
+
+SEARCH_PAGE = '<html><body>{}</body></html>'.format(''.join(
+    f'<div data-testid="listing-ad" data-id="{i}">'
+    f'<h6 class="css-16v5mdi">2-кімнатна квартира, 5{i} м²</h6>'
+    f'<p class="css-10b0gli">1 50{i} 000 грн.</p>'
+    f'<a class="css-rc5s2u" href="/d/obyavlenie/{i}.html"></a>'
+    f'<p class="css-veheph">Харків, Центр</p>'
+    f'</div>'
+    for i in range(8)
+))
+
+DETAIL_PAGE = (
+    '<html><head><script>window.map = {{"latitude": 49.99{0}, "longitude": 36.23{0}}}</script></head>'
+    '<body><div class="css-g5mtbi">Опис {0}: цегляний будинок, балкон, ліфт</div></body></html>'
+)
+
+
+class Response:
+    def __init__(self, text):
+        self.status_code = 200
+        self.text = text
+
+
+class RecordingSession:
+    """Замість HTTP: віддає сторінки та рахує запити й одночасність"""
+
+    def __init__(self):
+        self.headers = {}
+        self.requests = Counter()
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.requests[url] += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if '/obyavlenie/' in url:
+                network_delay(0.02)
+                return Response(DETAIL_PAGE.format(url.rsplit('/', 1)[-1].split('.')[0]))
+            return Response(SEARCH_PAGE)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def test_detail_pages_fetched_once_with_domain_limit():
+    """Опис і координати з однієї сторінки; не більше 2 запитів одночасно"""
+    scraper = OLXScraper(detail_workers=6, max_requests_per_domain=2, min_request_interval=0.0)
+    scraper.session = RecordingSession()
+
+    import scrapers.olx_scraper as olx_module
+    sleep, olx_module.time.sleep = olx_module.time.sleep, lambda seconds: None
+    try:
+        listings = scraper.scrape_city_listings('Харків', max_pages=1)
+    finally:
+        olx_module.time.sleep = sleep
+
+    assert [listing['external_id'] for listing in listings] == [str(i) for i in range(8)]
+    for i, listing in enumerate(listings):
+        assert listing['description'].startswith(f'Опис {i}')
+        assert listing['latitude'] == float(f'49.99{i}')
+        assert listing['longitude'] == float(f'36.23{i}')
+        assert listing['building_type'] == 'brick'
+
+    detail_requests = {url: n for url, n in scraper.session.requests.items() if '/obyavlenie/' in url}
+    assert len(detail_requests) == 8
+    assert set(detail_requests.values()) == {1}
+    assert scraper.session.max_active <= 2
+
+
+if __name__ == "__main__":
+    print("=== Тест завантаження детальних сторінок OLX ===")
+    test_detail_pages_fetched_once_with_domain_limit()
+    print("✅ Кожна детальна сторінка завантажена один раз з обмеженням на домен")
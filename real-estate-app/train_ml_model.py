@@ -9,11 +9,13 @@ import logging
 import argparse
 import pandas as pd
 
-# Додаємо кореневу папку до шляху
+# Додаємо кореневу папку та data-collection до шляху
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data-collection'))
 
 from backend.ml_model import RealEstateMLModel, prepare_training_data
-from data_collection.database import DatabaseManager
+from backend.training_data import TRAINING_CHUNK_SIZE, load_snapshot, load_training_frame, save_snapshot
+from database import DatabaseManager
 
 # Налаштування логування
 logging.basicConfig(
@@ -26,61 +28,35 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def load_data_from_database(db_url: str = None) -> pd.DataFrame:
-    """Завантаження даних з бази даних для навчання моделі"""
+def load_data_from_database(db_url: str = None, chunksize: int = TRAINING_CHUNK_SIZE,
+                            snapshot_path: str = None, refresh_snapshot: bool = False) -> pd.DataFrame:
+    """
+    Завантаження даних з бази даних для навчання моделі: порціями, з
+    компактними типами колонок; зі snapshot_path - через знімок на диску
+    """
 
     logger.info("Завантажую дані з бази даних для навчання моделі...")
 
     try:
+        # Знімок читається без підключення до БД
+        if snapshot_path and not refresh_snapshot:
+            df = load_snapshot(snapshot_path)
+            if df is not None:
+                return df
+
         db = DatabaseManager(db_url or os.getenv('DATABASE_URL', 'sqlite:///real_estate.db'))
+        df = load_training_frame(db.engine, chunksize)
 
-        with db.get_session() as session:
-            # Отримуємо всі оголошення з цінами та характеристиками
-            query = """
-            SELECT
-                pl.price_uah,
-                pl.area_total,
-                pl.rooms,
-                pl.floor,
-                pl.total_floors,
-                pl.building_type,
-                pl.condition,
-                pl.heating,
-                pl.has_balcony,
-                pl.has_elevator,
-                c.name as city,
-                d.name as district
-            FROM property_listings pl
-            JOIN cities c ON pl.city_id = c.id
-            LEFT JOIN districts d ON pl.district_id = d.id
-            WHERE pl.price_uah > 0
-            AND pl.area_total > 10
-            AND pl.area_total < 500
-            AND pl.is_active = 1
-            """
-
-            df = pd.read_sql(query, db.engine)
-
-            logger.info(f"Завантажено {len(df)} записів з бази даних")
-
-            # Перетворюємо булеві поля
-            df['has_balcony'] = df['has_balcony'].astype(int)
-            df['has_elevator'] = df['has_elevator'].astype(int)
-
-            # Заповнюємо пропуски
-            df['district'] = df['district'].fillna('Невідомий')
-            df['building_type'] = df['building_type'].fillna('panel')
-            df['condition'] = df['condition'].fillna('good')
-            df['heating'] = df['heating'].fillna('central')
-
-            return df
+        if snapshot_path and len(df):
+            save_snapshot(df, snapshot_path)
+        return df
 
     except Exception as e:
         logger.error(f"Помилка завантаження даних з бази: {e}")
         logger.info("Використовую синтетичні дані для тестування")
         return prepare_training_data()
 
-def train_and_save_model(data_path: str = None, db_url: str = None):
+def train_and_save_model(data_path: str = None, db_url: str = None, max_workers: int = None, **load_options):
     """Навчання та збереження ML моделі"""
 
     logger.info("Починаю навчання ML моделі...")
@@ -89,7 +65,7 @@ def train_and_save_model(data_path: str = None, db_url: str = None):
     if data_path and os.path.exists(data_path):
         df = prepare_training_data(data_path)
     else:
-        df = load_data_from_database(db_url)
+        df = load_data_from_database(db_url, **load_options)
 
     if df.empty:
         logger.error("Не вдалося завантажити дані для навчання")
@@ -98,7 +74,7 @@ def train_and_save_model(data_path: str = None, db_url: str = None):
     logger.info(f"Доступно {len(df)} записів для навчання")
 
     # Ініціалізуємо модель
-    ml_model = RealEstateMLModel()
+    ml_model = RealEstateMLModel(max_workers=max_workers)
 
     # Навчаємо моделі
     training_results = ml_model.train_models(df)
@@ -124,6 +100,12 @@ def train_and_save_model(data_path: str = None, db_url: str = None):
             print(f"  MAE: {result['mae']:,.0f} грн")
             print(f"  RMSE: {result['rmse']:,.0f} грн")
             print(f"  R²: {result['r2']:.3f}")
+            print(f"  Час навчання: {result['wall_seconds']:.1f} с")
+            if result.get('peak_memory_mb') is not None:
+                print(f"  Пік пам'яті: {result['peak_memory_mb']:,.0f} МБ")
+
+            if model_name in evaluation_results and 'cv_mae' in evaluation_results[model_name]:
+                print(f"  MAE крос-валідації: {evaluation_results[model_name]['cv_mae']:,.0f} грн")
 
             if 'feature_importance' in result and result['feature_importance']:
                 print("  Важливість ознак:")
@@ -143,7 +125,59 @@ def train_and_save_model(data_path: str = None, db_url: str = None):
         logger.error("Помилка збереження моделей")
         return False
 
-def test_model_predictions(db_url: str = None):
+def retrain_incremental(db_url: str = None, max_workers: int = None, chunksize: int = TRAINING_CHUNK_SIZE):
+    """
+    Донавчання активного пакета на оголошеннях, змінених після його позначки
+    навчання; новий пакет активується, лише якщо пройшов перевірку
+    """
+
+    ml_model = RealEstateMLModel(max_workers=max_workers)
+    if not ml_model.load_models():
+        logger.error("Немає пакета моделей для донавчання, потрібне повне навчання")
+        return False
+
+    if ml_model.training_watermark is None:
+        logger.error(f"Пакет {ml_model.bundle_version} без позначки навчання, потрібне повне навчання")
+        return False
+
+    base_version = ml_model.bundle_version
+    db = DatabaseManager(db_url or os.getenv('DATABASE_URL', 'sqlite:///real_estate.db'))
+    df = load_training_frame(db.engine, chunksize, since=ml_model.training_watermark)
+    logger.info(f"Змінених записів після {ml_model.training_watermark}: {len(df)}")
+
+    results = ml_model.update_models(df)
+    if 'error' in results:
+        logger.warning(results['error'])
+        return False
+
+    print("\n" + "="*50)
+    print(f"ДОНАВЧАННЯ ПАКЕТА {base_version} ({len(df)} нових записів)")
+    print("="*50)
+
+    for model_name, result in results.items():
+        if not isinstance(result, dict):
+            continue
+        print(f"\n{model_name.upper()}: {result['status']}")
+        print(f"  MAE поточної моделі: {result['baseline_mae']:,.0f} грн")
+        if 'candidate_mae' in result:
+            print(f"  MAE кандидата: {result['candidate_mae']:,.0f} грн")
+        elif result['status'] == 'updated':
+            print(f"  MAE після донавчання: {result['mae']:,.0f} грн ({result['n_estimators']} дерев)")
+        if 'wall_seconds' in result:
+            print(f"  Час навчання: {result['wall_seconds']:.1f} с")
+
+    if not results['promoted']:
+        print("\nЖоден кандидат не пройшов перевірку, активна версія не змінилась")
+        return True
+
+    if ml_model.save_models():
+        print(f"✓ Активовано пакет {ml_model.bundle_version}")
+        return True
+
+    logger.error("Помилка збереження моделей")
+    return False
+
+def test_model_predictions(db_url: str = None, **load_options):
     """Тестування прогнозів моделі на реальних даних"""
 
     logger.info("Тестую прогнози моделі...")
@@ -156,7 +190,7 @@ def test_model_predictions(db_url: str = None):
         return False
 
     # Завантажуємо тестові дані
-    df = load_data_from_database(db_url)
+    df = load_data_from_database(db_url, **load_options)
 
     if df.empty or len(df) < 10:
         logger.error("Недостатньо даних для тестування")
@@ -229,22 +263,36 @@ def main():
     parser.add_argument('--db', type=str, help='URL бази даних')
     parser.add_argument('--test-only', action='store_true', help='Тільки тестування, без навчання')
     parser.add_argument('--models-dir', type=str, default='models', help='Директорія для моделей')
+    parser.add_argument('--workers', type=int,
+                        help='Максимум потоків навчання (за замовчуванням TRAINING_MAX_WORKERS або кількість ядер)')
+    parser.add_argument('--chunk-size', type=int, default=TRAINING_CHUNK_SIZE,
+                        help='Розмір порції читання з бази даних')
+    parser.add_argument('--snapshot', type=str,
+                        help='Каталог знімка навчальних даних (.npy): якщо існує - дані читаються з нього, інакше створюється')
+    parser.add_argument('--refresh-snapshot', action='store_true', help='Перечитати дані з бази та оновити знімок')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Донавчити активний пакет на оголошеннях, змінених після його навчання')
 
     args = parser.parse_args()
+    load_options = {'chunksize': args.chunk_size, 'snapshot_path': args.snapshot,
+                    'refresh_snapshot': args.refresh_snapshot}
 
     try:
         if args.test_only:
             # Тільки тестуємо існуючу модель
-            success = test_model_predictions(args.db)
+            success = test_model_predictions(args.db, snapshot_path=args.snapshot)
+        elif args.incremental:
+            # Донавчаємо на нових даних
+            success = retrain_incremental(args.db, args.workers, args.chunk_size)
         else:
             # Навчаємо модель
-            success = train_and_save_model(args.data, args.db)
+            success = train_and_save_model(args.data, args.db, args.workers, **load_options)
 
             if success:
                 # Тестуємо після навчання
                 print("\n" + "="*50)
                 print("Тестую навчену модель...")
-                test_model_predictions(args.db)
+                test_model_predictions(args.db, snapshot_path=args.snapshot)
 
         if success:
             logger.info("Навчання та тестування завершено успішно")